@@ -9,6 +9,64 @@ class Settings(BaseSettings):
     GEMINI_API_KEY: str  # Required for RAG chatbot
     CHATAI_API_KEY: str  # Required for OpenAI-compatible chat API
 
+    # Shared Supabase HTTP connection pool
+    SUPABASE_POOL_SIZE: int = 20  # Max open connections
+    SUPABASE_POOL_MAX_KEEPALIVE: int = 10  # Idle connections kept alive for reuse
+    SUPABASE_KEEPALIVE_EXPIRY: float = 30.0  # Seconds an idle connection stays open
+    SUPABASE_TIMEOUT: float = 30.0  # Read/write/pool timeout in seconds
+    SUPABASE_CONNECT_TIMEOUT: float = 5.0  # Connect timeout in seconds
+
+    # Logging
+    LOG_LEVEL: str = "INFO"  # DEBUG enables per-request diagnostics
+    LOG_FORMAT: str = "text"  # text | json
+
+    # Subdomain -> entry table registry
+    SUBDOMAIN_REGISTRY_TTL: float = 300.0  # Seconds before the cached subdomains are reloaded
+
+    # Embedding generator
+    EMBEDDINGS_WATERMARK_PATH: str = ".embeddings_watermark.json"  # Last fully indexed version
+    EMBEDDING_BATCH_SIZE: int = 50  # Contents per embedding API call (Gemini allows up to 100)
+    EMBEDDING_CONCURRENCY: int = 4  # Embedding batches in flight at once
+    EMBEDDING_MAX_RETRIES: int = 5  # Retries on rate limits before giving up on a batch
+
+    # RAG engine startup
+    RAG_WARM_UP: str = "background"  # background (task after startup) | startup (before serving) | lazy (first question)
+
+    # RAG pipeline stage timeouts (seconds)
+    RAG_EMBED_TIMEOUT: float = 10.0  # Query embedding call
+    RAG_RETRIEVE_TIMEOUT: float = 10.0  # Vector search
+    RAG_GENERATE_TIMEOUT: float = 30.0  # Chat completion (when streaming: to each next chunk)
+
+    # RAG query-embedding cache
+    QUERY_EMBEDDING_CACHE_SIZE: int = 1024  # Embeddings kept in memory (LRU)
+    QUERY_EMBEDDING_CACHE_TTL: float = 86400.0  # Seconds a cached embedding stays valid
+    QUERY_EMBEDDING_CACHE_PATH: str | None = None  # SQLite file for a persistent tier (disabled when unset)
+
+    # RAG answer cache
+    RESPONSE_CACHE_SIZE: int = 512  # Answers kept in memory (LRU)
+    RESPONSE_CACHE_TTL: float = 600.0  # Seconds a cached answer stays valid
+
+    # RAG retrieval backend
+    RETRIEVER_BACKEND: str = "rpc"  # rpc (match_list_embeddings_simple) | local (in-process vector index)
+    VECTOR_INDEX_PATH: str = ".vector_index"  # Snapshot directory of the local index
+    VECTOR_INDEX_KIND: str = "brute"  # brute (exact) | ivf (approximate, for large corpora)
+    VECTOR_INDEX_IVF_LISTS: int = 0  # IVF clusters (0 = sqrt of the row count)
+    VECTOR_INDEX_NPROBE: int = 8  # IVF clusters scanned per query
+
+    # Generic CRUD endpoints
+    CRUD_MAX_PAGE_SIZE: int = 1000  # Upper bound for ?limit= on /api/<table>/ list routes
+    CRUD_MAX_BATCH_SIZE: int = 500  # Rows per /api/<table>/bulk request (one database statement each)
+    DEFAULT_VERSION_TTL: float = 300.0  # Seconds the default standalone version_id is cached
+
+    # Streaming CSV ingestion
+    CSV_UPLOAD_BATCH_SIZE: int = 5000  # Rows per insert statement
+
+    # List version storage
+    VERSION_STORAGE: str = "snapshot"  # snapshot (every version stores all its rows) | delta (only changes vs. the parent)
+    VERSION_DELTA_MAX_CHAIN: int = 10  # Deltas allowed on top of a snapshot before compaction rebases a version
+    VERSION_SNAPSHOT_CACHE_SIZE: int = 8  # Materialized delta versions kept in memory (LRU)
+    VERSION_SNAPSHOT_CACHE_TTL: float = 300.0  # Seconds a materialized snapshot stays cached
+
     class Config:
         env_file = ".env"
         extra = "allow"  # Allow extra fields from .env
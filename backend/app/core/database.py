@@ -1,14 +1,91 @@
-
+import asyncio
+import threading
+import httpx
 from .config import settings
 try:
-    from supabase import create_client
+    from supabase import create_client, acreate_client
+    from supabase.lib.client_options import SyncClientOptions, AsyncClientOptions
 except Exception:
     create_client = None
+    acreate_client = None
 
 SUPABASE_URL = settings.SUPABASE_URL
 SUPABASE_KEY = settings.SUPABASE_KEY
 
-def get_supabase_client():
+# Process-wide client shared by every request; created at startup, closed at shutdown
+_client = None
+_http_client = None
+_client_lock = threading.Lock()
+
+# Async counterpart used by the route handlers so they don't block the threadpool
+_async_client = None
+_async_http_client = None
+_async_client_lock = asyncio.Lock()
+
+def _http_client_options() -> dict:
+    """Pool limits and timeouts shared by the sync and async HTTP clients"""
+    return {
+        'limits': httpx.Limits(
+            max_connections=settings.SUPABASE_POOL_SIZE,
+            max_keepalive_connections=settings.SUPABASE_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=settings.SUPABASE_KEEPALIVE_EXPIRY,
+        ),
+        'timeout': httpx.Timeout(settings.SUPABASE_TIMEOUT, connect=settings.SUPABASE_CONNECT_TIMEOUT),
+        'follow_redirects': True,
+    }
+
+def _build_http_client() -> httpx.Client:
+    """Pooled keep-alive HTTP client sized from settings"""
+    return httpx.Client(**_http_client_options())
+
+def init_supabase_client():
+    """Create the shared Supabase client if it doesn't exist yet"""
+    global _client, _http_client
     if create_client is None:
         raise RuntimeError("supabase-py not installed. Install with `pip install supabase`")
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
+    with _client_lock:
+        if _client is None:
+            _http_client = _build_http_client()
+            _client = create_client(SUPABASE_URL, SUPABASE_KEY, options=SyncClientOptions(httpx_client=_http_client))
+    return _client
+
+def get_supabase_client():
+    """Return the shared Supabase client, initializing it on first use outside the app lifecycle"""
+    if _client is None:
+        return init_supabase_client()
+    return _client
+
+def close_supabase_client():
+    """Close the pooled connections and drop the shared client"""
+    global _client, _http_client
+    with _client_lock:
+        if _http_client is not None:
+            _http_client.close()
+        _client = None
+        _http_client = None
+
+async def init_async_supabase_client():
+    """Create the shared async Supabase client if it doesn't exist yet"""
+    global _async_client, _async_http_client
+    if acreate_client is None:
+        raise RuntimeError("supabase-py not installed. Install with `pip install supabase`")
+    async with _async_client_lock:
+        if _async_client is None:
+            _async_http_client = httpx.AsyncClient(**_http_client_options())
+            _async_client = await acreate_client(SUPABASE_URL, SUPABASE_KEY, options=AsyncClientOptions(httpx_client=_async_http_client))
+    return _async_client
+
+async def get_async_supabase_client():
+    """Return the shared async Supabase client, initializing it on first use"""
+    if _async_client is None:
+        return await init_async_supabase_client()
+    return _async_client
+
+async def close_async_supabase_client():
+    """Close the pooled async connections and drop the shared async client"""
+    global _async_client, _async_http_client
+    async with _async_client_lock:
+        if _async_http_client is not None:
+            await _async_http_client.aclose()
+        _async_client = None
+        _async_http_client = None
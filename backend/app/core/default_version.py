@@ -0,0 +1,57 @@
+"""
+Cached resolver for the default version that standalone entries (created without
+a version_id) are filed under
+Resolved with one query and kept across requests; writes that touch a
+version_number = 0 row or the cached version itself invalidate it, and it is
+re-resolved after DEFAULT_VERSION_TTL seconds regardless
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from .config import settings
+from .logger import get_logger
+from . import repository
+
+logger = get_logger(__name__)
+
+
+class DefaultVersionResolver:
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._version_id: Optional[int] = None
+        self._resolved_at: Optional[float] = None
+        self._generation = 0  # Bumped by invalidate() so an in-flight lookup doesn't store a stale id
+        self._lock = asyncio.Lock()
+
+    def _is_stale(self) -> bool:
+        return self._resolved_at is None or time.monotonic() - self._resolved_at > self.ttl_seconds
+
+    async def get(self, sb) -> Optional[int]:
+        """The default version_id, from memory unless stale or invalidated"""
+        if not self._is_stale():
+            return self._version_id
+        async with self._lock:
+            if self._is_stale():
+                generation = self._generation
+                version_id = await repository.get_default_version_id(sb)
+                # Nothing to cache while there are no versions: look again next time
+                if version_id is not None and generation == self._generation:
+                    self._version_id = version_id
+                    self._resolved_at = time.monotonic()
+                logger.debug("Resolved default version %s", version_id)
+                return version_id
+            return self._version_id
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._resolved_at = None
+
+    def rows_written(self, rows: List[Dict[str, Any]]) -> None:
+        """Invalidate if any written list_versions row is a version_number = 0 row or the cached version"""
+        if any(row.get('version_number') == 0 or (self._version_id is not None and row.get('version_id') == self._version_id)
+               for row in rows):
+            self.invalidate()
+
+
+default_version_resolver = DefaultVersionResolver(settings.DEFAULT_VERSION_TTL)
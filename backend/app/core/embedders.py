@@ -0,0 +1,121 @@
+"""
+Pluggable text embedders
+GeminiEmbedder talks to the Gemini embedding API (batch mode, retries with
+backoff on rate limits); HashEmbedder is a deterministic local stand-in for
+tests and benchmarks that needs no network or API key
+"""
+import hashlib
+import math
+import random
+import re
+import time
+from typing import Callable, List, Optional, Protocol, Tuple, Type, TypeVar
+
+from .config import settings
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar('T')
+
+DEFAULT_EMBEDDING_MODEL = "models/text-embedding-004"
+
+
+class Embedder(Protocol):
+    model_name: str
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """One embedding per text, in order"""
+        ...
+
+    def embed_query(self, text: str) -> List[float]:
+        ...
+
+    async def aembed_query(self, text: str) -> List[float]:
+        ...
+
+
+def with_backoff(fn: Callable[[], T], retry_on: Tuple[Type[BaseException], ...], max_retries: int, base_delay: float) -> T:
+    """Call fn, retrying retry_on errors with exponential backoff plus jitter"""
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except retry_on as e:
+            if attempt >= max_retries:
+                raise
+            delay = base_delay * (2 ** attempt) + random.uniform(0, base_delay)
+            logger.warning("Rate limited (%s), retrying in %.1fs", e, delay)
+            time.sleep(delay)
+            attempt += 1
+
+
+def _rate_limit_errors() -> Tuple[Type[BaseException], ...]:
+    from google.api_core import exceptions
+    return (exceptions.ResourceExhausted, exceptions.TooManyRequests, exceptions.ServiceUnavailable)
+
+
+class GeminiEmbedder:
+    def __init__(self, model_name: str = DEFAULT_EMBEDDING_MODEL, api_key: Optional[str] = None,
+                 max_retries: Optional[int] = None, base_delay: float = 1.0):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key or settings.GEMINI_API_KEY)
+        self._genai = genai
+        self.model_name = model_name
+        self.max_retries = settings.EMBEDDING_MAX_RETRIES if max_retries is None else max_retries
+        self.base_delay = base_delay
+        self._retry_on = _rate_limit_errors()
+
+    def _embed(self, content, task_type: str):
+        return with_backoff(
+            lambda: self._genai.embed_content(model=self.model_name, content=content, task_type=task_type),
+            self._retry_on, self.max_retries, self.base_delay,
+        )["embedding"]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # A list of contents is embedded in one batch request
+        return self._embed(texts, "RETRIEVAL_DOCUMENT")
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text, "retrieval_query")
+
+    async def aembed_query(self, text: str) -> List[float]:
+        # Query path: no backoff, the caller's stage timeout bounds the wait
+        response = await self._genai.embed_content_async(model=self.model_name, content=text, task_type="retrieval_query")
+        return response["embedding"]
+
+
+class HashEmbedder:
+    """
+    Feature-hashing embedder: each token adds +/-1 to a hashed bucket and the
+    vector is L2-normalised, so texts sharing words get similar vectors
+    latency simulates the per-call cost of a remote API in benchmarks
+    """
+
+    def __init__(self, dimensions: int = 768, latency: float = 0.0):
+        self.dimensions = dimensions
+        self.latency = latency
+        self.model_name = f"hash-{dimensions}"
+        self.calls = 0
+
+    def _vector(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        for token in re.findall(r"\w+", text.lower()):
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return self.embed_query(text)
@@ -0,0 +1,109 @@
+"""
+Cache of query embeddings for the RAG endpoint
+An in-process LRU with a TTL sits in front of an optional SQLite file, so
+repeated (and case/whitespace-variant) questions skip the embedding call
+Keys are the normalized query text plus the embedding model name
+"""
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .cache import TTLCache
+from .config import settings
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.,;:]+$")
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation"""
+    text = _WHITESPACE.sub(" ", text.strip().lower())
+    return _TRAILING_PUNCTUATION.sub("", text)
+
+
+def cache_key(text: str, model_name: str) -> str:
+    return hashlib.sha256(f"{model_name}\x00{normalize_query(text)}".encode("utf-8")).hexdigest()
+
+
+class QueryEmbeddingCache:
+    def __init__(self, max_entries: int, ttl_seconds: float, disk_path: Optional[str] = None):
+        self.disk_path = disk_path
+        self._memory: TTLCache[List[float]] = TTLCache(max_entries, ttl_seconds)
+        self._lock = threading.Lock()  # Guards the SQLite connection and the counters
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _disk(self) -> Optional[sqlite3.Connection]:
+        if self.disk_path and self._db is None:
+            self._db = sqlite3.connect(self.disk_path, check_same_thread=False)
+            self._db.execute(
+                "create table if not exists query_embeddings "
+                "(key text primary key, embedding text not null, stored_at real not null)"
+            )
+            self._db.commit()
+        return self._db
+
+    def get(self, text: str, model_name: str) -> Optional[List[float]]:
+        key = cache_key(text, model_name)
+        with self._lock:
+            embedding = self._memory.get(key)
+            if embedding is not None:
+                self.hits += 1
+                return embedding
+
+            db = self._disk()
+            if db is not None:
+                row = db.execute("select embedding, stored_at from query_embeddings where key = ?", (key,)).fetchone()
+                if row is not None and not self._memory.expired(row[1]):
+                    embedding = json.loads(row[0])
+                    self._memory.set(key, embedding, stored_at=row[1])
+                    self.disk_hits += 1
+                    return embedding
+
+            self.misses += 1
+            return None
+
+    def put(self, text: str, model_name: str, embedding: List[float]) -> None:
+        key = cache_key(text, model_name)
+        stored_at = time.time()
+        with self._lock:
+            self._memory.set(key, embedding, stored_at=stored_at)
+            db = self._disk()
+            if db is not None:
+                db.execute(
+                    "insert or replace into query_embeddings (key, embedding, stored_at) values (?, ?, ?)",
+                    (key, json.dumps(embedding), stored_at),
+                )
+                db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            db = self._disk()
+            if db is not None:
+                db.execute("delete from query_embeddings")
+                db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._memory),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+        }
+
+
+query_embedding_cache = QueryEmbeddingCache(
+    settings.QUERY_EMBEDDING_CACHE_SIZE,
+    settings.QUERY_EMBEDDING_CACHE_TTL,
+    settings.QUERY_EMBEDDING_CACHE_PATH,
+)
@@ -1,115 +1,328 @@
-import os
-import google.generativeai as genai
-from supabase import create_client, Client
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-# --- Setup Supabase ---
-supabase_url = os.getenv("SUPABASE_URL")
-supabase_key = os.getenv("SUPABASE_KEY")
-supabase: Client = create_client(supabase_url, supabase_key)
-
-# --- Setup Gemini ---
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-
-# --- Helper Function to Safely Fetch Data ---
-def safe_fetch(table_name, filter_col=None, filter_val=None):
-    query = supabase.table(table_name).select("*")
-    if filter_col and filter_val:
-        query = query.eq(filter_col, filter_val)
-    response = query.execute()
-    return response.data if response.data else []
-
-# --- Generate Combined Text for a Version ---
-def build_version_content(version):
-    version_id = version["version_id"]
-    # Ensure safe_fetch returns a list or is handled for indexing (e.g., [0])
-    request = safe_fetch("list_requests", "request_id", version["request_id"])
-    
-    # Safely access elements with a check for 'request' first
-    subdomain = safe_fetch("subdomains", "subdomain_id", request[0]["subdomain_id"]) if request and request[0].get("subdomain_id") else []
-    
-    # Safely access elements with a check for 'subdomain' first
-    domain = safe_fetch("domains", "domain_id", subdomain[0]["domain_id"]) if subdomain and subdomain[0].get("domain_id") else []
-
-    # Collect all entry tables
-    entry_tables = [
-        "call_list_entries",
-        "target_list_entries",
-        "event_invitation_entries",
-        "formulary_decision_maker_entries",
-        "digital_engagement_entries",
-        "idn_health_system_entries",
-        "high_value_prescriber_entries",
-        "work_logs"  # included logs as context
-    ]
+import argparse
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+from .config import settings
+from .database import get_supabase_client
+from .embedders import Embedder, GeminiEmbedder
+from .logger import configure_logging, get_logger
+from .registry import ENTRY_NATURAL_KEYS, SUBDOMAIN_ENTRY_TABLES
+from .version_store import replay, version_chain
+from .vector_index import update_snapshot
 
-    entries_summary = []
+logger = get_logger(__name__)
 
-    for table in entry_tables:
-        rows = safe_fetch(table, "version_id", version_id)
-        if not rows:
-            continue
+# Rows per PostgREST page and ids per in_() filter (keeps URLs short)
+FETCH_PAGE_SIZE = 1000
+FETCH_IDS_PER_QUERY = 200
+
+# --- Helper Functions to Fetch Rows Past PostgREST's max-rows ---
+def _fetch_pages(build_query):
+    """Every row of the (uniquely ordered) query build_query() returns, one FETCH_PAGE_SIZE page at a time"""
+    rows = []
+    start = 0
+    while True:
+        page = build_query().range(start, start + FETCH_PAGE_SIZE - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < FETCH_PAGE_SIZE:
+            return rows
+        start += FETCH_PAGE_SIZE
+
+def fetch_in(table_name, column, values, order_by, columns="*", **eq):
+    """
+    All rows of table_name whose column is in values (and whose other columns equal eq)
+    One query per FETCH_IDS_PER_QUERY ids, paged past PostgREST's max-rows limit;
+    order_by is a column or a list of columns that together are unique
+    """
+    order_columns = [order_by] if isinstance(order_by, str) else order_by
+    values = sorted(set(v for v in values if v is not None))
+    rows = []
+    for i in range(0, len(values), FETCH_IDS_PER_QUERY):
+        chunk = values[i:i + FETCH_IDS_PER_QUERY]
+
+        def build_query():
+            query = get_supabase_client().table(table_name).select(columns).in_(column, chunk)
+            for eq_column, value in eq.items():
+                query = query.eq(eq_column, value)
+            for order_column in order_columns:
+                query = query.order(order_column)
+            return query
+        rows.extend(_fetch_pages(build_query))
+    return rows
+
+def _group_by(rows, column):
+    grouped = {}
+    for row in rows:
+        grouped.setdefault(row[column], []).append(row)
+    return grouped
+
+def fetch_version_entries(table, versions):
+    """
+    {version_id: entry rows} of versions whose items live in table
+    Delta versions (VERSION_STORAGE=delta) only store their changes, so their full
+    contents are replayed from their chain: the chain's rows and removals are fetched
+    together with everyone else's, and the chains come from one list_versions query
+    """
+    delta_request_ids = [v["request_id"] for v in versions if v.get("parent_version_id") is not None]
+    versions_by_id = {v["version_id"]: v for v in fetch_in("list_versions", "request_id", delta_request_ids, "version_id")}
+    chains = {
+        v["version_id"]: [c["version_id"] for c in version_chain(v, versions_by_id)] if v.get("parent_version_id") is not None else [v["version_id"]]
+        for v in versions
+    }
+    rows_by_version = _group_by(fetch_in(table, "version_id", [i for chain in chains.values() for i in chain], "entry_id"), "version_id")
+    removal_ids = [i for chain in chains.values() for i in chain[1:]]
+    removals_by_version = _group_by(fetch_in("list_version_removals", "version_id", removal_ids, ["version_id", "natural_key"]), "version_id")
+
+    entries = {}
+    for version_id, chain in chains.items():
+        if len(chain) == 1:
+            entries[version_id] = rows_by_version.get(version_id, [])
+        else:
+            stored = [row for i in chain for row in rows_by_version.get(i, [])]
+            removals = [row for i in chain[1:] for row in removals_by_version.get(i, [])]
+            entries[version_id] = replay(chain, stored, removals, ENTRY_NATURAL_KEYS[table])
+    return entries
+
+# --- Generate Combined Text for a Batch of Versions ---
+def build_version_contents(versions):
+    """
+    Build the embedding text of every version in one pass
+    Requests, subdomains and domains are prefetched with one query each, and entries
+    come only from the entry table each version's subdomain uses (plus work_logs),
+    fetched with version_id IN (...) and grouped in memory; delta versions get
+    their full contents (fetch_version_entries)
+    Returns {version_id: content}
+    """
+    requests = {r["request_id"]: r for r in fetch_in("list_requests", "request_id", [v["request_id"] for v in versions], "request_id")}
+    subdomains = {s["subdomain_id"]: s for s in fetch_in("subdomains", "subdomain_id", [r.get("subdomain_id") for r in requests.values()], "subdomain_id")}
+    domains = {d["domain_id"]: d for d in fetch_in("domains", "domain_id", [s.get("domain_id") for s in subdomains.values()], "domain_id")}
+
+    # Only the entry table matching each version's subdomain holds its items
+    versions_by_table = {}
+    for v in versions:
+        request = requests.get(v["request_id"])
+        subdomain = subdomains.get(request.get("subdomain_id")) if request else None
+        entry_table = SUBDOMAIN_ENTRY_TABLES.get(subdomain["subdomain_name"]) if subdomain else None
+        if entry_table:
+            versions_by_table.setdefault(entry_table, []).append(v)
 
-        # Convert each row into readable text
-        formatted = [", ".join([f"{k}: {v}" for k, v in row.items() if v is not None]) for row in rows]
-        entries_summary.append(f"Table: {table}\n" + "\n".join(formatted))
-
-    entries_summary_content = (
-        '\n\n'.join(entries_summary) 
-        if entries_summary 
-        else 'No entries for this version.'
-    )
-
-    # Combine all parts
-    content = f"""
-Domain: {domain[0]['domain_name'] if domain else 'N/A'}
-Subdomain: {subdomain[0]['subdomain_name'] if subdomain else 'N/A'}
-Request Purpose: {request[0]['request_purpose'] if request else 'N/A'}
-Version: {version['version_number']} | Change: {version['change_type']}
-Created By: {version['created_by']}
-Change Rationale: {version['change_rationale']}
+    entries_by_table = {table: fetch_version_entries(table, table_versions) for table, table_versions in versions_by_table.items()}
+    # included logs as context
+    entries_by_table["work_logs"] = _group_by(fetch_in("work_logs", "version_id", [v["version_id"] for v in versions], "log_id"), "version_id")
+
+    contents = {}
+    for v in versions:
+        request = requests.get(v["request_id"])
+        subdomain = subdomains.get(request.get("subdomain_id")) if request else None
+        domain = domains.get(subdomain.get("domain_id")) if subdomain else None
+
+        entries_summary = []
+        for table, rows_by_version in entries_by_table.items():
+            rows = rows_by_version.get(v["version_id"])
+            if not rows:
+                continue
+
+            # Convert each row into readable text
+            formatted = [", ".join([f"{k}: {val}" for k, val in row.items() if val is not None]) for row in rows]
+            entries_summary.append(f"Table: {table}\n" + "\n".join(formatted))
+
+        entries_summary_content = (
+            '\n\n'.join(entries_summary) 
+            if entries_summary 
+            else 'No entries for this version.'
+        )
+
+        # Combine all parts
+        content = f"""
+Domain: {domain['domain_name'] if domain else 'N/A'}
+Subdomain: {subdomain['subdomain_name'] if subdomain else 'N/A'}
+Request Purpose: {request['request_purpose'] if request else 'N/A'}
+Version: {v['version_number']} | Change: {v['change_type']}
+Created By: {v['created_by']}
+Change Rationale: {v['change_rationale']}
 
 Entries Summary:
 {entries_summary_content}
 """
-    return content.strip()
+        contents[v["version_id"]] = content.strip()
+    return contents
 
+def build_version_content(version):
+    """Embedding text for a single version"""
+    return build_version_contents([version])[version["version_id"]]
 
-# Main Embedding Generator 
-def generate_embeddings_for_all_versions():
-    versions = safe_fetch("list_versions")
 
-    print(f"Found {len(versions)} list versions to process...\n")
+# --- Incremental Indexing Helpers ---
+def content_hash(content):
+    """Stable fingerprint of a version's rebuilt content"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def load_watermark():
+    """
+    Last indexed state ({'version_id', 'updated_at'}), or None before the first run
+    Watermarks written before updated_at was tracked fall back to the version's created_at
+    """
+    try:
+        with open(settings.EMBEDDINGS_WATERMARK_PATH) as f:
+            watermark = json.load(f)
+    except FileNotFoundError:
+        return None
+    watermark.setdefault("updated_at", watermark.get("created_at"))
+    return watermark
+
+def save_watermark(watermark):
+    with open(settings.EMBEDDINGS_WATERMARK_PATH, "w") as f:
+        json.dump({"version_id": watermark["version_id"], "updated_at": watermark.get("updated_at")}, f)
+
+def fetch_versions(after_version_id=None, modified_since=None):
+    """
+    list_versions in version_id order: every version, or only those created past
+    after_version_id or modified (updated_at, sql/list_versions_updated_at.sql) after modified_since
+    """
+    def query():
+        return get_supabase_client().table("list_versions").select("*")
 
+    if after_version_id is None and modified_since is None:
+        return _fetch_pages(lambda: query().order("version_id"))
+    versions = {}
+    if after_version_id is not None:
+        versions.update((v["version_id"], v) for v in _fetch_pages(lambda: query().gt("version_id", after_version_id).order("version_id")))
+    if modified_since is not None:
+        versions.update((v["version_id"], v) for v in _fetch_pages(lambda: query().gt("updated_at", modified_since).order("version_id")))
+    return [versions[version_id] for version_id in sorted(versions)]
+
+def fetch_stored_hashes(version_ids):
+    """content_hash of the embeddings already stored for these versions"""
+    rows = fetch_in("list_embeddings", "entity_id", version_ids, "entity_id", columns="entity_id, content_hash", entity_type="list_version")
+    return {row["entity_id"]: row.get("content_hash") for row in rows}
+
+def next_watermark(watermark, versions, failed_ids):
+    """
+    Watermark after a run over versions: version_id advances over the new versions
+    indexed before the first failure, updated_at up to (not including) the earliest
+    change that failed, so failed versions are picked up again next run
+    """
+    watermark = dict(watermark or {"version_id": None, "updated_at": None})
     for v in versions:
-        try:
-            print(f"🧩 Processing version ID {v['version_id']} ...")
-            content = build_version_content(v)
-
-            # Generate embedding
-            embedding_response = genai.embed_content(
-                model="models/text-embedding-004",
-                content=content,
-                task_type="RETRIEVAL_DOCUMENT"
-            )
-            embedding = embedding_response["embedding"]
-
-            # Upsert into embeddings table
-            supabase.table("list_embeddings").upsert({
-                "entity_type": "list_version",
-                "entity_id": v["version_id"],
-                "version_id": v["version_id"],
-                "content": content,
-                "embedding": embedding
-            }).execute()
-
-            print(f"Stored embedding for version {v['version_id']}\n")
+        if watermark["version_id"] is not None and v["version_id"] <= watermark["version_id"]:
+            continue
+        if v["version_id"] in failed_ids:
+            break
+        watermark["version_id"] = v["version_id"]
+
+    # ISO timestamps from the same database compare correctly as strings
+    failed_at = min((v["updated_at"] for v in versions if v["version_id"] in failed_ids and v.get("updated_at")), default=None)
+    indexed_at = [
+        v["updated_at"] for v in versions
+        if v["version_id"] not in failed_ids and v.get("updated_at") and (failed_at is None or v["updated_at"] < failed_at)
+    ]
+    if watermark["updated_at"]:
+        indexed_at.append(watermark["updated_at"])
+    if indexed_at:
+        watermark["updated_at"] = max(indexed_at)
+    return watermark
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _embed_and_store(embedder, batch):
+    """Embed one batch of (version, content, digest) in a single API call and upsert it in one statement"""
+    embeddings = embedder.embed_documents([content for _, content, _ in batch])
+    rows = [
+        {
+            "entity_type": "list_version",
+            "entity_id": v["version_id"],
+            "version_id": v["version_id"],
+            "content": content,
+            "content_hash": digest,
+            "embedding": embedding
+        }
+        for (v, content, digest), embedding in zip(batch, embeddings)
+    ]
+    get_supabase_client().table("list_embeddings").upsert(rows).execute()
+    return rows
+
+
+# Main Embedding Generator 
+def generate_embeddings(incremental=True, embedder: Optional[Embedder] = None, batch_size=None, concurrency=None,
+                        on_stored: Optional[Callable[[List[dict]], None]] = None):
+    """
+    Embed list versions and upsert them into list_embeddings
+    Versions whose rebuilt content hashes to the stored content_hash are skipped.
+    Changed versions are embedded batch_size at a time (one embedding call and one
+    bulk upsert per batch) with at most `concurrency` batches in flight.
+    In incremental mode only versions created past the persisted watermark or
+    modified since it (list_versions.updated_at) are considered; the watermark
+    advances up to the first failed version so it is retried next run
+    on_stored receives every upserted row once the run finishes (e.g. to refresh the
+    local vector index)
+    """
+    embedder = embedder or GeminiEmbedder()
+    batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+    concurrency = concurrency or settings.EMBEDDING_CONCURRENCY
 
+    watermark = load_watermark() if incremental else None
+    versions = fetch_versions(watermark["version_id"], watermark["updated_at"]) if watermark else fetch_versions()
+    stored_hashes = fetch_stored_hashes([v["version_id"] for v in versions])
+
+    logger.info("Found %d list versions to process", len(versions))
+
+    stats = {"embedded": 0, "unchanged": 0, "failed": 0}
+    failed_ids = set()
+    stored_rows = []
+    pending = []
+    for chunk in _chunks(versions, batch_size):
+        try:
+            contents = build_version_contents(chunk)
         except Exception as e:
-            print(f"Error processing version {v.get('version_id', 'N/A')}: {e}")
+            failed_ids.update(v["version_id"] for v in chunk)
+            logger.exception("Error building content for %d versions: %s", len(chunk), e)
+            continue
+        for v in chunk:
+            content = contents[v["version_id"]]
+            digest = content_hash(content)
+            if stored_hashes.get(v["version_id"]) == digest:
+                stats["unchanged"] += 1
+            else:
+                pending.append((v, content, digest))
+
+    batches = list(_chunks(pending, batch_size))
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [(batch, pool.submit(_embed_and_store, embedder, batch)) for batch in batches]
+        for batch, future in futures:
+            try:
+                stored = future.result()
+                stored_rows.extend(stored)
+                stats["embedded"] += len(stored)
+                logger.info("Stored embeddings for %d versions", len(stored))
+            except Exception as e:
+                failed_ids.update(v["version_id"] for v, _, _ in batch)
+                logger.exception("Error embedding batch of %d versions: %s", len(batch), e)
+    stats["failed"] = len(failed_ids)
+
+    if on_stored and stored_rows:
+        on_stored(stored_rows)
+
+    # Advance the watermark over what is now indexed
+    new_watermark = next_watermark(watermark, versions, failed_ids)
+    if new_watermark["version_id"] is not None:
+        save_watermark(new_watermark)
+
+    logger.info("Embedded %(embedded)d, unchanged %(unchanged)d, failed %(failed)d", stats)
+    return stats
+
+def generate_embeddings_for_all_versions():
+    """Full pass over every version (still skipping unchanged content)"""
+    return generate_embeddings(incremental=False)
 
 if __name__ == "__main__":
-    generate_embeddings_for_all_versions()
+    parser = argparse.ArgumentParser(description="Generate list_version embeddings")
+    parser.add_argument("--full", action="store_true", help="Rescan every version instead of only those created or modified since the watermark")
+    parser.add_argument("--update-index", action="store_true", default=settings.RETRIEVER_BACKEND == "local",
+                        help="Merge new embeddings into the local vector index snapshot (default when RETRIEVER_BACKEND=local)")
+    args = parser.parse_args()
+
+    configure_logging()
+    generate_embeddings(incremental=not args.full, on_stored=update_snapshot if args.update_index else None)
@@ -0,0 +1,76 @@
+"""
+Application logging: level and format come from Settings, and every record
+carries the correlation id of the request that produced it
+"""
+import contextvars
+import json
+import logging
+import uuid
+from typing import Optional
+
+# Correlation id of the request currently being handled ('-' outside requests)
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar('request_id', default='-')
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+_TEXT_FORMAT = '%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s'
+
+
+class RequestIdFilter(logging.Filter):
+    """Attach the current request id to every record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', '-'),
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None) -> None:
+    """
+    Install the root handler once per process
+    level/fmt default to settings.LOG_LEVEL and settings.LOG_FORMAT ('text' or 'json')
+    """
+    from .config import settings
+
+    level = (level or settings.LOG_LEVEL).upper()
+    fmt = fmt or settings.LOG_FORMAT
+
+    handler = logging.StreamHandler()
+    handler.addFilter(RequestIdFilter())
+    handler.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(_TEXT_FORMAT))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        if getattr(existing, '_app_handler', False):
+            root.removeHandler(existing)
+    handler._app_handler = True
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    # httpx logs every PostgREST call at INFO; only surface those when debugging
+    for noisy in ('httpx', 'httpcore'):
+        logging.getLogger(noisy).setLevel(level if level == 'DEBUG' else 'WARNING')
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(name)
+
+
+def new_request_id(incoming: Optional[str] = None) -> str:
+    """Reuse the caller's correlation id when it sent one, otherwise mint a new one"""
+    return incoming or uuid.uuid4().hex
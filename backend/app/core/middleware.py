@@ -0,0 +1,35 @@
+"""
+ASGI middleware
+Written as plain ASGI rather than @app.middleware('http'): BaseHTTPMiddleware wraps
+receive in a way that hides client disconnects from the route, which the RAG
+endpoints rely on to cancel in-flight LLM calls
+"""
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .logger import REQUEST_ID_HEADER, new_request_id, request_id_var
+
+
+class CorrelationIdMiddleware:
+    """Tag every request (and its log records) with a correlation id, echoed in the response headers"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = new_request_id(Headers(scope=scope).get(REQUEST_ID_HEADER))
+        token = request_id_var.set(request_id)
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[REQUEST_ID_HEADER] = request_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
@@ -0,0 +1,427 @@
+"""
+The RAG chatbot engine shared by the FastAPI app and the CLI (app/core/query.py)
+Embedder, chat client, retriever and caches are injected (or created lazily from
+Settings on first use). Importing this module stays cheap: langgraph, the Gemini
+SDK and openai are imported, and the graph compiled once, by warm_up() or the
+first question, so CRUD-only workers never pay for them
+"""
+import asyncio
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, TypedDict
+
+from .config import settings
+from .embedders import Embedder, GeminiEmbedder
+from .embedding_cache import QueryEmbeddingCache, query_embedding_cache
+from .logger import get_logger
+from .response_cache import ResponseCache, doc_entity_id, response_cache, response_cache_key
+from .retrievers import Retriever, get_retriever
+from .tracing import observe_stage, record_request, traced
+
+logger = get_logger(__name__)
+
+CHAT_MODEL = "gpt-3.5-turbo"
+MATCH_THRESHOLD = 0.35  # Passed to the retriever
+MATCH_COUNT = 8
+MIN_SIMILARITY = 0.4  # Documents at or below this are dropped as irrelevant
+CONTEXT_DOCS = 3  # Retrieved documents shown to the model
+
+SYSTEM_PROMPT = """You are a helpful pharmaceutical data assistant with excellent memory.
+
+CRITICAL RULES:
+1. ALWAYS use conversation history to understand pronouns and references:
+   - "he/she/they" → refer to people mentioned before
+   - "that/it/this" → refer to things just discussed
+   - "why/reason" → explain the last topic discussed
+   - "when/where" → provide details about last mentioned item
+
+2. When asked about specific people (e.g., "Dr. Rohan", "Rahul"):
+   - Search the documents for that exact name
+   - If found, provide ALL available details (email, phone, specialty, etc.)
+   - If not found, clearly say "I don't have information about [name] in the current data"
+
+3. Answer style:
+   - Be conversational and natural
+   - Don't repeat information already shared unless asked
+   - If the question is a follow-up, directly answer without restating previous info
+   - Keep answers concise (2-4 sentences)
+
+4. If no relevant info exists, say: "I don't have that information in the current context."
+"""
+
+ERROR_ANSWER = "I encountered an error. Please try again."
+
+
+# Define Graph State for RAG
+class RAGState(TypedDict):
+    question: str
+    chat_history: List[Dict[str, str]]
+    query_embedding: List[float]
+    retrieved_docs: List[Dict[str, Any]]
+    context_text: str
+    final_answer: str
+    last_retrieved_content: str  # Store last retrieved docs for follow-ups
+    answer_cached: bool  # final_answer came from the response cache
+    embedding_cached: bool  # query_embedding came from the query-embedding cache
+    token_usage: Dict[str, int]  # prompt/completion tokens of the chat completion
+    timings: Dict[str, float]  # Milliseconds per pipeline stage
+
+
+def build_embedding_query(question: str, chat_history: List[Dict[str, str]]) -> str:
+    """Text to embed: short follow-ups are merged with the previous question for better context"""
+    if chat_history and len(question.split()) < 5:
+        return f"{chat_history[-1]['user']} {question}"
+    return question
+
+
+def answer_messages(state: RAGState) -> List[Dict[str, str]]:
+    user_prompt = f"""{state['context_text']}
+
+Answer the current question naturally, using conversation history to understand context."""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def answer_cache_key(state: RAGState) -> Optional[str]:
+    """Response-cache key for this state, or None when the answer depends on carried-over context"""
+    # Same question, recent history and retrieved documents -> same answer
+    if state["retrieved_docs"] or not state.get("last_retrieved_content"):
+        return response_cache_key(state["question"], state.get("chat_history"), state["retrieved_docs"])
+    return None
+
+
+def _token_usage(usage) -> Dict[str, int]:
+    if usage is None:
+        return {}
+    return {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens}
+
+
+async def with_timeout(stage: str, awaitable, timeout: float):
+    """Await one pipeline stage, failing it with a TimeoutError that names the stage"""
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"{stage} timed out after {timeout:.1f}s") from None
+
+
+class RAGEngine:
+    def __init__(self, embedder: Optional[Embedder] = None, chat_client=None, retriever: Optional[Retriever] = None,
+                 embedding_cache: Optional[QueryEmbeddingCache] = None, answer_cache: Optional[ResponseCache] = None,
+                 chat_model: str = CHAT_MODEL):
+        self._embedder = embedder
+        self._chat_client = chat_client
+        self._retriever = retriever
+        self.embedding_cache = embedding_cache or query_embedding_cache
+        self.answer_cache = answer_cache or response_cache
+        self.chat_model = chat_model
+        self._graph = None
+        self._context_graph = None
+        self._graph_lock = threading.Lock()
+        self._warm_up_lock = asyncio.Lock()
+        self._ready = False
+
+    # --- Clients (created on first use unless injected) ---
+    @property
+    def embedder(self) -> Embedder:
+        if self._embedder is None:
+            self._embedder = GeminiEmbedder()
+        return self._embedder
+
+    @property
+    def chat_client(self):
+        if self._chat_client is None:
+            from openai import AsyncOpenAI
+
+            self._chat_client = AsyncOpenAI(api_key=settings.CHATAI_API_KEY)
+        return self._chat_client
+
+    @property
+    def retriever(self) -> Retriever:
+        if self._retriever is None:
+            self._retriever = get_retriever()
+        return self._retriever
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            self._compile()
+        return self._graph
+
+    @property
+    def context_graph(self):
+        if self._context_graph is None:
+            self._compile()
+        return self._context_graph
+
+    def _compile(self) -> None:
+        with self._graph_lock:
+            if self._graph is None:
+                self._graph = self._build_graph()
+                self._context_graph = self._build_graph(with_answer=False)
+
+    def _warm_up_sync(self) -> None:
+        started = time.perf_counter()
+        self._compile()
+        self.embedder
+        self.chat_client
+        warm_up = getattr(self.retriever, "warm_up", None)
+        if warm_up is not None:
+            warm_up()
+        logger.info("RAG engine ready in %.0f ms", (time.perf_counter() - started) * 1000)
+
+    async def warm_up(self) -> None:
+        """Import the SDKs, compile the graph, create the clients and load the index (off the event loop, once)"""
+        if self._ready:
+            return
+        async with self._warm_up_lock:
+            if not self._ready:
+                await asyncio.to_thread(self._warm_up_sync)
+                self._ready = True
+
+    async def aclose(self) -> None:
+        if self._chat_client is not None and hasattr(self._chat_client, "close"):
+            await self._chat_client.close()
+
+    # --- Pipeline nodes ---
+    async def embed_query(self, state: RAGState):
+        """Generate embedding considering conversation context."""
+        try:
+            question_text = build_embedding_query(state["question"], state.get("chat_history"))
+            model_name = self.embedder.model_name
+            # Repeated questions are served from the cache without an embedding call
+            embedding = self.embedding_cache.get(question_text, model_name)
+            state["embedding_cached"] = embedding is not None
+            if embedding is None:
+                embedding = await with_timeout("embed_query", self.embedder.aembed_query(question_text), settings.RAG_EMBED_TIMEOUT)
+                if embedding:
+                    self.embedding_cache.put(question_text, model_name, embedding)
+            state["query_embedding"] = embedding
+        except Exception as e:
+            logger.exception("Error in embed_query: %s", e)
+            state["query_embedding"] = []
+        return state
+
+    async def retrieve_docs(self, state: RAGState):
+        """Retrieve documents with smart filtering."""
+        try:
+            query_vec = state["query_embedding"]
+            if not query_vec:
+                state["retrieved_docs"] = []
+                return state
+
+            all_docs = await with_timeout(
+                "retrieve_docs",
+                self.retriever.asearch(query_vec, match_threshold=MATCH_THRESHOLD, match_count=MATCH_COUNT),
+                settings.RAG_RETRIEVE_TIMEOUT
+            )
+
+            # Filter for relevance
+            relevant_docs = [d for d in all_docs if d.get('similarity', 0) > MIN_SIMILARITY]
+            state["retrieved_docs"] = relevant_docs
+
+        except Exception as e:
+            logger.exception("Error in retrieve_docs: %s", e)
+            state["retrieved_docs"] = []
+        return state
+
+    def compose_context(self, state: RAGState):
+        """Smart context composition with memory."""
+        try:
+            context_parts = []
+
+            # Add recent conversation history (last 2 exchanges)
+            if state.get("chat_history") and len(state["chat_history"]) > 0:
+                recent_history = state["chat_history"][-2:]
+                history_text = "\n".join([
+                    f"Previous Q: {msg['user']}\nPrevious A: {msg['assistant']}"
+                    for msg in recent_history
+                ])
+                context_parts.append(f"=== CONVERSATION HISTORY ===\n{history_text}\n")
+
+            # Add newly retrieved documents OR use cached content for follow-ups
+            if state["retrieved_docs"]:
+                docs_text = "\n\n---\n\n".join([
+                    f"[Document {i+1} - Similarity: {r.get('similarity', 0):.2f}]\n{r.get('content', '')}"
+                    for i, r in enumerate(state["retrieved_docs"][:CONTEXT_DOCS])
+                ])
+                context_parts.append(f"=== RELEVANT INFORMATION ===\n{docs_text}\n")
+                # Cache this for follow-ups
+                state["last_retrieved_content"] = docs_text
+            elif state.get("last_retrieved_content"):
+                # Use cached content for follow-up questions
+                context_parts.append(f"=== RELEVANT INFORMATION (from previous query) ===\n{state['last_retrieved_content']}\n")
+
+            if context_parts:
+                state["context_text"] = "\n".join(context_parts) + f"\n=== CURRENT QUESTION ===\n{state['question']}"
+            else:
+                state["context_text"] = f"No relevant information available.\n\nQuestion: {state['question']}"
+
+        except Exception as e:
+            logger.exception("Error in compose_context: %s", e)
+            state["context_text"] = state["question"]
+        return state
+
+    async def generate_answer(self, state: RAGState):
+        """Generate intelligent, context-aware answers."""
+        cache_key = answer_cache_key(state)
+        if cache_key is not None:
+            cached = self.answer_cache.get(cache_key)
+            if cached is not None:
+                state["final_answer"] = cached
+                state["answer_cached"] = True
+                return state
+
+        try:
+            response = await with_timeout(
+                "generate_answer",
+                self.chat_client.chat.completions.create(
+                    model=self.chat_model,
+                    messages=answer_messages(state),
+                    temperature=0.5,
+                    max_tokens=250
+                ),
+                settings.RAG_GENERATE_TIMEOUT
+            )
+
+            state["final_answer"] = response.choices[0].message.content
+            state["token_usage"] = _token_usage(getattr(response, "usage", None))
+            if cache_key is not None:
+                self.answer_cache.put(cache_key, state["final_answer"], state["retrieved_docs"])
+
+        except Exception as e:
+            logger.exception("Error in generate_answer: %s", e)
+            state["final_answer"] = ERROR_ANSWER
+        return state
+
+    # Build the LangGraph RAG Workflow
+    def _build_graph(self, with_answer: bool = True):
+        """Full pipeline, or (with_answer=False) everything up to the prompt for streaming"""
+        from langgraph.graph import StateGraph, START, END
+
+        builder = StateGraph(RAGState)
+        # Every node is timed into rag_stage_duration_seconds and state["timings"]
+        builder.add_node("embed_query", traced("embed_query", self.embed_query))
+        builder.add_node("retrieve_docs", traced("retrieve_docs", self.retrieve_docs))
+        builder.add_node("compose_context", traced("compose_context", self.compose_context))
+
+        builder.add_edge(START, "embed_query")
+        builder.add_edge("embed_query", "retrieve_docs")
+        builder.add_edge("retrieve_docs", "compose_context")
+        if with_answer:
+            builder.add_node("generate_answer", traced("generate_answer", self.generate_answer))
+            builder.add_edge("compose_context", "generate_answer")
+            builder.add_edge("generate_answer", END)
+        else:
+            builder.add_edge("compose_context", END)
+        return builder.compile()
+
+    # --- Entry points ---
+    @staticmethod
+    def initial_state(question: str, chat_history: Optional[List[Dict[str, str]]] = None,
+                      last_retrieved_content: str = "") -> RAGState:
+        return {
+            "question": question,
+            "chat_history": chat_history or [],
+            "query_embedding": [],
+            "retrieved_docs": [],
+            "context_text": "",
+            "final_answer": "",
+            "last_retrieved_content": last_retrieved_content,
+            "answer_cached": False,
+            "embedding_cached": False,
+            "token_usage": {},
+            "timings": {}
+        }
+
+    async def ask(self, state: RAGState, endpoint: str = "query") -> Tuple[RAGState, Dict[str, Any]]:
+        """Run the whole pipeline; returns the final state and its timings report"""
+        await self.warm_up()
+        started = time.perf_counter()
+        final_state = await self.graph.ainvoke(state)
+        return final_state, record_request(final_state, endpoint, time.perf_counter() - started)
+
+    async def stream(self, state: RAGState, endpoint: str = "query_stream") -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        (event, data) pairs for one question:
+          retrieval -> {retrieved_count, docs: [{entity_id, version_id, similarity}]} as soon as documents are known
+          token     -> {delta} for each completion chunk
+          done      -> {answer, retrieved_count, cached, timings: {retrieval_ms, first_token_ms, total_ms, stages_ms, ...}}
+          error     -> {detail} instead of done when the pipeline fails
+        Cancelling the consumer cancels whatever is being awaited
+        """
+        await self.warm_up()
+        started = time.perf_counter()
+        elapsed_ms = lambda: round((time.perf_counter() - started) * 1000, 1)
+        timings = {}
+
+        try:
+            state = await self.context_graph.ainvoke(state)
+        except Exception as e:
+            logger.exception("Error preparing streamed answer: %s", e)
+            yield "error", {"detail": str(e)}
+            return
+        docs = state["retrieved_docs"]
+        timings["retrieval_ms"] = elapsed_ms()
+        yield "retrieval", {
+            "retrieved_count": len(docs),
+            "docs": [{"entity_id": doc_entity_id(d), "version_id": d.get("version_id"), "similarity": d.get("similarity")} for d in docs]
+        }
+
+        generate_started = time.perf_counter()
+        cache_key = answer_cache_key(state)
+        answer = self.answer_cache.get(cache_key) if cache_key is not None else None
+        cached = answer is not None
+        if cached:
+            timings["first_token_ms"] = elapsed_ms()
+            yield "token", {"delta": answer}
+        else:
+            parts = []
+            stream = None
+            try:
+                stream = await with_timeout(
+                    "generate_answer",
+                    self.chat_client.chat.completions.create(
+                        model=self.chat_model,
+                        messages=answer_messages(state),
+                        temperature=0.5,
+                        max_tokens=250,
+                        stream=True,
+                        stream_options={"include_usage": True}
+                    ),
+                    settings.RAG_GENERATE_TIMEOUT
+                )
+                chunks = stream.__aiter__()
+                while True:
+                    # The generate timeout bounds the wait for each chunk, so a stalled stream fails fast
+                    try:
+                        chunk = await with_timeout("generate_answer", chunks.__anext__(), settings.RAG_GENERATE_TIMEOUT)
+                    except StopAsyncIteration:
+                        break
+                    if getattr(chunk, "usage", None):
+                        state["token_usage"] = _token_usage(chunk.usage)
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if not delta:
+                        continue
+                    if not parts:
+                        timings["first_token_ms"] = elapsed_ms()
+                    parts.append(delta)
+                    yield "token", {"delta": delta}
+            except Exception as e:
+                logger.exception("Error streaming answer: %s", e)
+                yield "error", {"detail": ERROR_ANSWER}
+                return
+            finally:
+                # Also runs on cancellation (client disconnect), releasing the upstream connection
+                if stream is not None and hasattr(stream, "close"):
+                    await stream.close()
+            answer = "".join(parts)
+            if cache_key is not None and answer:
+                self.answer_cache.put(cache_key, answer, docs)
+
+        observe_stage(state, "generate_answer", time.perf_counter() - generate_started)
+        state["answer_cached"] = cached
+        timings.update(record_request(state, endpoint, time.perf_counter() - started))
+        logger.info("Streamed answer: %s", timings)
+        yield "done", {"answer": answer, "retrieved_count": len(docs), "cached": cached, "timings": timings}
@@ -0,0 +1,136 @@
+"""
+In-memory registry of subdomains and the entry tables that hold their items
+Loaded once at startup from the subdomains table, refreshed after SUBDOMAIN_REGISTRY_TTL
+seconds or whenever the /subdomains CRUD routes write
+"""
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Type
+
+from pydantic import BaseModel
+
+from app.schemas import (
+    CallListEntries,
+    CompetitorTargetEntries,
+    DigitalEngagementEntries,
+    EventInvitationEntries,
+    FormularyDecisionMakerEntries,
+    HighValuePrescriberEntries,
+    IdnHealthSystemEntries,
+    TargetListEntries,
+)
+from .config import settings
+from .logger import get_logger
+from . import repository
+
+logger = get_logger(__name__)
+
+# Table mapping for subdomain entries
+SUBDOMAIN_ENTRY_TABLES = {
+    'Target Lists': 'target_list_entries',
+    'Call Lists': 'call_list_entries',
+    'Formulary Decision-Maker Lists': 'formulary_decision_maker_entries',
+    'IDN/Health System Lists': 'idn_health_system_entries',
+    'Event Invitation Lists': 'event_invitation_entries',
+    'Digital Engagement Lists': 'digital_engagement_entries',
+    'High-Value Prescriber Lists': 'high_value_prescriber_entries',
+    'Competitor Target Lists': 'competitor_target_entries'
+}
+
+ENTRY_TABLE_SCHEMAS: Dict[str, Type[BaseModel]] = {
+    'target_list_entries': TargetListEntries,
+    'call_list_entries': CallListEntries,
+    'formulary_decision_maker_entries': FormularyDecisionMakerEntries,
+    'idn_health_system_entries': IdnHealthSystemEntries,
+    'event_invitation_entries': EventInvitationEntries,
+    'digital_engagement_entries': DigitalEngagementEntries,
+    'high_value_prescriber_entries': HighValuePrescriberEntries,
+    'competitor_target_entries': CompetitorTargetEntries,
+}
+
+# Column that identifies the same person/organisation across versions of a list
+ENTRY_NATURAL_KEYS: Dict[str, str] = {
+    'target_list_entries': 'hcp_id',
+    'call_list_entries': 'hcp_id',
+    'formulary_decision_maker_entries': 'contact_id',
+    'idn_health_system_entries': 'system_id',
+    'event_invitation_entries': 'invitee_id',
+    'digital_engagement_entries': 'contact_id',
+    'high_value_prescriber_entries': 'hcp_id',
+    'competitor_target_entries': 'hcp_id',
+}
+
+
+class SubdomainInfo(NamedTuple):
+    subdomain_id: int
+    subdomain_name: str
+    entry_table: Optional[str]
+    schema: Optional[Type[BaseModel]]
+    row: Dict[str, Any]  # The subdomains row as returned by the database
+
+
+class SubdomainRegistry:
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._by_id: Dict[int, SubdomainInfo] = {}
+        self._missing: Set[Optional[int]] = set()  # Ids the last load didn't have, so they don't each trigger a reload
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def _is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl_seconds
+
+    async def load(self, sb) -> None:
+        """(Re)load every subdomain in one query"""
+        async with self._lock:
+            await self._load(sb)
+
+    async def _load(self, sb) -> None:
+        rows = await repository.list_subdomains(sb)
+        by_id = {}
+        for row in rows:
+            entry_table = SUBDOMAIN_ENTRY_TABLES.get(row['subdomain_name'])
+            by_id[row['subdomain_id']] = SubdomainInfo(
+                subdomain_id=row['subdomain_id'],
+                subdomain_name=row['subdomain_name'],
+                entry_table=entry_table,
+                schema=ENTRY_TABLE_SCHEMAS.get(entry_table),
+                row=row,
+            )
+        self._by_id = by_id
+        self._missing = set()
+        self._loaded_at = time.monotonic()
+        logger.debug("Loaded %d subdomains into the registry", len(by_id))
+
+    async def _load_if(self, sb, needed: Callable[[], bool]) -> None:
+        """Reload unless a concurrent caller already did while this one waited for the lock"""
+        async with self._lock:
+            if needed():
+                await self._load(sb)
+
+    async def get(self, sb, subdomain_id: Optional[int]) -> Optional[SubdomainInfo]:
+        """
+        Resolve a subdomain from memory, reloading when stale or when the id is unknown
+        An id the reload doesn't find is negative-cached until the next reload, so rows
+        pointing at a deleted subdomain cost one round trip per TTL, not one each
+        """
+        def needed() -> bool:
+            return self._is_stale() or (subdomain_id not in self._by_id and subdomain_id not in self._missing)
+
+        if needed():
+            await self._load_if(sb, needed)
+            if subdomain_id not in self._by_id:
+                self._missing.add(subdomain_id)
+        return self._by_id.get(subdomain_id)
+
+    async def all(self, sb) -> List[SubdomainInfo]:
+        if self._is_stale():
+            await self._load_if(sb, self._is_stale)
+        return list(self._by_id.values())
+
+    def invalidate(self) -> None:
+        """Force the next lookup to reload from the database"""
+        self._loaded_at = None
+
+
+subdomain_registry = SubdomainRegistry(settings.SUBDOMAIN_REGISTRY_TTL)
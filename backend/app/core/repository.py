@@ -0,0 +1,161 @@
+"""
+Async data-access layer for the list routes
+Every helper takes the async Supabase client and costs one PostgREST round
+trip, so independent lookups can be awaited together with asyncio.gather;
+reads that can return a whole list's entries are paged and cost one per PAGE_SIZE rows
+"""
+from typing import Any, Callable, Dict, List, Optional
+
+# PostgREST's default max-rows: a longer result is silently cut off
+PAGE_SIZE = 1000
+
+
+def _data(resp) -> List[Dict[str, Any]]:
+    data = resp.data if hasattr(resp, 'data') else resp
+    return data or []
+
+
+async def _fetch_all(build_query: Callable[[], Any]) -> List[Dict[str, Any]]:
+    """
+    Every row of the query build_query() returns, paged with range() until a short page
+    The query must be ordered on a unique key so pages don't overlap
+    """
+    rows: List[Dict[str, Any]] = []
+    start = 0
+    while True:
+        page = _data(await build_query().range(start, start + PAGE_SIZE - 1).execute())
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        start += PAGE_SIZE
+
+
+async def get_list_request(sb, list_id: int, columns: str = '*') -> Optional[Dict[str, Any]]:
+    """Fetch one list_requests row, or None if it doesn't exist"""
+    resp = await sb.table('list_requests').select(columns).eq('request_id', list_id).execute()
+    data = _data(resp)
+    return data[0] if data else None
+
+
+async def list_subdomains(sb) -> List[Dict[str, Any]]:
+    """Every subdomains row"""
+    resp = await sb.table('subdomains').select('*').execute()
+    return _data(resp)
+
+
+async def get_current_version(sb, list_id: int) -> Optional[Dict[str, Any]]:
+    """Fetch the current (is_current=True, highest number) version of a list"""
+    resp = await sb.table('list_versions').select('*').eq('request_id', list_id).eq('is_current', True).order('version_number', desc=True).limit(1).execute()
+    data = _data(resp)
+    return data[0] if data else None
+
+
+async def get_current_versions(sb, request_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Resolve the current version of every request in one query
+    Returns {request_id: version_row}, keeping the highest version_number per request
+    """
+    if not request_ids:
+        return {}
+    resp = await sb.table('list_versions').select('*').in_('request_id', request_ids).eq('is_current', True).order('version_number', desc=True).execute()
+    current_versions: Dict[int, Dict[str, Any]] = {}
+    for version in _data(resp):
+        # Rows arrive ordered by version_number desc, so the first one wins
+        current_versions.setdefault(version['request_id'], version)
+    return current_versions
+
+
+async def get_default_version_id(sb) -> Optional[int]:
+    """
+    Version standalone entries are filed under: the version_number = 0 version,
+    or failing that the lowest-numbered existing one (None when there are no versions)
+    """
+    resp = await sb.table('list_versions').select('version_id, version_number').order('version_number').limit(1).execute()
+    data = _data(resp)
+    return data[0]['version_id'] if data else None
+
+
+async def get_latest_version_number(sb, list_id: int) -> Optional[int]:
+    """Highest version_number recorded for a list, current or not"""
+    resp = await sb.table('list_versions').select('version_number').eq('request_id', list_id).order('version_number', desc=True).limit(1).execute()
+    data = _data(resp)
+    return data[0]['version_number'] if data else None
+
+
+async def count_entries_by_version(sb, entry_table: str, version_ids: List[int]) -> Dict[int, int]:
+    """
+    Count entries per version_id with one grouped count on entry_table (sql/count_entries_by_version.sql)
+    Versions without entries are left out
+    """
+    if not version_ids:
+        return {}
+    resp = await sb.rpc('count_entries_by_version', {'entry_table': entry_table, 'version_ids': version_ids}).execute()
+    return {row['version_id']: row['entry_count'] for row in _data(resp)}
+
+
+async def get_version_items(sb, entry_table: str, version_id: int, columns: str = '*') -> List[Dict[str, Any]]:
+    """All entry rows stored under a version, in entry_id order"""
+    return await _fetch_all(lambda: sb.table(entry_table).select(columns).eq('version_id', version_id).order('entry_id'))
+
+
+async def get_versions_by_number(sb, list_id: int, version_numbers: List[int]) -> Dict[int, Dict[str, Any]]:
+    """A list's list_versions rows with the given version numbers, keyed by version_number"""
+    resp = await sb.table('list_versions').select('*').eq('request_id', list_id).in_('version_number', version_numbers).execute()
+    return {row['version_number']: row for row in _data(resp)}
+
+
+async def get_list_versions(sb, list_id: Optional[int] = None, columns: str = '*') -> List[Dict[str, Any]]:
+    """Every version of a list (or of every list) in version_number order"""
+    def build_query():
+        query = sb.table('list_versions').select(columns)
+        if list_id is not None:
+            query = query.eq('request_id', list_id)
+        return query.order('request_id').order('version_number')
+    return await _fetch_all(build_query)
+
+
+async def get_items_for_versions(sb, entry_table: str, version_ids: List[int], columns: str = '*') -> List[Dict[str, Any]]:
+    """Entry rows stored under any of version_ids, in entry_id order"""
+    return await _fetch_all(lambda: sb.table(entry_table).select(columns).in_('version_id', version_ids).order('entry_id'))
+
+
+async def get_version_removals(sb, version_ids: List[int]) -> List[Dict[str, Any]]:
+    """list_version_removals rows (natural keys a delta version dropped) for version_ids"""
+    return await _fetch_all(lambda: sb.table('list_version_removals').select('*').in_('version_id', version_ids).order('version_id').order('natural_key'))
+
+
+async def delete_version_removals(sb, version_id: int) -> None:
+    await sb.table('list_version_removals').delete().eq('version_id', version_id).execute()
+
+
+async def create_current_version(sb, list_id: int, version_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Mark every existing version of a list as not current, then insert version_data as the current one"""
+    await sb.table('list_versions').update({'is_current': False}).eq('request_id', list_id).execute()
+    resp = await sb.table('list_versions').insert({**version_data, 'request_id': list_id, 'is_current': True}).execute()
+    data = _data(resp)
+    return data[0] if data else None
+
+
+async def update_version(sb, version_id: int, patch: Dict[str, Any]) -> None:
+    """Patch a single list_versions row"""
+    await sb.table('list_versions').update(patch).eq('version_id', version_id).execute()
+
+
+async def discard_version(sb, list_id: int, entry_table: str, version_id: int, previous_version_number: Optional[int]) -> None:
+    """Undo a partially written version: drop its entries and row, and make the previous version current again"""
+    await sb.table(entry_table).delete().eq('version_id', version_id).execute()
+    await sb.table('list_versions').delete().eq('version_id', version_id).execute()
+    if previous_version_number is not None:
+        await sb.table('list_versions').update({'is_current': True}).eq('request_id', list_id).eq('version_number', previous_version_number).execute()
+
+
+async def insert_rows(sb, table: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Insert rows in one statement and return what the database wrote"""
+    resp = await sb.table(table).insert(rows).execute()
+    return _data(resp)
+
+
+async def bulk_update_rows(sb, table: str, key_column: str, patches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Apply per-row patches (each carrying key_column) in one UPDATE (sql/bulk_update_rows.sql)"""
+    resp = await sb.rpc('bulk_update_rows', {'target_table': table, 'key_column': key_column, 'patches': patches}).execute()
+    return _data(resp)
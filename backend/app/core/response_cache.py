@@ -0,0 +1,98 @@
+"""
+Cache of final /api/query answers
+The key covers everything the answer depends on: the normalized question, the
+last two chat turns (what compose_context shows the model) and the retrieved
+documents' entity ids plus a hash of their content, so a rewritten document
+never serves a stale answer. Entries are also dropped eagerly when the indexer
+rewrites one of their documents
+"""
+import hashlib
+import json
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from .cache import TTLCache
+from .config import settings
+from .embedding_cache import normalize_query
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+HISTORY_TURNS = 2
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def doc_entity_id(doc: Dict[str, Any]):
+    return doc.get("entity_id", doc.get("version_id", doc.get("id")))
+
+
+def response_cache_key(question: str, chat_history: List[Dict[str, str]], docs: List[Dict[str, Any]]) -> str:
+    history = [[turn.get("user", ""), turn.get("assistant", "")] for turn in (chat_history or [])[-HISTORY_TURNS:]]
+    doc_keys = sorted(
+        (str(doc_entity_id(doc)), doc.get("content_hash") or _sha256(doc.get("content") or ""))
+        for doc in docs
+    )
+    return _sha256(json.dumps([normalize_query(question), _sha256(json.dumps(history)), doc_keys]))
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self._answers: TTLCache[str] = TTLCache(max_entries, ttl_seconds)
+        self._keys_by_entity: Dict[str, Set[str]] = {}
+        self._max_tracked = 4 * max_entries
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        answer = self._answers.get(key)
+        with self._lock:
+            if answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return answer
+
+    def put(self, key: str, answer: str, docs: List[Dict[str, Any]]) -> None:
+        self._answers.set(key, answer)
+        with self._lock:
+            for doc in docs:
+                self._keys_by_entity.setdefault(str(doc_entity_id(doc)), set()).add(key)
+            if len(self._keys_by_entity) > self._max_tracked:
+                self._prune()
+
+    def _prune(self) -> None:
+        """Forget reverse-index entries of answers the LRU already evicted or expired"""
+        for entity_id in list(self._keys_by_entity):
+            live = {key for key in self._keys_by_entity[entity_id] if key in self._answers}
+            if live:
+                self._keys_by_entity[entity_id] = live
+            else:
+                del self._keys_by_entity[entity_id]
+        self._max_tracked = max(self._max_tracked, 2 * len(self._keys_by_entity))
+
+    def invalidate_entities(self, entity_ids: Iterable[Any]) -> int:
+        """Drop every answer built from one of these documents; returns how many were dropped"""
+        dropped = 0
+        with self._lock:
+            for entity_id in entity_ids:
+                for key in self._keys_by_entity.pop(str(entity_id), ()):
+                    if self._answers.pop(key) is not None:
+                        dropped += 1
+        if dropped:
+            logger.info("Invalidated %d cached answers after an index refresh", dropped)
+        return dropped
+
+    def clear(self) -> None:
+        self._answers.clear()
+        with self._lock:
+            self._keys_by_entity.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._answers), "hits": self.hits, "misses": self.misses}
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL)
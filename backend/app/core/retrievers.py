@@ -0,0 +1,121 @@
+"""
+Pluggable retrieval backends for the RAG pipeline
+SupabaseRpcRetriever runs the match_list_embeddings_simple RPC; LocalRetriever
+answers from the in-process VectorIndex snapshot (no network, sub-millisecond)
+settings.RETRIEVER_BACKEND picks the one get_retriever() returns
+"""
+import asyncio
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Protocol
+
+from .config import settings
+from .database import get_async_supabase_client, get_supabase_client
+from .logger import get_logger
+
+if TYPE_CHECKING:
+    from .vector_index import VectorIndex
+
+logger = get_logger(__name__)
+
+
+class Retriever(Protocol):
+    def search(self, query_embedding: List[float], match_threshold: float, match_count: int) -> List[Dict[str, Any]]:
+        """Up to match_count docs with 'content' and 'similarity', best first"""
+        ...
+
+    async def asearch(self, query_embedding: List[float], match_threshold: float, match_count: int) -> List[Dict[str, Any]]:
+        ...
+
+
+class SupabaseRpcRetriever:
+    def __init__(self, client=None):
+        self._client = client
+
+    @staticmethod
+    def _params(query_embedding: List[float], match_threshold: float, match_count: int) -> Dict[str, Any]:
+        return {
+            "query_embedding": query_embedding,
+            "match_threshold": match_threshold,
+            "match_count": match_count
+        }
+
+    def search(self, query_embedding: List[float], match_threshold: float, match_count: int) -> List[Dict[str, Any]]:
+        supabase = self._client or get_supabase_client()
+        result = supabase.rpc("match_list_embeddings_simple", self._params(query_embedding, match_threshold, match_count)).execute()
+        return result.data or []
+
+    async def asearch(self, query_embedding: List[float], match_threshold: float, match_count: int) -> List[Dict[str, Any]]:
+        supabase = await get_async_supabase_client()
+        result = await supabase.rpc("match_list_embeddings_simple", self._params(query_embedding, match_threshold, match_count)).execute()
+        return result.data or []
+
+
+class LocalRetriever:
+    """Searches the memory-mapped snapshot, reloading it when a newer one is committed"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.VECTOR_INDEX_PATH
+        self._index: Optional["VectorIndex"] = None
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+        self._reload_listeners: List[Callable[[List[Any]], None]] = []
+
+    def add_reload_listener(self, listener: Callable[[List[Any]], None]) -> None:
+        """Call listener with the entity ids whose content changed each time a new snapshot is loaded"""
+        self._reload_listeners.append(listener)
+
+    def _notify(self, previous: Optional["VectorIndex"], current: "VectorIndex") -> None:
+        if previous is None or not self._reload_listeners:
+            return
+        before = {doc.get("entity_id"): doc.get("content_hash") for doc in previous.docs}
+        after = {doc.get("entity_id"): doc.get("content_hash") for doc in current.docs}
+        changed = [entity_id for entity_id in before.keys() | after.keys() if before.get(entity_id) != after.get(entity_id)]
+        if changed:
+            for listener in self._reload_listeners:
+                listener(changed)
+
+    def _current_index(self) -> "VectorIndex":
+        # numpy is only imported once the local backend is actually used
+        from .vector_index import VectorIndex, snapshot_version
+
+        version = snapshot_version(self.path)
+        if version is None:
+            raise FileNotFoundError(f"No vector index snapshot at {self.path}; run python -m app.core.vector_index")
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    previous = self._index
+                    try:
+                        self._index = VectorIndex.load(self.path)
+                    except FileNotFoundError:
+                        # A writer replaced the snapshot mid-load; read the new one
+                        self._index = VectorIndex.load(self.path)
+                    self._version = version
+                    logger.info("Loaded %s vector index with %d rows", self._index.kind, len(self._index))
+                    self._notify(previous, self._index)
+        return self._index
+
+    def warm_up(self) -> None:
+        """Load the snapshot now rather than on the first question (a missing one is only logged)"""
+        try:
+            self._current_index()
+        except FileNotFoundError as e:
+            logger.warning("%s", e)
+
+    def search(self, query_embedding: List[float], match_threshold: float, match_count: int) -> List[Dict[str, Any]]:
+        return self._current_index().search(query_embedding, match_count, match_threshold)
+
+    async def asearch(self, query_embedding: List[float], match_threshold: float, match_count: int) -> List[Dict[str, Any]]:
+        # Off the event loop: a snapshot reload or a large brute-force scan must not stall other requests
+        return await asyncio.to_thread(self.search, query_embedding, match_threshold, match_count)
+
+
+_retriever: Optional[Retriever] = None
+
+
+def get_retriever() -> Retriever:
+    """The process-wide retriever for settings.RETRIEVER_BACKEND ('rpc' or 'local')"""
+    global _retriever
+    if _retriever is None:
+        _retriever = LocalRetriever() if settings.RETRIEVER_BACKEND == "local" else SupabaseRpcRetriever()
+    return _retriever
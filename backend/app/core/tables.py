@@ -0,0 +1,45 @@
+"""
+Registry of the tables served by the generic /api/<table> CRUD routes
+Each entry names the table, its primary key and its Pydantic schema (whose
+fields are the columns clients may select and filter on); routes/crud.py
+builds one router per entry from it
+"""
+from typing import Any, Callable, Dict, FrozenSet, List, NamedTuple, Optional, Type
+
+from pydantic import BaseModel
+
+from app.schemas import (
+    Domains,
+    ListRequests,
+    ListVersions,
+    Subdomains,
+    VCurrentLists,
+    WorkLogs,
+)
+from .default_version import default_version_resolver
+from .registry import ENTRY_TABLE_SCHEMAS, subdomain_registry
+
+
+class CrudTable(NamedTuple):
+    name: str
+    primary_key: str
+    schema: Type[BaseModel]
+    entry_table: bool = False  # Rows created without a version_id go to the default standalone version
+    domain_join: Optional[str] = None  # Embedded relation holding domain_id, enables ?domain_id= on the list route
+    on_write: Optional[Callable[[List[Dict[str, Any]]], None]] = None  # Called with the written rows after every successful create/update/delete
+
+    @property
+    def columns(self) -> FrozenSet[str]:
+        return frozenset(self.schema.model_fields)
+
+
+CRUD_TABLES: Dict[str, CrudTable] = {table.name: table for table in [
+    *(CrudTable(name, 'entry_id', schema, entry_table=True)
+      for name, schema in ENTRY_TABLE_SCHEMAS.items()),
+    CrudTable('domains', 'domain_id', Domains),
+    CrudTable('list_requests', 'request_id', ListRequests, domain_join='subdomains'),
+    CrudTable('list_versions', 'version_id', ListVersions, on_write=default_version_resolver.rows_written),
+    CrudTable('subdomains', 'subdomain_id', Subdomains, on_write=lambda rows: subdomain_registry.invalidate()),
+    CrudTable('work_logs', 'log_id', WorkLogs),
+    CrudTable('v_current_lists', 'id', VCurrentLists),
+]}
@@ -0,0 +1,81 @@
+"""
+Per-stage tracing for the RAG pipeline
+traced() wraps a graph node to time it into rag_stage_duration_seconds and the
+request's state['timings']; record_request() observes the per-request sizes
+(context bytes, retrieved docs, tokens) once the pipeline has finished
+"""
+import inspect
+import time
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Union
+
+from .embedding_cache import query_embedding_cache
+from .metrics import (
+    CallbackMetric,
+    RAG_CONTEXT_BYTES,
+    RAG_REQUEST_SECONDS,
+    RAG_RETRIEVED_DOCS,
+    RAG_STAGE_SECONDS,
+    RAG_TOKENS,
+    registry,
+)
+from .response_cache import response_cache
+
+State = Dict[str, Any]
+
+
+def observe_stage(state: State, stage: str, seconds: float) -> None:
+    RAG_STAGE_SECONDS.observe(seconds, stage=stage)
+    state.setdefault("timings", {})[stage] = round(seconds * 1000, 1)
+
+
+def traced(stage: str, node: Callable[[State], Union[State, Awaitable[State]]]) -> Callable[[State], Awaitable[State]]:
+    """Async graph node running node (sync or async) under a stage timer"""
+    @wraps(node)
+    async def run(state: State) -> State:
+        started = time.perf_counter()
+        try:
+            result = node(state)
+            return await result if inspect.isawaitable(result) else result
+        finally:
+            observe_stage(state, stage, time.perf_counter() - started)
+    return run
+
+
+def record_request(state: State, endpoint: str, seconds: float) -> Dict[str, Any]:
+    """Observe one finished request and return its debug timings block"""
+    context_bytes = len(state.get("context_text", "").encode("utf-8"))
+    retrieved = len(state.get("retrieved_docs", []))
+    usage = state.get("token_usage") or {}
+
+    RAG_REQUEST_SECONDS.observe(seconds, endpoint=endpoint)
+    RAG_CONTEXT_BYTES.observe(context_bytes)
+    RAG_RETRIEVED_DOCS.observe(retrieved)
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if usage.get(kind):
+            RAG_TOKENS.inc(usage[kind], kind=kind.replace("_tokens", ""))
+
+    return {
+        "stages_ms": dict(state.get("timings", {})),
+        "total_ms": round(seconds * 1000, 1),
+        "context_bytes": context_bytes,
+        "retrieved_count": retrieved,
+        "prompt_tokens": usage.get("prompt_tokens"),
+        "completion_tokens": usage.get("completion_tokens"),
+        "embedding_cached": state.get("embedding_cached", False),
+        "answer_cached": state.get("answer_cached", False),
+    }
+
+
+def _cache_samples():
+    for cache_name, stats in (("query_embedding", query_embedding_cache.stats()), ("response", response_cache.stats())):
+        yield (cache_name, "hit"), stats["hits"] + stats.get("disk_hits", 0)
+        yield (cache_name, "miss"), stats["misses"]
+
+
+registry.register(CallbackMetric(
+    "rag_cache_requests_total", "RAG cache lookups by result", "counter", ["cache", "result"], _cache_samples))
+registry.register(CallbackMetric(
+    "rag_cache_entries", "Entries held in memory by each RAG cache", "gauge", ["cache"],
+    lambda: [(("query_embedding",), query_embedding_cache.stats()["entries"]),
+             (("response",), response_cache.stats()["entries"])]))
@@ -0,0 +1,222 @@
+"""
+In-process vector index over list_embeddings
+Vectors live in one contiguous, L2-normalised float32 matrix, so cosine top-k is a
+single matmul. 'brute' scans every row; 'ivf' clusters rows with spherical k-means
+and only scans the nprobe closest clusters (rows are stored grouped by cluster, so
+each probe is a contiguous slice)
+
+Snapshots are a directory holding vectors-<generation>.npy (memory-mapped on load)
+plus index.json, which names the current generation and is replaced last, so
+readers never see a half-written snapshot
+
+Usage (from backend/): python -m app.core.vector_index  # rebuild the snapshot from list_embeddings
+"""
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .config import settings
+from .logger import configure_logging, get_logger
+
+logger = get_logger(__name__)
+
+INDEX_FILE = "index.json"
+FETCH_PAGE_SIZE = 1000
+# Row fields kept alongside each vector and returned with matches
+DOC_FIELDS = ("id", "entity_type", "entity_id", "version_id", "content", "content_hash")
+
+
+def parse_embedding(value):
+    """pgvector columns come back from PostgREST as '[0.1,0.2,...]' strings"""
+    if isinstance(value, str):
+        return json.loads(value)
+    return value
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(vectors / norms, dtype=np.float32)
+
+
+def _kmeans(vectors: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0):
+    """Spherical k-means: (centroids, assignment of each row)"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        empty = ~sums.any(axis=1)
+        sums[empty] = centroids[empty]  # Keep the old centroid of an empty cluster
+        centroids = _normalize_rows(sums)
+    return centroids, np.argmax(vectors @ centroids.T, axis=1)
+
+
+class VectorIndex:
+    def __init__(self, vectors: np.ndarray, docs: List[Dict[str, Any]], kind: str = "brute",
+                 centroids: Optional[np.ndarray] = None, offsets: Optional[np.ndarray] = None,
+                 nprobe: Optional[int] = None):
+        self.vectors = vectors
+        self.docs = docs
+        self.kind = kind
+        self.centroids = centroids
+        self.offsets = offsets  # Cluster c owns rows offsets[c]:offsets[c + 1]
+        self.nprobe = nprobe or settings.VECTOR_INDEX_NPROBE
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    @classmethod
+    def build(cls, rows: Iterable[Dict[str, Any]], kind: Optional[str] = None, nlist: Optional[int] = None,
+              nprobe: Optional[int] = None) -> "VectorIndex":
+        """Index list_embeddings rows (each with an 'embedding' plus the DOC_FIELDS)"""
+        kind = kind or settings.VECTOR_INDEX_KIND
+        rows = list(rows)
+        docs = [{field: row.get(field) for field in DOC_FIELDS} for row in rows]
+        if not rows:
+            return cls(np.zeros((0, 0), dtype=np.float32), [], kind="brute", nprobe=nprobe)
+        vectors = _normalize_rows(np.array([parse_embedding(row["embedding"]) for row in rows], dtype=np.float32))
+        if kind != "ivf":
+            return cls(vectors, docs, kind="brute", nprobe=nprobe)
+
+        nlist = min(nlist or settings.VECTOR_INDEX_IVF_LISTS or int(np.sqrt(len(rows))) or 1, len(rows))
+        centroids, assignments = _kmeans(vectors, nlist)
+        order = np.argsort(assignments, kind="stable")
+        offsets = np.searchsorted(assignments[order], np.arange(nlist + 1))
+        return cls(np.ascontiguousarray(vectors[order]), [docs[i] for i in order], kind="ivf",
+                   centroids=centroids, offsets=offsets, nprobe=nprobe)
+
+    def _candidates(self, query: np.ndarray) -> Optional[np.ndarray]:
+        """Row numbers to scan, or None to scan every row"""
+        if self.kind != "ivf" or self.centroids is None:
+            return None
+        nprobe = min(self.nprobe, len(self.centroids))
+        probes = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        return np.concatenate([np.arange(self.offsets[c], self.offsets[c + 1]) for c in probes])
+
+    def search(self, query_embedding, match_count: int, match_threshold: float = -1.0) -> List[Dict[str, Any]]:
+        """Top match_count docs by cosine similarity at or above match_threshold, best first"""
+        if not len(self) or match_count <= 0:
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0 or query.shape[0] != self.vectors.shape[1]:
+            return []
+        query = query / norm
+
+        rows = self._candidates(query)
+        scores = self.vectors @ query if rows is None else self.vectors[rows] @ query
+        k = min(match_count, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        matches = []
+        for i in top:
+            similarity = float(scores[i])
+            if similarity < match_threshold:
+                break
+            row = i if rows is None else rows[i]
+            matches.append({**self.docs[row], "similarity": similarity})
+        return matches
+
+    def upsert(self, rows: Iterable[Dict[str, Any]]) -> "VectorIndex":
+        """New index with rows added, replacing docs with the same (entity_type, entity_id)"""
+        rows = list(rows)
+        replaced = {(row.get("entity_type"), row.get("entity_id")) for row in rows}
+        kept = [
+            {**doc, "embedding": self.vectors[i]}
+            for i, doc in enumerate(self.docs)
+            if (doc.get("entity_type"), doc.get("entity_id")) not in replaced
+        ]
+        return VectorIndex.build(kept + rows, kind=self.kind, nprobe=self.nprobe)
+
+    # --- Snapshots ---
+    def save(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        generation = time.time_ns()
+        files = {"vectors": f"vectors-{generation}.npy"}
+        np.save(os.path.join(path, files["vectors"]), self.vectors)
+        if self.kind == "ivf":
+            files["centroids"] = f"centroids-{generation}.npy"
+            files["offsets"] = f"offsets-{generation}.npy"
+            np.save(os.path.join(path, files["centroids"]), self.centroids)
+            np.save(os.path.join(path, files["offsets"]), self.offsets)
+
+        tmp = os.path.join(path, f"{INDEX_FILE}.{generation}.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"kind": self.kind, "files": files, "docs": self.docs}, f)
+        os.replace(tmp, os.path.join(path, INDEX_FILE))
+
+        # Older generations are no longer referenced (open memmaps keep their data alive)
+        current = set(files.values())
+        for name in os.listdir(path):
+            if name.endswith(".npy") and name not in current:
+                os.remove(os.path.join(path, name))
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True, nprobe: Optional[int] = None) -> "VectorIndex":
+        with open(os.path.join(path, INDEX_FILE)) as f:
+            meta = json.load(f)
+        files = meta["files"]
+        load = lambda name: np.load(os.path.join(path, files[name]), mmap_mode="r" if mmap else None)
+        if meta["kind"] == "ivf":
+            return cls(load("vectors"), meta["docs"], kind="ivf", centroids=np.load(os.path.join(path, files["centroids"])),
+                       offsets=np.load(os.path.join(path, files["offsets"])), nprobe=nprobe)
+        return cls(load("vectors"), meta["docs"], kind="brute", nprobe=nprobe)
+
+
+def snapshot_version(path: str) -> Optional[int]:
+    """Changes whenever a new snapshot is committed; None when there is none"""
+    try:
+        return os.stat(os.path.join(path, INDEX_FILE)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def fetch_embedding_rows(sb) -> List[Dict[str, Any]]:
+    """Every list_embeddings row, paged past PostgREST's max-rows limit"""
+    rows, start = [], 0
+    while True:
+        page = sb.table("list_embeddings").select("*").order("entity_type").order("entity_id").range(start, start + FETCH_PAGE_SIZE - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < FETCH_PAGE_SIZE:
+            return rows
+        start += FETCH_PAGE_SIZE
+
+
+def rebuild_snapshot(sb, path: Optional[str] = None) -> VectorIndex:
+    """Full rebuild of the local snapshot from list_embeddings"""
+    path = path or settings.VECTOR_INDEX_PATH
+    index = VectorIndex.build(fetch_embedding_rows(sb))
+    index.save(path)
+    logger.info("Wrote %s vector index with %d rows to %s", index.kind, len(index), path)
+    return index
+
+
+def update_snapshot(rows: List[Dict[str, Any]], path: Optional[str] = None) -> VectorIndex:
+    """
+    Refresh hook for the embedding generator: merge freshly stored rows into the snapshot
+    Without a snapshot yet, rows are only what this (possibly incremental) run embedded,
+    so the index is rebuilt from every list_embeddings row instead
+    Servers using the local retriever pick the new generation up on their next query
+    """
+    path = path or settings.VECTOR_INDEX_PATH
+    if snapshot_version(path) is None:
+        from .database import get_supabase_client
+
+        return rebuild_snapshot(get_supabase_client(), path)
+    index = VectorIndex.load(path, mmap=False).upsert(rows)
+    index.save(path)
+    logger.info("Updated vector index at %s with %d rows (%d total)", path, len(rows), len(index))
+    return index
+
+
+if __name__ == "__main__":
+    from .database import get_supabase_client
+
+    configure_logging()
+    rebuild_snapshot(get_supabase_client())
@@ -0,0 +1,70 @@
+"""
+Row-level diff between two snapshots of a list
+Rows are matched on the entry table's natural key (ENTRY_NATURAL_KEYS) and
+compared by a digest of their content columns, so a snapshot is walked once and
+only rows whose digests differ are compared column by column
+"""
+import hashlib
+import json
+from typing import Any, Dict, Hashable, Iterator, List, Sequence, Tuple
+
+# Bookkeeping columns that differ between snapshots of the same row
+IGNORED_COLUMNS = frozenset({'entry_id', 'version_id'})
+
+
+def content_columns(schema_fields: Sequence[str]) -> List[str]:
+    return [column for column in schema_fields if column not in IGNORED_COLUMNS]
+
+
+def row_digest(row: Dict[str, Any], columns: Sequence[str]) -> bytes:
+    values = json.dumps([row.get(column) for column in columns], default=str, separators=(',', ':'))
+    return hashlib.blake2b(values.encode(), digest_size=16).digest()
+
+
+def _keyed(rows: List[Dict[str, Any]], key: str) -> Iterator[Tuple[Hashable, Dict[str, Any]]]:
+    """(match key, row) pairs; rows repeating a natural key are paired up by their order within the snapshot"""
+    seen: Dict[Any, int] = {}
+    for row in rows:
+        value = row.get(key)
+        occurrence = seen.get(value, 0)
+        seen[value] = occurrence + 1
+        yield (value, occurrence), row
+
+
+def _change(op: str, match_key: Tuple[Any, int], **fields) -> Dict[str, Any]:
+    value, occurrence = match_key
+    change = {'op': op, 'key': value}
+    if occurrence:
+        change['occurrence'] = occurrence
+    change.update(fields)
+    return change
+
+
+def diff_rows(old_rows: List[Dict[str, Any]], new_rows: List[Dict[str, Any]], key: str,
+              columns: Sequence[str], counts: Dict[str, int]) -> Iterator[Dict[str, Any]]:
+    """
+    Yield one compact change per differing row:
+      {'op': 'added', 'key': k, 'row': {...}}
+      {'op': 'removed', 'key': k}
+      {'op': 'modified', 'key': k, 'changes': {column: [old, new]}}
+    counts is filled with added/removed/modified/unchanged totals as the diff is consumed
+    """
+    counts.update(added=0, removed=0, modified=0, unchanged=0)
+    old = {match_key: (row_digest(row, columns), row) for match_key, row in _keyed(old_rows, key)}
+    for match_key, row in _keyed(new_rows, key):
+        previous = old.pop(match_key, None)
+        if previous is None:
+            counts['added'] += 1
+            yield _change('added', match_key, row={column: row.get(column) for column in columns})
+        elif previous[0] == row_digest(row, columns):
+            counts['unchanged'] += 1
+        else:
+            counts['modified'] += 1
+            old_row = previous[1]
+            yield _change('modified', match_key, changes={
+                column: [old_row.get(column), row.get(column)]
+                for column in columns if old_row.get(column) != row.get(column)
+            })
+    for match_key in old:
+        counts['removed'] += 1
+        yield _change('removed', match_key)
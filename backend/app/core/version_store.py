@@ -0,0 +1,265 @@
+"""
+Delta storage for list versions
+A version with a parent_version_id stores only the rows that were added or
+changed relative to its parent (in the entry table, under its own version_id)
+and the natural keys it dropped (list_version_removals); a version without one
+is a full snapshot. New versions are written as deltas when VERSION_STORAGE=delta
+Delta versions are materialized by replaying the chain from its base and kept
+in snapshot_cache, keyed on the chain's version ids and updated_at stamps
+(sql/list_versions_updated_at.sql): any write to the chain's rows, from any
+worker or straight to the database, changes the key, so a repeated read costs
+only the versions query. Full snapshots are always read from the database.
+Compaction rebases versions whose chain grew past VERSION_DELTA_MAX_CHAIN
+Materialized rows keep the entry_id and version_id of the version that stored them
+
+Usage (from backend/): python -m app.core.version_store [--list-id ID]  # compact long delta chains
+"""
+import argparse
+import asyncio
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from pydantic import ConfigDict, TypeAdapter, ValidationError
+
+from .cache import TTLCache
+from .config import settings
+from .logger import configure_logging, get_logger
+from .registry import ENTRY_NATURAL_KEYS, ENTRY_TABLE_SCHEMAS, subdomain_registry
+from .version_diff import content_columns, row_digest
+from . import repository
+
+logger = get_logger(__name__)
+
+# (select list, (version_id, updated_at) of each chain member, base first) -> materialized rows of a delta version
+snapshot_cache: TTLCache[List[Dict[str, Any]]] = TTLCache(settings.VERSION_SNAPSHOT_CACHE_SIZE, settings.VERSION_SNAPSHOT_CACHE_TTL)
+
+
+class Delta(NamedTuple):
+    parent: Dict[str, Any]  # The list_versions row the new version is based on
+    rows: List[Dict[str, Any]]  # Added and changed rows, as submitted
+    removed: List[str]  # Natural keys dropped from the parent
+
+
+def version_chain(version: Dict[str, Any], versions_by_id: Dict[int, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """version and its ancestors, base snapshot first"""
+    chain = [version]
+    while chain[-1].get('parent_version_id') is not None:
+        parent = versions_by_id.get(chain[-1]['parent_version_id'])
+        if parent is None or len(chain) > len(versions_by_id):
+            raise ValueError(f"Broken delta chain for version {version['version_id']}")
+        chain.append(parent)
+    return chain[::-1]
+
+
+def natural_key(row: Dict[str, Any], entry_table: str) -> Any:
+    """row's natural key in the schema's type, so 123 from a JSON body matches a stored '123'"""
+    key = ENTRY_NATURAL_KEYS[entry_table]
+    return normalize_value(entry_table, key, row.get(key))
+
+
+def by_natural_key(rows: List[Dict[str, Any]], entry_table: str) -> Optional[Dict[Any, Dict[str, Any]]]:
+    """rows keyed on their (normalized) natural key, or None when a key repeats (such lists are stored as snapshots)"""
+    by_key = {natural_key(row, entry_table): row for row in rows}
+    return by_key if len(by_key) == len(rows) else None
+
+
+async def materialize(sb, entry_table: str, version: Dict[str, Any],
+                      versions_by_id: Optional[Dict[int, Dict[str, Any]]] = None,
+                      columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Every row of a version: one paged query for a snapshot, or three for a delta
+    chain (the list's versions, the chain's rows and its removals)
+    versions_by_id may be passed in when the caller already holds the list's versions
+    columns limits the rows to those columns (plus entry_id, version_id and the natural key)
+    Only delta versions are cached, under a key that changes with their chain's data
+    """
+    version_id = version['version_id']
+    key = ENTRY_NATURAL_KEYS[entry_table]
+    select = '*' if columns is None else ', '.join(dict.fromkeys(['entry_id', 'version_id', key, *columns]))
+    if version.get('parent_version_id') is None:
+        return await repository.get_version_items(sb, entry_table, version_id, select)
+    if versions_by_id is None:
+        versions_by_id = {v['version_id']: v for v in await repository.get_list_versions(sb, version['request_id'])}
+    chain = version_chain(versions_by_id.get(version_id, version), versions_by_id)
+    cache_key = (select, *((v['version_id'], v.get('updated_at')) for v in chain))
+    cached = snapshot_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    chain_ids = [v['version_id'] for v in chain]
+    stored, removals = await asyncio.gather(
+        repository.get_items_for_versions(sb, entry_table, chain_ids, select),
+        repository.get_version_removals(sb, chain_ids[1:]),
+    )
+    rows = replay(chain_ids, stored, removals, key)
+    snapshot_cache.set(cache_key, rows)
+    return rows
+
+
+def replay(chain_ids: List[int], stored: List[Dict[str, Any]], removals: List[Dict[str, Any]], key: str) -> List[Dict[str, Any]]:
+    """Snapshot of the last version in chain_ids from the rows stored under the chain and its removals"""
+    rows_by_version: Dict[int, List[Dict[str, Any]]] = {}
+    for row in stored:
+        rows_by_version.setdefault(row['version_id'], []).append(row)
+    removed_by_version: Dict[int, List[str]] = {}
+    for removal in removals:
+        removed_by_version.setdefault(removal['version_id'], []).append(removal['natural_key'])
+
+    # Changed rows keep their position, added rows go to the end
+    snapshot: Dict[Any, Dict[str, Any]] = {}
+    for version_id in chain_ids:
+        for removed_key in removed_by_version.get(version_id, []):
+            snapshot.pop(removed_key, None)
+        for row in rows_by_version.get(version_id, []):
+            snapshot[row.get(key)] = row
+    return list(snapshot.values())
+
+
+@lru_cache(maxsize=None)
+def _column_types(entry_table: str) -> Dict[str, TypeAdapter]:
+    """Validator per column of an entry table's schema; numbers are accepted for text columns"""
+    config = ConfigDict(coerce_numbers_to_str=True)
+    return {name: TypeAdapter(field.annotation, config=config) for name, field in ENTRY_TABLE_SCHEMAS[entry_table].model_fields.items()}
+
+
+def normalize_value(entry_table: str, column: str, value: Any) -> Any:
+    """value as the entry schema's column type holds it; '' (an empty CSV cell) counts as None"""
+    if value == '':
+        value = None
+    adapter = _column_types(entry_table).get(column)
+    if adapter is None or value is None:
+        return value
+    try:
+        return adapter.dump_python(adapter.validate_python(value), mode='json')
+    except ValidationError:
+        return value  # Compared as given; the database reports what's wrong with it on write
+
+
+def _comparable(row: Dict[str, Any], entry_table: str) -> Dict[str, Any]:
+    """row with values coerced to the entry schema's types, so CSV text compares equal to stored values"""
+    return {column: normalize_value(entry_table, column, value) for column, value in row.items()}
+
+
+async def plan_delta(sb, list_id: int, entry_table: str, items: List[Dict[str, Any]]) -> Optional[Delta]:
+    """
+    The delta that turns the list's current version into items, or None when the
+    new version should be a full snapshot: there is no current version, a natural
+    key repeats, or the delta would be as large as the snapshot
+    """
+    parent = await repository.get_current_version(sb, list_id)
+    key = ENTRY_NATURAL_KEYS.get(entry_table)
+    if parent is None or key is None:
+        return None
+    new_rows = by_natural_key(items, entry_table)
+    parent_rows = by_natural_key(await materialize(sb, entry_table, parent), entry_table)
+    if new_rows is None or parent_rows is None:
+        return None
+
+    columns = content_columns(list(ENTRY_TABLE_SCHEMAS[entry_table].model_fields))
+    rows = [
+        row for row_key, row in new_rows.items()
+        if row_key not in parent_rows
+        or row_digest(_comparable(row, entry_table), columns) != row_digest(_comparable(parent_rows[row_key], entry_table), columns)
+    ]
+    removed = [row_key for row_key in parent_rows if row_key not in new_rows]
+    if len(rows) + len(removed) >= len(items):
+        return None
+    return Delta(parent, rows, removed)
+
+
+class MergePlan(NamedTuple):
+    inserts: List[Dict[str, Any]]  # Rows whose natural key the snapshot doesn't have
+    updates: List[Tuple[Dict[str, Any], Dict[str, Any]]]  # (stored row, incoming row) pairs whose content differs
+    unchanged: int
+
+
+def plan_merge(snapshot_by_key: Dict[Any, Dict[str, Any]], rows: List[Dict[str, Any]], entry_table: str,
+               seen: Set[Any]) -> MergePlan:
+    """
+    Sort incoming rows into inserts, updates and unchanged against a snapshot keyed
+    on the natural key, comparing row digests (columns a row leaves out keep their
+    stored value); seen carries the keys of earlier
+    batches of the same upload, which may not repeat
+    """
+    key = ENTRY_NATURAL_KEYS[entry_table]
+    columns = content_columns(list(ENTRY_TABLE_SCHEMAS[entry_table].model_fields))
+    inserts, updates, unchanged = [], [], 0
+    for row in rows:
+        row_key = natural_key(row, entry_table)
+        if row_key in seen:
+            raise ValueError(f'Duplicate {key} in upload: {row_key}')
+        seen.add(row_key)
+        stored = snapshot_by_key.get(row_key)
+        if stored is None:
+            inserts.append(row)
+        elif row_digest(_comparable({**stored, **row}, entry_table), columns) != row_digest(_comparable(stored, entry_table), columns):
+            updates.append((stored, row))
+        else:
+            unchanged += 1
+    return MergePlan(inserts, updates, unchanged)
+
+
+async def rebase(sb, entry_table: str, version: Dict[str, Any], versions_by_id: Dict[int, Dict[str, Any]]) -> int:
+    """
+    Turn a delta version into a full snapshot and return the rows copied into it
+    Copy the inherited rows first, then drop the parent link, then the removals:
+    a reader replaying the chain at any point in between still gets the same snapshot
+    """
+    version_id = version['version_id']
+    rows = await materialize(sb, entry_table, version, versions_by_id)
+    inherited = [
+        {**{column: value for column, value in row.items() if column != 'entry_id'}, 'version_id': version_id}
+        for row in rows if row['version_id'] != version_id
+    ]
+    if inherited:
+        await repository.insert_rows(sb, entry_table, inherited)
+    await repository.update_version(sb, version_id, {'parent_version_id': None})
+    await repository.delete_version_removals(sb, version_id)
+    return len(inherited)
+
+
+async def compact(sb, list_id: Optional[int] = None, max_chain: Optional[int] = None) -> Dict[str, int]:
+    """Rebase every version more than max_chain deltas away from its base snapshot"""
+    max_chain = settings.VERSION_DELTA_MAX_CHAIN if max_chain is None else max_chain
+    versions = await repository.get_list_versions(sb, list_id)
+    versions_by_id = {v['version_id']: v for v in versions}
+    depths: Dict[int, int] = {}
+    stats = {'rebased': 0, 'rows_copied': 0}
+    entry_tables: Dict[int, Optional[str]] = {}
+
+    # Parents come before their children (version_number order), so their depth is known
+    for version in versions:
+        parent_id = version.get('parent_version_id')
+        depth = depths.get(parent_id, 0) + 1 if parent_id is not None else 0
+        if depth > max_chain:
+            request_id = version['request_id']
+            if request_id not in entry_tables:
+                list_data = await repository.get_list_request(sb, request_id, 'subdomain_id')
+                subdomain = await subdomain_registry.get(sb, list_data['subdomain_id']) if list_data else None
+                entry_tables[request_id] = subdomain.entry_table if subdomain else None
+            if entry_tables[request_id]:
+                stats['rows_copied'] += await rebase(sb, entry_tables[request_id], version, versions_by_id)
+                stats['rebased'] += 1
+                version['parent_version_id'] = None
+                depth = 0
+        depths[version['version_id']] = depth
+
+    logger.info("Compacted delta chains: rebased %(rebased)d versions, copied %(rows_copied)d rows", stats)
+    return stats
+
+
+async def main(list_id: Optional[int]):
+    from .database import close_async_supabase_client, get_async_supabase_client
+
+    try:
+        await compact(await get_async_supabase_client(), list_id)
+    finally:
+        await close_async_supabase_client()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebase list versions whose delta chains grew past VERSION_DELTA_MAX_CHAIN")
+    parser.add_argument("--list-id", type=int, help="Only compact this list")
+    args = parser.parse_args()
+
+    configure_logging()
+    asyncio.run(main(args.list_id))
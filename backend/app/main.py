@@ -1,193 +1,67 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import TypedDict, List, Dict, Any, Optional
-from langgraph.graph import StateGraph, START, END
-import google.generativeai as genai
-import os
-from openai import OpenAI
+from typing import List, Dict, Any, Optional
+import asyncio
+import json
 
 from app.routes import router as api_router
+from app.routes.crud import NEXT_CURSOR_HEADER
 from app.core.config import settings
-from app.core.database import get_supabase_client
+from app.core.registry import subdomain_registry
+from app.core.rag import RAGEngine, RAGState
+from app.core.response_cache import response_cache
+from app.core.retrievers import LocalRetriever
+from app.core.logger import configure_logging, get_logger
+from app.core.metrics import registry as metrics_registry
+from app.core.middleware import CorrelationIdMiddleware
+from app.core.database import init_async_supabase_client, close_async_supabase_client
 
-# Configure APIs
-genai.configure(api_key=settings.GEMINI_API_KEY)
+configure_logging()
+logger = get_logger(__name__)
 
-# Configure ChatAI/OpenAI client
-client = OpenAI(api_key=settings.CHATAI_API_KEY)
-
-# Define Graph State for RAG
-class RAGState(TypedDict):
-    question: str
-    chat_history: List[Dict[str, str]]
-    query_embedding: List[float]
-    retrieved_docs: List[Dict[str, Any]]
-    context_text: str
-    final_answer: str
-    last_retrieved_content: str  # Store last retrieved docs for follow-ups
-
-# RAG Pipeline Functions
-def embed_query(state: RAGState):
-    """Generate embedding considering conversation context."""
-    try:
-        question_text = state["question"]
-        
-        # If it's a follow-up question, combine with last question for better context
-        if state.get("chat_history") and len(state["chat_history"]) > 0:
-            last_exchange = state["chat_history"][-1]
-            # Check if current question is short (likely a follow-up)
-            if len(question_text.split()) < 5:
-                combined_query = f"{last_exchange['user']} {question_text}"
-                question_text = combined_query
-        
-        response = genai.embed_content(
-            model="models/text-embedding-004",
-            content=question_text,
-            task_type="retrieval_query"
-        )
-        state["query_embedding"] = response["embedding"]
-    except Exception as e:
-        print(f"Error in embed_query: {e}")
-        state["query_embedding"] = []
-    return state
-
-
-def retrieve_docs(state: RAGState):
-    """Retrieve documents with smart filtering."""
-    try:
-        query_vec = state["query_embedding"]
-        if not query_vec:
-            state["retrieved_docs"] = []
-            return state
-
-        supabase = get_supabase_client()
-        result = supabase.rpc(
-            "match_list_embeddings_simple",
-            {
-                "query_embedding": query_vec,
-                "match_threshold": 0.35,
-                "match_count": 8
-            },
-        ).execute()
-
-        all_docs = result.data or []
-        
-        # Filter for relevance
-        relevant_docs = [d for d in all_docs if d.get('similarity', 0) > 0.4]
-        state["retrieved_docs"] = relevant_docs
-
-    except Exception as e:
-        print(f"Error in retrieve_docs: {e}")
-        state["retrieved_docs"] = []
-    return state
+# One RAG engine per worker; its SDKs, graph and clients are loaded by warm_up (see RAG_WARM_UP)
+rag_engine = RAGEngine()
 
+# Send this header (any value) to get a per-stage timings block in QueryResponse
+DEBUG_TIMINGS_HEADER = "X-Debug-Timings"
 
-def compose_context(state: RAGState):
-    """Smart context composition with memory."""
+async def warm_up_rag_engine():
     try:
-        context_parts = []
-        
-        # Add recent conversation history (last 2 exchanges)
-        if state.get("chat_history") and len(state["chat_history"]) > 0:
-            recent_history = state["chat_history"][-2:]
-            history_text = "\n".join([
-                f"Previous Q: {msg['user']}\nPrevious A: {msg['assistant']}"
-                for msg in recent_history
-            ])
-            context_parts.append(f"=== CONVERSATION HISTORY ===\n{history_text}\n")
-        
-        # Add newly retrieved documents OR use cached content for follow-ups
-        if state["retrieved_docs"]:
-            docs_text = "\n\n---\n\n".join([
-                f"[Document {i+1} - Similarity: {r.get('similarity', 0):.2f}]\n{r.get('content', '')}"
-                for i, r in enumerate(state["retrieved_docs"][:3])
-            ])
-            context_parts.append(f"=== RELEVANT INFORMATION ===\n{docs_text}\n")
-            # Cache this for follow-ups
-            state["last_retrieved_content"] = docs_text
-        elif state.get("last_retrieved_content"):
-            # Use cached content for follow-up questions
-            context_parts.append(f"=== RELEVANT INFORMATION (from previous query) ===\n{state['last_retrieved_content']}\n")
-        
-        if context_parts:
-            state["context_text"] = "\n".join(context_parts) + f"\n=== CURRENT QUESTION ===\n{state['question']}"
-        else:
-            state["context_text"] = f"No relevant information available.\n\nQuestion: {state['question']}"
-            
+        await rag_engine.warm_up()
     except Exception as e:
-        print(f"Error in compose_context: {e}")
-        state["context_text"] = state["question"]
-    return state
+        logger.warning("RAG engine warm-up failed, will retry on the first question: %s", e)
 
 
-def generate_answer(state: RAGState):
-    """Generate intelligent, context-aware answers."""
+# FastAPI Application Setup
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the shared pooled async Supabase client once per worker (the routes are all async;
+    # the sync client is only for the CLIs and opens lazily there)
+    sb = await init_async_supabase_client()
+    # Import the RAG stack and create its clients without holding up CRUD traffic
+    warm_up_task = None
+    if settings.RAG_WARM_UP == "startup":
+        await warm_up_rag_engine()
+    elif settings.RAG_WARM_UP == "background":
+        warm_up_task = asyncio.create_task(warm_up_rag_engine())
+    # Drop cached answers whose documents a new index snapshot rewrote
+    if isinstance(rag_engine.retriever, LocalRetriever):
+        rag_engine.retriever.add_reload_listener(response_cache.invalidate_entities)
+    # Warm the subdomain registry so list routes resolve entry tables from memory
     try:
-        system_prompt = """You are a helpful pharmaceutical data assistant with excellent memory.
-
-CRITICAL RULES:
-1. ALWAYS use conversation history to understand pronouns and references:
-   - "he/she/they" → refer to people mentioned before
-   - "that/it/this" → refer to things just discussed
-   - "why/reason" → explain the last topic discussed
-   - "when/where" → provide details about last mentioned item
-
-2. When asked about specific people (e.g., "Dr. Rohan", "Rahul"):
-   - Search the documents for that exact name
-   - If found, provide ALL available details (email, phone, specialty, etc.)
-   - If not found, clearly say "I don't have information about [name] in the current data"
-
-3. Answer style:
-   - Be conversational and natural
-   - Don't repeat information already shared unless asked
-   - If the question is a follow-up, directly answer without restating previous info
-   - Keep answers concise (2-4 sentences)
-
-4. If no relevant info exists, say: "I don't have that information in the current context."
-"""
-
-        user_prompt = f"""{state['context_text']}
-
-Answer the current question naturally, using conversation history to understand context."""
-
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.5,
-            max_tokens=250
-        )
-        
-        state["final_answer"] = response.choices[0].message.content
-        
+        await subdomain_registry.load(sb)
     except Exception as e:
-        print(f"Error in generate_answer: {e}")
-        state["final_answer"] = "I encountered an error. Please try again."
-    return state
-
-
-# Build the LangGraph RAG Workflow
-def build_rag_graph():
-    builder = StateGraph(RAGState)
-    builder.add_node("embed_query", embed_query)
-    builder.add_node("retrieve_docs", retrieve_docs)
-    builder.add_node("compose_context", compose_context)
-    builder.add_node("generate_answer", generate_answer)
-
-    builder.add_edge(START, "embed_query")
-    builder.add_edge("embed_query", "retrieve_docs")
-    builder.add_edge("retrieve_docs", "compose_context")
-    builder.add_edge("compose_context", "generate_answer")
-    builder.add_edge("generate_answer", END)
-    return builder.compile()
-
-graph = build_rag_graph()
+        logger.warning("Subdomain registry not loaded at startup, will load on first use: %s", e)
+    yield
+    if warm_up_task is not None and not warm_up_task.done():
+        warm_up_task.cancel()
+    await rag_engine.aclose()
+    await close_async_supabase_client()
 
-# FastAPI Application Setup
-app = FastAPI(title="Supabase FastAPI + Pydantic API + RAG Bot")
+app = FastAPI(title="Supabase FastAPI + Pydantic API + RAG Bot", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -200,8 +74,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],  # Let the browser read list cursors and cache validators
 )
 
+# Tag every request (and its log records) with a correlation id
+app.add_middleware(CorrelationIdMiddleware)
+
 # Request & Response Models
 class ChatMessage(BaseModel):
     user: str
@@ -214,38 +92,80 @@ class QueryRequest(BaseModel):
 class QueryResponse(BaseModel):
     answer: str
     retrieved_count: Optional[int] = 0
+    cached: Optional[bool] = False
+    timings: Optional[Dict[str, Any]] = None  # Only when the request sends DEBUG_TIMINGS_HEADER
 
 # API Endpoints
 @app.get("/")
 def home():
     return {"message": "FastAPI + Supabase + Gemini Bot running"}
 
-@app.post("/api/query", response_model=QueryResponse)
-def ask_bot(request: QueryRequest):
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+def initial_rag_state(request: QueryRequest) -> RAGState:
+    # Convert Pydantic models to dicts for chat_history
+    chat_history = [msg.dict() for msg in request.chat_history] if request.chat_history else []
+    return RAGEngine.initial_state(request.question, chat_history)
+
+class ClientDisconnected(Exception):
+    pass
+
+
+async def run_until_disconnected(http_request: Request, awaitable, poll_interval: float = 0.25):
+    """Await the pipeline, cancelling it as soon as the client goes away"""
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+            logger.info("Client disconnected, cancelled RAG pipeline")
+
+@app.post("/api/query", response_model=QueryResponse, response_model_exclude_none=True)
+async def ask_bot(request: QueryRequest, http_request: Request):
     """RAG-powered chatbot endpoint with conversation memory."""
     try:
-        # Convert Pydantic models to dicts for chat_history
-        chat_history = [msg.dict() for msg in request.chat_history] if request.chat_history else []
-        
-        initial_state = {
-            "question": request.question,
-            "chat_history": chat_history,
-            "query_embedding": [],
-            "retrieved_docs": [],
-            "context_text": "",
-            "final_answer": "",
-            "last_retrieved_content": ""
-        }
+        final_state, timings = await run_until_disconnected(http_request, rag_engine.ask(initial_rag_state(request)))
 
-        final_state = graph.invoke(initial_state)
-        
         return {
             "answer": final_state["final_answer"],
-            "retrieved_count": len(final_state.get("retrieved_docs", []))
+            "retrieved_count": len(final_state.get("retrieved_docs", [])),
+            "cached": final_state.get("answer_cached", False),
+            "timings": timings if http_request.headers.get(DEBUG_TIMINGS_HEADER) else None
         }
+    except ClientDisconnected:
+        return Response(status_code=499)  # Client closed request; nobody reads this
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_answer_events(state: RAGState):
+    """SSE framing of RAGEngine.stream(); a client disconnect cancels it wherever it is awaiting"""
+    async for event, data in rag_engine.stream(state, "query_stream"):
+        yield _sse(event, data)
+
+
+@app.post("/api/query/stream")
+async def ask_bot_stream(request: QueryRequest):
+    """Streaming variant of /api/query: retrieval metadata first, then answer tokens as Server-Sent Events"""
+    return StreamingResponse(
+        stream_answer_events(initial_rag_state(request)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Include existing CRUD API routes
 app.include_router(api_router, prefix="/api")
 
@@ -1,812 +1,346 @@
-from fastapi import APIRouter, HTTPException, status
+"""
+Generic CRUD routes, one router per table in app.core.tables.CRUD_TABLES
+  GET    /<table>/              list (keyset pagination, filters, projection, ETag)
+  POST   /<table>/              create one row
+  POST/PATCH/DELETE /<table>/bulk  batch create/update/delete with per-row results
+  GET    /<table>/{item_id}     one row (ETag)
+  PUT    /<table>/{item_id}     update one row
+  DELETE /<table>/{item_id}     delete one row
+"""
+from fastapi import APIRouter, Body, HTTPException, Request, Response, status
+from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
-from app.core.database import get_supabase_client
-from typing import List, Dict, Any, Optional
-
-supabase = None
-def _get_supabase():
-    global supabase
-    if supabase is None:
-        supabase = get_supabase_client()
-    return supabase
-
-def _get_or_create_default_version(sb) -> int:
-    """Get or create a default version ID for standalone entries."""
-    try:
-        # Try to find a default standalone version (version_number = 0)
-        resp = sb.table('list_versions').select('version_id').eq('version_number', 0).limit(1).execute()
-        if resp.data and len(resp.data) > 0:
-            return resp.data[0]['version_id']
-        
-        # If no default exists, try to get any existing version
-        resp = sb.table('list_versions').select('version_id').limit(1).execute()
-        if resp.data and len(resp.data) > 0:
-            return resp.data[0]['version_id']
-        
-        # If no versions exist at all, we have a problem - return None and let it fail with clear error
-        return None
-    except Exception as e:
-        print(f"Error getting default version: {e}")
+from pydantic import ValidationError
+from app.core.config import settings
+from app.core.database import get_async_supabase_client
+from app.core.default_version import default_version_resolver
+from app.core.logger import get_logger
+from app.core.tables import CRUD_TABLES, CrudTable
+from typing import List, Dict, Any, Optional, Tuple
+import base64
+import hashlib
+import json
+
+logger = get_logger(__name__)
+
+async def _get_supabase():
+    return await get_async_supabase_client()
+
+async def _default_version_id(sb) -> Optional[int]:
+    """
+    Version standalone entries are filed under (cached across requests by default_version_resolver)
+    None when no versions exist at all or the lookup fails
+    """
+    try:
+        return await default_version_resolver.get(sb)
+    except Exception as e:
+        logger.warning("Error getting default version: %s", e)
         return None
 
-def _prepare_entry_data(item: Dict[str, Any], sb=None) -> Dict[str, Any]:
-    """Prepare entry data for insertion by setting defaults for required fields."""
-    # If version_id not provided, try to get a default one
-    if 'version_id' not in item or item['version_id'] == '' or item['version_id'] is None:
-        if sb:
-            default_version_id = _get_or_create_default_version(sb)
-            if default_version_id:
-                item['version_id'] = default_version_id
+async def _prepare_entry_rows(rows: List[Dict[str, Any]], sb) -> List[Dict[str, Any]]:
+    """Prepare entry rows for insertion: missing version_ids get the default version (looked up once per batch)."""
+    missing = [row for row in rows if row.get('version_id') in (None, '')]
+    if missing:
+        default_version_id = await _default_version_id(sb)
+        for row in missing:
+            if default_version_id is None:
+                # No version to file it under: drop the key and let the database report the missing version_id
+                row.pop('version_id', None)
             else:
-                # Remove it and let the database error be more specific
-                item.pop('version_id', None)
+                row['version_id'] = default_version_id
+    return rows
+
+# --- List pagination and filtering ---
+# GET /api/<table>/?limit=&cursor=&select=col,col&<column>=<value>
+#   Rows come in primary-key order; when more remain, NEXT_CURSOR_HEADER carries an
+#   opaque cursor to pass back as ?cursor= (keyset pagination: no OFFSET scans).
+#   Any other query parameter filters on that column (repeat it to match any of several values).
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+LIST_PARAMS = {'limit', 'cursor', 'select'}
+
+def _encode_cursor(key_value: Any) -> str:
+    return base64.urlsafe_b64encode(json.dumps([key_value]).encode()).decode().rstrip('=')
+
+def _decode_cursor(cursor: str) -> Any:
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))[0]
+    except Exception:
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+
+def _check_column(table: CrudTable, column: str) -> str:
+    if column not in table.columns:
+        raise HTTPException(status_code=400, detail=f'Unknown column for {table.name}: {column}')
+    return column
+
+def _select_columns(table: CrudTable, select: Optional[str]) -> str:
+    """PostgREST select list for ?select=; the key column is always included for the cursor"""
+    if not select:
+        return '*'
+    columns = [_check_column(table, c.strip()) for c in select.split(',') if c.strip()]
+    if table.primary_key not in columns:
+        columns.insert(0, table.primary_key)
+    return ','.join(columns)
+
+def _column_filters(table: CrudTable, request: Request, exclude=()) -> Dict[str, List[str]]:
+    filters = {}
+    for column, value in request.query_params.multi_items():
+        if column in LIST_PARAMS or column in exclude:
+            continue
+        filters.setdefault(_check_column(table, column), []).append(value)
+    return filters
+
+def _page_size(limit: int) -> int:
+    return max(1, min(limit, settings.CRUD_MAX_PAGE_SIZE))
+
+async def list_rows(table: CrudTable, request: Request, limit: int = 100, cursor: Optional[str] = None,
+                    select: Optional[str] = None, domain_id: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One keyset page of table and the cursor of the next page (None on the last one)"""
+    sb = await _get_supabase()
+    columns = _select_columns(table, select)
+    exclude = ()
+    if domain_id is not None and table.domain_join:
+        # Inner-join the relation holding domain_id so the database filters (and pages) by domain
+        columns = f'{columns}, {table.domain_join}!inner(*)'
+        exclude = ('domain_id',)
+    query = sb.table(table.name).select(columns)
+    if exclude:
+        query = query.eq(f'{table.domain_join}.domain_id', domain_id)
+    for column, values in _column_filters(table, request, exclude).items():
+        query = query.eq(column, values[0]) if len(values) == 1 else query.in_(column, values)
+    if cursor:
+        query = query.gt(table.primary_key, _decode_cursor(cursor))
+    # One extra row tells whether another page exists
+    resp = await query.order(table.primary_key).limit(_page_size(limit) + 1).execute()
+    page = resp.data[:_page_size(limit)]
+    next_cursor = _encode_cursor(page[-1][table.primary_key]) if len(resp.data) > len(page) else None
+    return page, next_cursor
+
+# --- Conditional GET ---
+def _etag(data: Any) -> str:
+    return '"' + hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()[:32] + '"'
+
+def _conditional_json(request: Request, data: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """JSON response tagged with an ETag; 304 without a body when the client already has it"""
+    etag = _etag(data)
+    headers = {**(headers or {}), 'ETag': etag}
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match and (if_none_match.strip() == '*' or etag in [t.strip().removeprefix('W/') for t in if_none_match.split(',')]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return JSONResponse(content=jsonable_encoder(data), headers=headers)
+
+# --- Bulk endpoints ---
+# Up to CRUD_MAX_BATCH_SIZE rows per request and one database statement per batch.
+# The response has one result per row, in request order:
+#   {"results": [{"index", "id", "status", "row" | "detail"}, ...], "<done>": n, "failed": n}
+# Rows that fail validation are reported as "invalid" and left out of the statement;
+# if the statement itself fails, every row in it is reported as "error".
+BULK_UPDATE_RPC = 'bulk_update_rows'  # sql/bulk_update_rows.sql
+
+def _check_batch_size(count: int):
+    if count > settings.CRUD_MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f'At most {settings.CRUD_MAX_BATCH_SIZE} rows per bulk request')
+
+def _validation_detail(error: ValidationError) -> str:
+    return '; '.join(f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in error.errors())
+
+def _bulk_response(results: List[Dict[str, Any]], done: str) -> Dict[str, Any]:
+    succeeded = sum(1 for result in results if result['status'] == done)
+    return {'results': results, done: succeeded, 'failed': len(results) - succeeded}
+
+async def bulk_create(table: CrudTable, sb, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Multi-row insert; each row is checked against the table schema first"""
+    _check_batch_size(len(items))
+    if table.entry_table:
+        items = await _prepare_entry_rows(items, sb)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    valid = []
+    for index, row in enumerate(items):
+        try:
+            table.schema.model_validate(row)
+            valid.append(index)
+        except ValidationError as e:
+            results[index] = {'index': index, 'status': 'invalid', 'detail': _validation_detail(e)}
+    if valid:
+        try:
+            resp = await sb.table(table.name).insert([items[i] for i in valid], default_to_null=False).execute()
+            # Inserted rows come back in input order
+            for index, row in zip(valid, resp.data):
+                results[index] = {'index': index, 'id': row.get(table.primary_key), 'status': 'created', 'row': row}
+        except Exception as e:
+            for index in valid:
+                results[index] = {'index': index, 'status': 'error', 'detail': str(e)}
+    return _bulk_response(results, 'created')
+
+async def bulk_update(table: CrudTable, sb, patches: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Per-row patches (each carrying the primary key) applied by one UPDATE through BULK_UPDATE_RPC"""
+    _check_batch_size(len(patches))
+    key = table.primary_key
+    results: List[Optional[Dict[str, Any]]] = [None] * len(patches)
+    valid, seen = [], set()
+    for index, patch in enumerate(patches):
+        item_id = patch.get(key)
+        unknown = sorted(set(patch) - table.columns)
+        if not isinstance(item_id, int):
+            detail = f'{key} is required'
+        elif unknown:
+            detail = f'Unknown columns: {", ".join(unknown)}'
+        elif len(patch) < 2:
+            detail = 'Nothing to update'
+        elif item_id in seen:
+            detail = f'Duplicate {key} in batch'
         else:
-            item.pop('version_id', None)
-    return item
-
-routers = []
-
-call_list_entries_router = APIRouter(prefix='/call_list_entries', tags=['call_list_entries'])
-@call_list_entries_router.get('/', response_model=List[Dict[str, Any]])
-def list_call_list_entries(limit: int = 100):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('call_list_entries').select('*').limit(limit).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@call_list_entries_router.post('/', status_code=status.HTTP_201_CREATED)
-def create_call_list_entries(item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        item = _prepare_entry_data(item, sb)
-        resp = sb.table('call_list_entries').insert(item).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@call_list_entries_router.get('/{item_id}')
-def get_call_list_entries(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('call_list_entries').select('*').eq('entry_id', item_id).execute()
-        data = resp.data if hasattr(resp, 'data') else resp
-        if not data:
-            raise HTTPException(status_code=404, detail='Not found')
-        return data[0]
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@call_list_entries_router.put('/{item_id}')
-def update_call_list_entries(item_id: int, item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('call_list_entries').update(item).eq('entry_id', item_id).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@call_list_entries_router.delete('/{item_id}')
-def delete_call_list_entries(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('call_list_entries').delete().eq('entry_id', item_id).execute()
-        return JSONResponse(status_code=200, content={'deleted': True})
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-routers.append(call_list_entries_router)
-
-competitor_target_entries_router = APIRouter(prefix='/competitor_target_entries', tags=['competitor_target_entries'])
-@competitor_target_entries_router.get('/', response_model=List[Dict[str, Any]])
-def list_competitor_target_entries(limit: int = 100):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('competitor_target_entries').select('*').limit(limit).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@competitor_target_entries_router.post('/', status_code=status.HTTP_201_CREATED)
-def create_competitor_target_entries(item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        item = _prepare_entry_data(item, sb)
-        resp = sb.table('competitor_target_entries').insert(item).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@competitor_target_entries_router.get('/{item_id}')
-def get_competitor_target_entries(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('competitor_target_entries').select('*').eq('entry_id', item_id).execute()
-        data = resp.data if hasattr(resp, 'data') else resp
-        if not data:
-            raise HTTPException(status_code=404, detail='Not found')
-        return data[0]
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@competitor_target_entries_router.put('/{item_id}')
-def update_competitor_target_entries(item_id: int, item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('competitor_target_entries').update(item).eq('entry_id', item_id).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@competitor_target_entries_router.delete('/{item_id}')
-def delete_competitor_target_entries(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('competitor_target_entries').delete().eq('entry_id', item_id).execute()
-        return JSONResponse(status_code=200, content={'deleted': True})
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-routers.append(competitor_target_entries_router)
-
-digital_engagement_entries_router = APIRouter(prefix='/digital_engagement_entries', tags=['digital_engagement_entries'])
-@digital_engagement_entries_router.get('/', response_model=List[Dict[str, Any]])
-def list_digital_engagement_entries(limit: int = 100):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('digital_engagement_entries').select('*').limit(limit).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@digital_engagement_entries_router.post('/', status_code=status.HTTP_201_CREATED)
-def create_digital_engagement_entries(item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        item = _prepare_entry_data(item, sb)
-        resp = sb.table('digital_engagement_entries').insert(item).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@digital_engagement_entries_router.get('/{item_id}')
-def get_digital_engagement_entries(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('digital_engagement_entries').select('*').eq('entry_id', item_id).execute()
-        data = resp.data if hasattr(resp, 'data') else resp
-        if not data:
-            raise HTTPException(status_code=404, detail='Not found')
-        return data[0]
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@digital_engagement_entries_router.put('/{item_id}')
-def update_digital_engagement_entries(item_id: int, item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('digital_engagement_entries').update(item).eq('entry_id', item_id).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@digital_engagement_entries_router.delete('/{item_id}')
-def delete_digital_engagement_entries(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('digital_engagement_entries').delete().eq('entry_id', item_id).execute()
-        return JSONResponse(status_code=200, content={'deleted': True})
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-routers.append(digital_engagement_entries_router)
-
-domains_router = APIRouter(prefix='/domains', tags=['domains'])
-@domains_router.get('/', response_model=List[Dict[str, Any]])
-def list_domains(limit: int = 100):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('domains').select('*').limit(limit).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@domains_router.post('/', status_code=status.HTTP_201_CREATED)
-def create_domains(item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('domains').insert(item).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@domains_router.get('/{item_id}')
-def get_domains(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('domains').select('*').eq('domain_id', item_id).execute()
-        data = resp.data if hasattr(resp, 'data') else resp
-        if not data:
-            raise HTTPException(status_code=404, detail='Not found')
-        return data[0]
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@domains_router.put('/{item_id}')
-def update_domains(item_id: int, item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('domains').update(item).eq('domain_id', item_id).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@domains_router.delete('/{item_id}')
-def delete_domains(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('domains').delete().eq('domain_id', item_id).execute()
-        return JSONResponse(status_code=200, content={'deleted': True})
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-routers.append(domains_router)
-
-event_invitation_entries_router = APIRouter(prefix='/event_invitation_entries', tags=['event_invitation_entries'])
-@event_invitation_entries_router.get('/', response_model=List[Dict[str, Any]])
-def list_event_invitation_entries(limit: int = 100):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('event_invitation_entries').select('*').limit(limit).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@event_invitation_entries_router.post('/', status_code=status.HTTP_201_CREATED)
-def create_event_invitation_entries(item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        item = _prepare_entry_data(item, sb)
-        resp = sb.table('event_invitation_entries').insert(item).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@event_invitation_entries_router.get('/{item_id}')
-def get_event_invitation_entries(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('event_invitation_entries').select('*').eq('entry_id', item_id).execute()
-        data = resp.data if hasattr(resp, 'data') else resp
-        if not data:
-            raise HTTPException(status_code=404, detail='Not found')
-        return data[0]
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@event_invitation_entries_router.put('/{item_id}')
-def update_event_invitation_entries(item_id: int, item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('event_invitation_entries').update(item).eq('entry_id', item_id).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@event_invitation_entries_router.delete('/{item_id}')
-def delete_event_invitation_entries(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('event_invitation_entries').delete().eq('entry_id', item_id).execute()
-        return JSONResponse(status_code=200, content={'deleted': True})
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-routers.append(event_invitation_entries_router)
-
-formulary_decision_maker_entries_router = APIRouter(prefix='/formulary_decision_maker_entries', tags=['formulary_decision_maker_entries'])
-@formulary_decision_maker_entries_router.get('/', response_model=List[Dict[str, Any]])
-def list_formulary_decision_maker_entries(limit: int = 100):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('formulary_decision_maker_entries').select('*').limit(limit).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@formulary_decision_maker_entries_router.post('/', status_code=status.HTTP_201_CREATED)
-def create_formulary_decision_maker_entries(item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        item = _prepare_entry_data(item, sb)
-        resp = sb.table('formulary_decision_maker_entries').insert(item).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@formulary_decision_maker_entries_router.get('/{item_id}')
-def get_formulary_decision_maker_entries(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('formulary_decision_maker_entries').select('*').eq('entry_id', item_id).execute()
-        data = resp.data if hasattr(resp, 'data') else resp
-        if not data:
-            raise HTTPException(status_code=404, detail='Not found')
-        return data[0]
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@formulary_decision_maker_entries_router.put('/{item_id}')
-def update_formulary_decision_maker_entries(item_id: int, item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('formulary_decision_maker_entries').update(item).eq('entry_id', item_id).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@formulary_decision_maker_entries_router.delete('/{item_id}')
-def delete_formulary_decision_maker_entries(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('formulary_decision_maker_entries').delete().eq('entry_id', item_id).execute()
-        return JSONResponse(status_code=200, content={'deleted': True})
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-routers.append(formulary_decision_maker_entries_router)
-
-high_value_prescriber_entries_router = APIRouter(prefix='/high_value_prescriber_entries', tags=['high_value_prescriber_entries'])
-@high_value_prescriber_entries_router.get('/', response_model=List[Dict[str, Any]])
-def list_high_value_prescriber_entries(limit: int = 100):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('high_value_prescriber_entries').select('*').limit(limit).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@high_value_prescriber_entries_router.post('/', status_code=status.HTTP_201_CREATED)
-def create_high_value_prescriber_entries(item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        item = _prepare_entry_data(item, sb)
-        resp = sb.table('high_value_prescriber_entries').insert(item).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@high_value_prescriber_entries_router.get('/{item_id}')
-def get_high_value_prescriber_entries(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('high_value_prescriber_entries').select('*').eq('entry_id', item_id).execute()
-        data = resp.data if hasattr(resp, 'data') else resp
-        if not data:
-            raise HTTPException(status_code=404, detail='Not found')
-        return data[0]
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@high_value_prescriber_entries_router.put('/{item_id}')
-def update_high_value_prescriber_entries(item_id: int, item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('high_value_prescriber_entries').update(item).eq('entry_id', item_id).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@high_value_prescriber_entries_router.delete('/{item_id}')
-def delete_high_value_prescriber_entries(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('high_value_prescriber_entries').delete().eq('entry_id', item_id).execute()
-        return JSONResponse(status_code=200, content={'deleted': True})
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-routers.append(high_value_prescriber_entries_router)
-
-idn_health_system_entries_router = APIRouter(prefix='/idn_health_system_entries', tags=['idn_health_system_entries'])
-@idn_health_system_entries_router.get('/', response_model=List[Dict[str, Any]])
-def list_idn_health_system_entries(limit: int = 100):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('idn_health_system_entries').select('*').limit(limit).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@idn_health_system_entries_router.post('/', status_code=status.HTTP_201_CREATED)
-def create_idn_health_system_entries(item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        item = _prepare_entry_data(item, sb)
-        resp = sb.table('idn_health_system_entries').insert(item).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@idn_health_system_entries_router.get('/{item_id}')
-def get_idn_health_system_entries(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('idn_health_system_entries').select('*').eq('entry_id', item_id).execute()
-        data = resp.data if hasattr(resp, 'data') else resp
-        if not data:
-            raise HTTPException(status_code=404, detail='Not found')
-        return data[0]
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@idn_health_system_entries_router.put('/{item_id}')
-def update_idn_health_system_entries(item_id: int, item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('idn_health_system_entries').update(item).eq('entry_id', item_id).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@idn_health_system_entries_router.delete('/{item_id}')
-def delete_idn_health_system_entries(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('idn_health_system_entries').delete().eq('entry_id', item_id).execute()
-        return JSONResponse(status_code=200, content={'deleted': True})
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-routers.append(idn_health_system_entries_router)
-
-list_requests_router = APIRouter(prefix='/list_requests', tags=['list_requests'])
-@list_requests_router.get('/', response_model=List[Dict[str, Any]])
-def list_list_requests(limit: int = 100, subdomain_id: Optional[int] = None, domain_id: Optional[int] = None):
-    sb = _get_supabase()
-    try:
-        # If domain_id is provided, join with subdomains to filter
-        if domain_id is not None:
-            query = sb.table('list_requests').select('*, subdomains(*)')
-            resp = query.limit(limit).execute()
+            seen.add(item_id)
+            valid.append(index)
+            continue
+        results[index] = {'index': index, 'id': item_id, 'status': 'invalid', 'detail': detail}
+    if valid:
+        try:
+            resp = await sb.rpc(BULK_UPDATE_RPC, {
+                'target_table': table.name,
+                'key_column': key,
+                'patches': [patches[i] for i in valid]
+            }).execute()
+            updated = {row[key]: row for row in resp.data or []}
+            for index in valid:
+                item_id = patches[index][key]
+                if item_id in updated:
+                    results[index] = {'index': index, 'id': item_id, 'status': 'updated', 'row': updated[item_id]}
+                else:
+                    results[index] = {'index': index, 'id': item_id, 'status': 'not_found'}
+        except Exception as e:
+            for index in valid:
+                results[index] = {'index': index, 'id': patches[index][key], 'status': 'error', 'detail': str(e)}
+    return _bulk_response(results, 'updated')
+
+async def bulk_delete(table: CrudTable, sb, ids: List[int]) -> Dict[str, Any]:
+    """One DELETE ... WHERE <key> IN (...)"""
+    _check_batch_size(len(ids))
+    key = table.primary_key
+    try:
+        resp = await sb.table(table.name).delete().in_(key, ids).execute() if ids else None
+        deleted = {row[key] for row in resp.data or []} if resp else set()
+        results = [
+            {'index': index, 'id': item_id, 'status': 'deleted' if item_id in deleted else 'not_found'}
+            for index, item_id in enumerate(ids)
+        ]
+    except Exception as e:
+        results = [{'index': index, 'id': item_id, 'status': 'error', 'detail': str(e)} for index, item_id in enumerate(ids)]
+    return _bulk_response(results, 'deleted')
+
+# --- Router factory ---
+def crud_router(table: CrudTable) -> APIRouter:
+    router = APIRouter(prefix=f'/{table.name}', tags=[table.name])
+    name, key = table.name, table.primary_key
+
+    def written(rows: Optional[List[Dict[str, Any]]]):
+        if table.on_write:
+            table.on_write(rows or [])
+
+    def bulk_written(result: Dict[str, Any]):
+        written([result['row'] if 'row' in result else {key: result.get('id')} for result in result['results']])
+
+    async def list_endpoint(request: Request, limit: int, cursor: Optional[str], select: Optional[str], domain_id: Optional[int] = None):
+        try:
+            page, next_cursor = await list_rows(table, request, limit, cursor, select, domain_id)
+            return _conditional_json(request, page, {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    if table.domain_join:
+        @router.get('/', response_model=List[Dict[str, Any]], name=f'list_{name}')
+        async def list_items(request: Request, limit: int = 100, cursor: Optional[str] = None, select: Optional[str] = None,
+                             domain_id: Optional[int] = None):
+            return await list_endpoint(request, limit, cursor, select, domain_id)
+    else:
+        @router.get('/', response_model=List[Dict[str, Any]], name=f'list_{name}')
+        async def list_items(request: Request, limit: int = 100, cursor: Optional[str] = None, select: Optional[str] = None):
+            return await list_endpoint(request, limit, cursor, select)
+
+    @router.post('/', status_code=status.HTTP_201_CREATED, name=f'create_{name}')
+    async def create_item(item: Dict[str, Any]):
+        sb = await _get_supabase()
+        try:
+            if table.entry_table:
+                item = (await _prepare_entry_rows([item], sb))[0]
+            resp = await sb.table(name).insert(item).execute()
+            written(resp.data)
+            return resp.data if hasattr(resp, 'data') else resp
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    # Registered before /{item_id} so '/bulk' is not taken for an id
+    @router.post('/bulk', status_code=status.HTTP_201_CREATED, name=f'bulk_create_{name}')
+    async def bulk_create_items(items: List[Dict[str, Any]]):
+        sb = await _get_supabase()
+        try:
+            result = await bulk_create(table, sb, items)
+            bulk_written(result)
+            return result
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @router.patch('/bulk', name=f'bulk_update_{name}')
+    async def bulk_update_items(patches: List[Dict[str, Any]]):
+        sb = await _get_supabase()
+        try:
+            result = await bulk_update(table, sb, patches)
+            bulk_written(result)
+            return result
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @router.delete('/bulk', name=f'bulk_delete_{name}')
+    async def bulk_delete_items(ids: List[int] = Body(...)):
+        sb = await _get_supabase()
+        try:
+            result = await bulk_delete(table, sb, ids)
+            bulk_written(result)
+            return result
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @router.get('/{item_id}', name=f'get_{name}')
+    async def get_item(item_id: int, request: Request):
+        sb = await _get_supabase()
+        try:
+            resp = await sb.table(name).select('*').eq(key, item_id).execute()
             data = resp.data if hasattr(resp, 'data') else resp
-            # Filter by domain_id from joined subdomain data
-            filtered_data = [item for item in data if item.get('subdomains') and item['subdomains'].get('domain_id') == domain_id]
-            return filtered_data
-        else:
-            query = sb.table('list_requests').select('*')
-            if subdomain_id is not None:
-                query = query.eq('subdomain_id', subdomain_id)
-            resp = query.limit(limit).execute()
+            if not data:
+                raise HTTPException(status_code=404, detail='Not found')
+            return _conditional_json(request, data[0])
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @router.put('/{item_id}', name=f'update_{name}')
+    async def update_item(item_id: int, item: Dict[str, Any]):
+        sb = await _get_supabase()
+        try:
+            resp = await sb.table(name).update(item).eq(key, item_id).execute()
+            written(resp.data)
             return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@list_requests_router.post('/', status_code=status.HTTP_201_CREATED)
-def create_list_requests(item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('list_requests').insert(item).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@list_requests_router.get('/{item_id}')
-def get_list_requests(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('list_requests').select('*').eq('request_id', item_id).execute()
-        data = resp.data if hasattr(resp, 'data') else resp
-        if not data:
-            raise HTTPException(status_code=404, detail='Not found')
-        return data[0]
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@list_requests_router.put('/{item_id}')
-def update_list_requests(item_id: int, item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('list_requests').update(item).eq('request_id', item_id).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@list_requests_router.delete('/{item_id}')
-def delete_list_requests(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('list_requests').delete().eq('request_id', item_id).execute()
-        return JSONResponse(status_code=200, content={'deleted': True})
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-routers.append(list_requests_router)
-
-list_versions_router = APIRouter(prefix='/list_versions', tags=['list_versions'])
-@list_versions_router.get('/', response_model=List[Dict[str, Any]])
-def list_list_versions(limit: int = 100):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('list_versions').select('*').limit(limit).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@list_versions_router.post('/', status_code=status.HTTP_201_CREATED)
-def create_list_versions(item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('list_versions').insert(item).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@list_versions_router.get('/{item_id}')
-def get_list_versions(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('list_versions').select('*').eq('version_id', item_id).execute()
-        data = resp.data if hasattr(resp, 'data') else resp
-        if not data:
-            raise HTTPException(status_code=404, detail='Not found')
-        return data[0]
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@list_versions_router.put('/{item_id}')
-def update_list_versions(item_id: int, item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('list_versions').update(item).eq('version_id', item_id).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@list_versions_router.delete('/{item_id}')
-def delete_list_versions(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('list_versions').delete().eq('version_id', item_id).execute()
-        return JSONResponse(status_code=200, content={'deleted': True})
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-routers.append(list_versions_router)
-
-subdomains_router = APIRouter(prefix='/subdomains', tags=['subdomains'])
-@subdomains_router.get('/', response_model=List[Dict[str, Any]])
-def list_subdomains(limit: int = 100, domain_id: Optional[int] = None):
-    sb = _get_supabase()
-    try:
-        query = sb.table('subdomains').select('*')
-        if domain_id is not None:
-            query = query.eq('domain_id', domain_id)
-        resp = query.limit(limit).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@subdomains_router.post('/', status_code=status.HTTP_201_CREATED)
-def create_subdomains(item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('subdomains').insert(item).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@subdomains_router.get('/{item_id}')
-def get_subdomains(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('subdomains').select('*').eq('subdomain_id', item_id).execute()
-        data = resp.data if hasattr(resp, 'data') else resp
-        if not data:
-            raise HTTPException(status_code=404, detail='Not found')
-        return data[0]
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@subdomains_router.put('/{item_id}')
-def update_subdomains(item_id: int, item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('subdomains').update(item).eq('subdomain_id', item_id).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@subdomains_router.delete('/{item_id}')
-def delete_subdomains(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('subdomains').delete().eq('subdomain_id', item_id).execute()
-        return JSONResponse(status_code=200, content={'deleted': True})
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-routers.append(subdomains_router)
-
-target_list_entries_router = APIRouter(prefix='/target_list_entries', tags=['target_list_entries'])
-@target_list_entries_router.get('/', response_model=List[Dict[str, Any]])
-def list_target_list_entries(limit: int = 100):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('target_list_entries').select('*').limit(limit).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@target_list_entries_router.post('/', status_code=status.HTTP_201_CREATED)
-def create_target_list_entries(item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        item = _prepare_entry_data(item, sb)
-        resp = sb.table('target_list_entries').insert(item).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@target_list_entries_router.get('/{item_id}')
-def get_target_list_entries(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('target_list_entries').select('*').eq('entry_id', item_id).execute()
-        data = resp.data if hasattr(resp, 'data') else resp
-        if not data:
-            raise HTTPException(status_code=404, detail='Not found')
-        return data[0]
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@target_list_entries_router.put('/{item_id}')
-def update_target_list_entries(item_id: int, item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('target_list_entries').update(item).eq('entry_id', item_id).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@target_list_entries_router.delete('/{item_id}')
-def delete_target_list_entries(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('target_list_entries').delete().eq('entry_id', item_id).execute()
-        return JSONResponse(status_code=200, content={'deleted': True})
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-routers.append(target_list_entries_router)
-
-work_logs_router = APIRouter(prefix='/work_logs', tags=['work_logs'])
-@work_logs_router.get('/', response_model=List[Dict[str, Any]])
-def list_work_logs(limit: int = 100):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('work_logs').select('*').limit(limit).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@work_logs_router.post('/', status_code=status.HTTP_201_CREATED)
-def create_work_logs(item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('work_logs').insert(item).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@work_logs_router.get('/{item_id}')
-def get_work_logs(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('work_logs').select('*').eq('log_id', item_id).execute()
-        data = resp.data if hasattr(resp, 'data') else resp
-        if not data:
-            raise HTTPException(status_code=404, detail='Not found')
-        return data[0]
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@work_logs_router.put('/{item_id}')
-def update_work_logs(item_id: int, item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('work_logs').update(item).eq('log_id', item_id).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@work_logs_router.delete('/{item_id}')
-def delete_work_logs(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('work_logs').delete().eq('log_id', item_id).execute()
-        return JSONResponse(status_code=200, content={'deleted': True})
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-routers.append(work_logs_router)
-
-v_current_lists_router = APIRouter(prefix='/v_current_lists', tags=['v_current_lists'])
-@v_current_lists_router.get('/', response_model=List[Dict[str, Any]])
-def list_v_current_lists(limit: int = 100):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('v_current_lists').select('*').limit(limit).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@v_current_lists_router.post('/', status_code=status.HTTP_201_CREATED)
-def create_v_current_lists(item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('v_current_lists').insert(item).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@v_current_lists_router.get('/{item_id}')
-def get_v_current_lists(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('v_current_lists').select('*').eq('id', item_id).execute()
-        data = resp.data if hasattr(resp, 'data') else resp
-        if not data:
-            raise HTTPException(status_code=404, detail='Not found')
-        return data[0]
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@v_current_lists_router.put('/{item_id}')
-def update_v_current_lists(item_id: int, item: Dict[str, Any]):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('v_current_lists').update(item).eq('id', item_id).execute()
-        return resp.data if hasattr(resp, 'data') else resp
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-@v_current_lists_router.delete('/{item_id}')
-def delete_v_current_lists(item_id: int):
-    sb = _get_supabase()
-    try:
-        resp = sb.table('v_current_lists').delete().eq('id', item_id).execute()
-        return JSONResponse(status_code=200, content={'deleted': True})
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-routers.append(v_current_lists_router)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @router.delete('/{item_id}', name=f'delete_{name}')
+    async def delete_item(item_id: int):
+        sb = await _get_supabase()
+        try:
+            resp = await sb.table(name).delete().eq(key, item_id).execute()
+            written(resp.data)
+            return JSONResponse(status_code=200, content={'deleted': True})
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    return router
+
+routers = [crud_router(table) for table in CRUD_TABLES.values()]
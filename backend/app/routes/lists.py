@@ -1,164 +1,162 @@
 from fastapi import APIRouter, HTTPException, status
-from fastapi.responses import JSONResponse
-from app.core.database import get_supabase_client
-from typing import List, Dict, Any, Optional
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.core.config import settings
+from app.core.database import get_async_supabase_client
+from app.core import repository
+from app.core.logger import get_logger
+from app.core.default_version import default_version_resolver
+from app.core.registry import ENTRY_NATURAL_KEYS, ENTRY_TABLE_SCHEMAS, subdomain_registry
+from app.core.version_diff import content_columns, diff_rows
+from app.core import version_store
+from typing import AsyncIterator, Iterator, List, Dict, Any, Optional, Tuple
 from fastapi import UploadFile, File
+import asyncio
 import csv
-from io import StringIO
+import io
+import json
 
 router = APIRouter(prefix='/lists', tags=['lists'])
+logger = get_logger(__name__)
 
-def _get_supabase():
-    return get_supabase_client()
+async def _get_supabase():
+    return await get_async_supabase_client()
 
 @router.get('', response_model=List[Dict[str, Any]])
-def get_lists(category: Optional[str] = None, subdomain_id: Optional[int] = None, limit: int = 100):
+async def get_lists(category: Optional[str] = None, subdomain_id: Optional[int] = None, limit: int = 100):
     """
     Get all lists, optionally filtered by category or subdomain_id
     Maps to list_requests table with subdomain information
     Only returns lists that have actual entries (non-empty lists)
+    Current versions are resolved in one query and entry counts with one
+    grouped count per entry table, so the round trips don't grow with the page size
+    Subdomain info comes from the in-memory registry
     """
-    sb = _get_supabase()
+    sb = await _get_supabase()
     try:
-        # Use a more efficient query to get lists with their subdomain info
-        query = sb.table('list_requests').select('*, subdomains(*)')
+        query = sb.table('list_requests').select('*')
         
         if subdomain_id is not None:
             query = query.eq('subdomain_id', subdomain_id)
         
-        resp = query.limit(limit).order('created_at', desc=True).execute()
+        resp = await query.limit(limit).order('created_at', desc=True).execute()
         lists = resp.data if hasattr(resp, 'data') else resp
         
-        # Table mapping for subdomain entries
-        table_mapping = {
-            'Target Lists': 'target_list_entries',
-            'Call Lists': 'call_list_entries',
-            'Formulary Decision-Maker Lists': 'formulary_decision_maker_entries',
-            'IDN/Health System Lists': 'idn_health_system_entries',
-            'Event Invitation Lists': 'event_invitation_entries',
-            'Digital Engagement Lists': 'digital_engagement_entries',
-            'High-Value Prescriber Lists': 'high_value_prescriber_entries',
-            'Competitor Target Lists': 'competitor_target_entries'
-        }
+        # Attach subdomain info and remember which entry table each list uses
+        entry_tables: Dict[int, Optional[str]] = {}
+        for list_item in lists:
+            subdomain = await subdomain_registry.get(sb, list_item['subdomain_id'])
+            list_item['subdomains'] = subdomain.row if subdomain else None
+            entry_tables[list_item['request_id']] = subdomain.entry_table if subdomain else None
+        
+        current_versions = await repository.get_current_versions(sb, [list_item['request_id'] for list_item in lists])
+        
+        # Group the current version ids by the entry table that holds their items
+        version_ids_by_table: Dict[str, List[int]] = {}
+        for list_item in lists:
+            version = current_versions.get(list_item['request_id'])
+            entry_table = entry_tables[list_item['request_id']]
+            # Delta versions record their size; only snapshots need counting
+            if version and entry_table and version.get('item_count') is None:
+                version_ids_by_table.setdefault(entry_table, []).append(version['version_id'])
+        
+        # One grouped count per entry table, issued concurrently
+        entry_counts: Dict[int, int] = {}
+        table_counts = await asyncio.gather(*(
+            repository.count_entries_by_version(sb, entry_table, version_ids)
+            for entry_table, version_ids in version_ids_by_table.items()
+        ))
+        for counts in table_counts:
+            entry_counts.update(counts)
         
         # Filter to only include lists with entries
         filtered_lists = []
         for list_item in lists:
-            version_resp = sb.table('list_versions').select('*').eq('request_id', list_item['request_id']).eq('is_current', True).order('version_number', desc=True).limit(1).execute()
-            if version_resp.data and len(version_resp.data) > 0:
-                list_item['current_version'] = version_resp.data[0]
+            version = current_versions.get(list_item['request_id'])
+            if not version:
+                continue
+            list_item['current_version'] = version
+            
+            # Check if this list has actual entries
+            if list_item.get('subdomains'):
+                entry_table = entry_tables[list_item['request_id']]
                 
-                # Check if this list has actual entries
-                if list_item.get('subdomains'):
-                    subdomain_name = list_item['subdomains']['subdomain_name']
-                    entry_table = table_mapping.get(subdomain_name)
-                    
-                    if entry_table:
-                        # Check if there are entries for this version
-                        entries_resp = sb.table(entry_table).select('entry_id', count='exact').eq('version_id', version_resp.data[0]['version_id']).limit(1).execute()
-                        # Only include this list if it has entries
-                        if entries_resp.count and entries_resp.count > 0:
-                            filtered_lists.append(list_item)
-                    else:
-                        # If no entry table mapping, include it anyway
+                if entry_table:
+                    # Only include this list if it has entries
+                    entry_count = version.get('item_count') or entry_counts.get(version['version_id'], 0)
+                    if entry_count > 0:
+                        list_item['entry_count'] = entry_count
                         filtered_lists.append(list_item)
                 else:
-                    # If no subdomain info, include it anyway
+                    # If no entry table mapping, include it anyway
                     filtered_lists.append(list_item)
+            else:
+                # If no subdomain info, include it anyway
+                filtered_lists.append(list_item)
         
         return filtered_lists
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get('/{list_id}', response_model=Dict[str, Any])
-def get_list_detail(list_id: int):
+async def get_list_detail(list_id: int):
     """
     Get detailed information for a specific list
     Returns list_request with related data and current snapshot items
+    The request and the current version are fetched concurrently; subdomain
+    metadata comes from the in-memory registry
     """
-    sb = _get_supabase()
+    sb = await _get_supabase()
     try:
-        print(f"\n[DEBUG GET_LIST_DETAIL] Fetching list {list_id}")
+        logger.debug("Fetching list %s", list_id)
         
-        # Get the list request
-        resp = sb.table('list_requests').select('*').eq('request_id', list_id).execute()
-        data = resp.data if hasattr(resp, 'data') else resp
+        # Get the list request and the latest version info (is_current=True)
+        list_data, current_version = await asyncio.gather(
+            repository.get_list_request(sb, list_id),
+            repository.get_current_version(sb, list_id),
+        )
         
-        if not data or len(data) == 0:
+        if not list_data:
             raise HTTPException(status_code=404, detail='List not found')
         
-        list_data = data[0]
-        print(f"[DEBUG GET_LIST_DETAIL] Found list: {list_data.get('request_purpose')}")
-        
         # Get subdomain info
-        subdomain_resp = sb.table('subdomains').select('*').eq('subdomain_id', list_data['subdomain_id']).execute()
-        if subdomain_resp.data and len(subdomain_resp.data) > 0:
-            list_data['subdomain'] = subdomain_resp.data[0]
-            subdomain_name = subdomain_resp.data[0]['subdomain_name']
-            print(f"[DEBUG GET_LIST_DETAIL] Subdomain: {subdomain_name}")
-        else:
-            subdomain_name = None
-            print(f"[DEBUG GET_LIST_DETAIL] No subdomain found")
-        
-        # Get latest version info if exists (filter by is_current=True)
-        version_resp = sb.table('list_versions').select('*').eq('request_id', list_id).eq('is_current', True).order('version_number', desc=True).limit(1).execute()
-        current_version = None
-        if version_resp.data and len(version_resp.data) > 0:
-            current_version = version_resp.data[0]
+        subdomain = await subdomain_registry.get(sb, list_data['subdomain_id'])
+        if subdomain:
+            list_data['subdomain'] = subdomain.row
+        
+        if current_version:
             list_data['current_version'] = current_version
-            print(f"[DEBUG GET_LIST_DETAIL] Current version: {current_version['version_number']}, version_id: {current_version['version_id']}")
             
             # Get items for the current version from the appropriate entry table
-            if subdomain_name:
-                table_mapping = {
-                    'Target Lists': 'target_list_entries',
-                    'Call Lists': 'call_list_entries',
-                    'Formulary Decision-Maker Lists': 'formulary_decision_maker_entries',
-                    'IDN/Health System Lists': 'idn_health_system_entries',
-                    'Event Invitation Lists': 'event_invitation_entries',
-                    'Digital Engagement Lists': 'digital_engagement_entries',
-                    'High-Value Prescriber Lists': 'high_value_prescriber_entries',
-                    'Competitor Target Lists': 'competitor_target_entries'
-                }
-                
-                entry_table = table_mapping.get(subdomain_name)
-                print(f"[DEBUG GET_LIST_DETAIL] Entry table: {entry_table}")
-                
+            if subdomain:
+                entry_table = subdomain.entry_table
                 if entry_table:
-                    # Get all items for this version
-                    print(f"[DEBUG GET_LIST_DETAIL] Querying {entry_table} for version_id={current_version['version_id']}")
-                    items_resp = sb.table(entry_table).select('*').eq('version_id', current_version['version_id']).execute()
-                    print(f"[DEBUG GET_LIST_DETAIL] Items found: {len(items_resp.data) if items_resp.data else 0}")
+                    # Get all items for this version (replaying its delta chain if it has one)
+                    items = await version_store.materialize(sb, entry_table, current_version)
+                    logger.debug("List %s version %s: %d items in %s", list_id, current_version['version_id'], len(items), entry_table)
                     
-                    if items_resp.data:
+                    if items:
                         list_data['current_snapshot'] = {
                             'version_id': current_version['version_id'],
                             'version_number': current_version['version_number'],
-                            'items': items_resp.data
+                            'items': items
                         }
-                        print(f"[DEBUG GET_LIST_DETAIL] Added current_snapshot with {len(items_resp.data)} items")
-                    else:
-                        print(f"[DEBUG GET_LIST_DETAIL] No items found in response")
         else:
-            print(f"[DEBUG GET_LIST_DETAIL] No version found for this list")
+            logger.debug("No current version for list %s", list_id)
         
-        print(f"[DEBUG GET_LIST_DETAIL] Returning list_data with keys: {list_data.keys()}")
         return list_data
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[ERROR GET_LIST_DETAIL] Exception: {str(e)}")
-        import traceback
-        print(f"[ERROR GET_LIST_DETAIL] Traceback: {traceback.format_exc()}")
+        logger.exception("Failed to load list %s", list_id)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post('', status_code=status.HTTP_201_CREATED)
-def create_list(payload: Dict[str, Any]):
+async def create_list(payload: Dict[str, Any]):
     """
     Create a new list
     Required fields: subdomain_id, requester_name, request_purpose
     """
-    sb = _get_supabase()
+    sb = await _get_supabase()
     try:
         # Validate required fields
         if 'subdomain_id' not in payload:
@@ -172,7 +170,7 @@ def create_list(payload: Dict[str, Any]):
         if 'status' not in payload:
             payload['status'] = 'In Progress'
         
-        resp = sb.table('list_requests').insert(payload).execute()
+        resp = await sb.table('list_requests').insert(payload).execute()
         data = resp.data if hasattr(resp, 'data') else resp
         
         if data and len(data) > 0:
@@ -184,17 +182,17 @@ def create_list(payload: Dict[str, Any]):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.put('/{list_id}')
-def update_list(list_id: int, payload: Dict[str, Any]):
+async def update_list(list_id: int, payload: Dict[str, Any]):
     """
     Update an existing list
     """
-    sb = _get_supabase()
+    sb = await _get_supabase()
     try:
         # Remove fields that shouldn't be updated
         payload.pop('request_id', None)
         payload.pop('created_at', None)
         
-        resp = sb.table('list_requests').update(payload).eq('request_id', list_id).execute()
+        resp = await sb.table('list_requests').update(payload).eq('request_id', list_id).execute()
         data = resp.data if hasattr(resp, 'data') else resp
         
         if not data or len(data) == 0:
@@ -207,142 +205,243 @@ def update_list(list_id: int, payload: Dict[str, Any]):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete('/{list_id}')
-def delete_list(list_id: int):
+async def delete_list(list_id: int):
     """
     Delete a list
     """
-    sb = _get_supabase()
+    sb = await _get_supabase()
     try:
-        resp = sb.table('list_requests').delete().eq('request_id', list_id).execute()
+        resp = await sb.table('list_requests').delete().eq('request_id', list_id).execute()
+        # The list's versions may have included the cached default standalone version
+        default_version_resolver.invalidate()
         return JSONResponse(status_code=200, content={'deleted': True, 'list_id': list_id})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _get_entry_table_and_latest_version(sb, list_id: int) -> Tuple[str, Optional[int]]:
+    """
+    Resolve the entry table a list stores its items in and its latest version number
+    Raises 404/400 HTTPExceptions for unknown lists or subdomains
+    """
+    # Get current list (to find its subdomain) together with the latest version number
+    list_data, latest_version = await asyncio.gather(
+        repository.get_list_request(sb, list_id, 'subdomain_id'),
+        repository.get_latest_version_number(sb, list_id),
+    )
+    if not list_data:
+        raise HTTPException(status_code=404, detail='List not found')
+    
+    # The registry maps the subdomain to the correct entry table without a round trip
+    subdomain = await subdomain_registry.get(sb, list_data['subdomain_id'])
+    if not subdomain:
+        raise HTTPException(status_code=404, detail='Subdomain not found')
+    
+    entry_table = subdomain.entry_table
+    if not entry_table:
+        raise HTTPException(status_code=400, detail=f'Unknown subdomain: {subdomain.subdomain_name}')
+    
+    return entry_table, latest_version
+
+def _insert_error_message(insert_error: Exception) -> str:
+    """Extract meaningful error message for the user from a failed entry insert"""
+    error_msg = str(insert_error)
+    if 'check constraint' in error_msg.lower():
+        # Extract the constraint name and provide helpful message
+        if 'importance_check' in error_msg:
+            error_msg = 'Invalid value for "importance" field. Expected values: Tier 1, Tier 2, or Tier 3'
+        elif 'tier_check' in error_msg:
+            error_msg = 'Invalid value for "tier" field. Expected values: A, B, or C'
+        elif 'influence_level_check' in error_msg:
+            error_msg = 'Invalid value for "influence_level" field. Expected values: High, Medium, or Low'
+        elif 'conversion_potential_check' in error_msg:
+            error_msg = 'Invalid value for "conversion_potential" field. Expected values: High, Medium, or Low'
+        else:
+            error_msg = f'Data validation error: One or more fields contain invalid values. Please check your CSV file matches the sample template.'
+    return error_msg
+
+# Upload modes for /items and /upload-csv
+#   replace  the uploaded rows become a new version (the default)
+#   merge    a new version holding only the rows that are new or changed, on top of the current one
+#   upsert   no new version: changed rows of the current version are updated in place, new ones added
+UPLOAD_MODES = ('replace', 'merge', 'upsert')
+
+def _check_upload_mode(mode: str):
+    if mode not in UPLOAD_MODES:
+        raise HTTPException(status_code=400, detail=f'mode must be one of: {", ".join(UPLOAD_MODES)}')
+
+async def _merge_into_list(sb, list_id: int, entry_table: str, latest_version: Optional[int],
+                           batches: AsyncIterator[List[Dict[str, Any]]], mode: str, updated_by: str) -> Dict[str, Any]:
+    """
+    Merge uploaded rows into the list's current snapshot by natural key (hcp_id, ...),
+    comparing row digests so only new and changed rows are written
+    A merge version is created on the first change and discarded if a write fails;
+    upsert writes are applied batch by batch and not rolled back
+    Returns inserted/updated/unchanged counts
+    """
+    current = await repository.get_current_version(sb, list_id)
+    if not current:
+        raise HTTPException(status_code=400, detail='List has no version to merge into; upload with mode=replace')
+    key = ENTRY_NATURAL_KEYS[entry_table]
+    snapshot = version_store.by_natural_key(await version_store.materialize(sb, entry_table, current), entry_table)
+    if snapshot is None:
+        raise HTTPException(status_code=400, detail=f'The current version repeats {key} values; upload with mode=replace')
+    columns = content_columns(list(ENTRY_TABLE_SCHEMAS[entry_table].model_fields))
+
+    target = current if mode == 'upsert' else None
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+    seen = set()
+    try:
+        async for batch in batches:
+            plan = version_store.plan_merge(snapshot, batch, entry_table, seen)
+            counts['unchanged'] += plan.unchanged
+            if not plan.inserts and not plan.updates:
+                continue
+            if target is None:
+                target = await repository.create_current_version(sb, list_id, {
+                    'version_number': (latest_version or 0) + 1,
+                    'change_type': 'Update',
+                    'change_rationale': 'Merged upload in progress',
+                    'created_by': updated_by,
+                    'parent_version_id': current['version_id'],
+                })
+                if not target:
+                    raise HTTPException(status_code=500, detail='Failed to create version')
+            version_id = target['version_id']
+
+            # Rows stored under the target version are patched; anything else is (re)written under it
+            patches, rows = [], list(plan.inserts)
+            for stored, row in plan.updates:
+                if stored['version_id'] == version_id:
+                    patches.append({'entry_id': stored['entry_id'], **{column: row[column] for column in columns if column in row}})
+                else:
+                    rows.append({**{column: stored[column] for column in columns if column in stored}, **row})
+            if rows:
+                await repository.insert_rows(sb, entry_table, [{**row, 'version_id': version_id} for row in rows])
+            if patches:
+                await repository.bulk_update_rows(sb, entry_table, 'entry_id', patches)
+            counts['inserted'] += len(plan.inserts)
+            counts['updated'] += len(plan.updates)
+    except Exception as merge_error:
+        logger.warning("%s into list %s failed: %s", mode.capitalize(), list_id, merge_error)
+        if mode != 'upsert' and target is not None:
+            await repository.discard_version(sb, list_id, entry_table, target['version_id'], latest_version)
+            default_version_resolver.rows_written([{'version_id': target['version_id']}])
+        if isinstance(merge_error, HTTPException):
+            raise
+        if isinstance(merge_error, ValueError):
+            raise HTTPException(status_code=400, detail=str(merge_error))
+        raise HTTPException(status_code=400, detail=_insert_error_message(merge_error))
+
+    if mode == 'merge' and target is not None:
+        await repository.update_version(sb, target['version_id'], {
+            'item_count': len(snapshot) + counts['inserted'],
+            'change_rationale': f"Merged upload: {counts['inserted']} inserted, {counts['updated']} updated"
+        })
+    elif mode == 'upsert' and counts['inserted'] and current.get('item_count') is not None:
+        await repository.update_version(sb, current['version_id'], {'item_count': current['item_count'] + counts['inserted']})
+
+    version = target or current
+    logger.info("%s into %s for list %s: %s", mode.capitalize(), entry_table, list_id, counts)
+    return {
+        'success': True,
+        'mode': mode,
+        'version_id': version['version_id'],
+        'version_number': version['version_number'],
+        'table_used': entry_table,
+        **counts
+    }
+
+async def _one_batch(rows: List[Dict[str, Any]]) -> AsyncIterator[List[Dict[str, Any]]]:
+    yield rows
+
 @router.post('/{list_id}/items', status_code=status.HTTP_201_CREATED)
-def add_items_to_list(list_id: int, payload: Dict[str, Any]):
+async def add_items_to_list(list_id: int, payload: Dict[str, Any]):
     """
     Add items to a list (creates a new version)
-    Expected payload: { "items": [...], "updated_by": "user_name" }
+    Expected payload: { "items": [...], "updated_by": "user_name", "mode": "replace" }
+    mode is one of UPLOAD_MODES; merge and upsert report inserted/updated/unchanged counts
     """
-    sb = _get_supabase()
+    sb = await _get_supabase()
     try:
         items = payload.get('items', [])
         updated_by = payload.get('updated_by', 'Unknown')
+        mode = payload.get('mode', 'replace')
+        _check_upload_mode(mode)
         
-        print(f"[DEBUG] Adding items to list {list_id}")
-        print(f"[DEBUG] Number of items: {len(items)}")
-        print(f"[DEBUG] First item sample: {items[0] if items else 'No items'}")
+        logger.debug("Adding %d items to list %s", len(items), list_id)
         
         if not items:
             raise HTTPException(status_code=400, detail='No items provided')
         
-        # Get current list to find subdomain
-        list_resp = sb.table('list_requests').select('*').eq('request_id', list_id).execute()
-        if not list_resp.data or len(list_resp.data) == 0:
-            raise HTTPException(status_code=404, detail='List not found')
-        
-        list_data = list_resp.data[0]
-        subdomain_id = list_data['subdomain_id']
-        
-        # Get subdomain to determine the correct entry table
-        subdomain_resp = sb.table('subdomains').select('subdomain_name').eq('subdomain_id', subdomain_id).execute()
-        if not subdomain_resp.data or len(subdomain_resp.data) == 0:
-            raise HTTPException(status_code=404, detail='Subdomain not found')
-        
-        subdomain_name = subdomain_resp.data[0]['subdomain_name']
-        print(f"[DEBUG] Subdomain name: {subdomain_name}")
-        
-        # Map subdomain to entry table
-        table_mapping = {
-            'Target Lists': 'target_list_entries',
-            'Call Lists': 'call_list_entries',
-            'Formulary Decision-Maker Lists': 'formulary_decision_maker_entries',
-            'IDN/Health System Lists': 'idn_health_system_entries',
-            'Event Invitation Lists': 'event_invitation_entries',
-            'Digital Engagement Lists': 'digital_engagement_entries',
-            'High-Value Prescriber Lists': 'high_value_prescriber_entries',
-            'Competitor Target Lists': 'competitor_target_entries'
-        }
-        
-        entry_table = table_mapping.get(subdomain_name)
-        if not entry_table:
-            raise HTTPException(status_code=400, detail=f'Unknown subdomain: {subdomain_name}')
-        
-        print(f"[DEBUG] Using entry table: {entry_table}")
+        entry_table, latest_version = await _get_entry_table_and_latest_version(sb, list_id)
+        if mode != 'replace':
+            return await _merge_into_list(sb, list_id, entry_table, latest_version, _one_batch(items), mode, updated_by)
         
-        # Get the latest version number
-        version_resp = sb.table('list_versions').select('version_number').eq('request_id', list_id).order('version_number', desc=True).limit(1).execute()
         next_version = 1
-        if version_resp.data and len(version_resp.data) > 0:
-            next_version = version_resp.data[0]['version_number'] + 1
+        if latest_version is not None:
+            next_version = latest_version + 1
         
-        print(f"[DEBUG] Creating version: {next_version}")
+        # In delta mode the new version stores only what changed relative to the current one
+        delta = None
+        if settings.VERSION_STORAGE == 'delta':
+            delta = await version_store.plan_delta(sb, list_id, entry_table, items)
         
-        # Set all previous versions to is_current = False
-        print(f"[DEBUG] Setting previous versions to is_current=False")
-        sb.table('list_versions').update({'is_current': False}).eq('request_id', list_id).execute()
-        
-        # Create new version
+        # Set all previous versions to is_current = False and create the new version
         version_data = {
-            'request_id': list_id,
             'version_number': next_version,
             'change_type': 'Update',
             'change_rationale': f'Added {len(items)} items via CSV upload',
-            'created_by': updated_by,
-            'is_current': True
+            'created_by': updated_by
         }
-        version_insert = sb.table('list_versions').insert(version_data).execute()
+        if delta:
+            version_data.update({'parent_version_id': delta.parent['version_id'], 'item_count': len(items)})
+        new_version = await repository.create_current_version(sb, list_id, version_data)
         
-        if not version_insert.data or len(version_insert.data) == 0:
+        if not new_version:
             raise HTTPException(status_code=500, detail='Failed to create version')
         
-        version_id = version_insert.data[0]['version_id']
-        print(f"[DEBUG] Created version_id: {version_id}")
+        version_id = new_version['version_id']
+        logger.debug("Created version %s (version_id=%s) for list %s", next_version, version_id, list_id)
         
         # Insert items into the appropriate entry table
         # Add version_id to each item
-        items_with_version = [{**item, 'version_id': version_id} for item in items]
-        
-        print(f"[DEBUG] Inserting {len(items_with_version)} items into {entry_table}")
-        print(f"[DEBUG] Sample item with version: {items_with_version[0] if items_with_version else 'No items'}")
-        print(f"[DEBUG] All items with version_id: {items_with_version}")
+        rows = delta.rows if delta else items
+        items_with_version = [{**item, 'version_id': version_id} for item in rows]
         
         try:
-            items_resp = sb.table(entry_table).insert(items_with_version).execute()
-            print(f"[DEBUG] Insert response type: {type(items_resp)}")
-            print(f"[DEBUG] Insert response data: {items_resp.data if hasattr(items_resp, 'data') else 'No data attribute'}")
-            print(f"[DEBUG] Insert response full: {items_resp}")
+            inserted = await repository.insert_rows(sb, entry_table, items_with_version) if items_with_version else []
+            if delta and delta.removed:
+                await repository.insert_rows(sb, 'list_version_removals', [
+                    {'version_id': version_id, 'natural_key': natural_key} for natural_key in delta.removed
+                ])
         except Exception as insert_error:
-            print(f"[ERROR] Insert failed with error: {str(insert_error)}")
-            print(f"[ERROR] Error type: {type(insert_error)}")
-            import traceback
-            print(f"[ERROR] Traceback: {traceback.format_exc()}")
+            logger.warning("Insert into %s failed for list %s: %s", entry_table, list_id, insert_error)
             
-            # Extract meaningful error message for the user
-            error_msg = str(insert_error)
-            if 'check constraint' in error_msg.lower():
-                # Extract the constraint name and provide helpful message
-                if 'importance_check' in error_msg:
-                    error_msg = 'Invalid value for "importance" field. Expected values: Tier 1, Tier 2, or Tier 3'
-                elif 'tier_check' in error_msg:
-                    error_msg = 'Invalid value for "tier" field. Expected values: A, B, or C'
-                elif 'influence_level_check' in error_msg:
-                    error_msg = 'Invalid value for "influence_level" field. Expected values: High, Medium, or Low'
-                elif 'conversion_potential_check' in error_msg:
-                    error_msg = 'Invalid value for "conversion_potential" field. Expected values: High, Medium, or Low'
-                else:
-                    error_msg = f'Data validation error: One or more fields contain invalid values. Please check your CSV file matches the sample template.'
-            
-            raise HTTPException(status_code=400, detail=error_msg)
+            # Don't leave an empty version behind as the current one
+            await repository.discard_version(sb, list_id, entry_table, version_id, latest_version)
+            default_version_resolver.rows_written([{'version_id': version_id}])
+            raise HTTPException(status_code=400, detail=_insert_error_message(insert_error))
         
         # Verify items were actually inserted
-        inserted_count = len(items_resp.data) if hasattr(items_resp, 'data') and items_resp.data else 0
-        print(f"[DEBUG] Successfully inserted {inserted_count} items")
+        inserted_count = len(inserted)
+        logger.info("Inserted %d items into %s for list %s", inserted_count, entry_table, list_id)
         
-        if inserted_count == 0:
-            print(f"[WARNING] No items were inserted into {entry_table}")
+        if inserted_count == 0 and not delta:
+            logger.warning("No items were inserted into %s", entry_table)
             raise HTTPException(status_code=500, detail='Failed to insert items into database')
         
+        if delta:
+            return {
+                'success': True,
+                'version_id': version_id,
+                'version_number': next_version,
+                'items_added': len(items),
+                'table_used': entry_table,
+                'storage': 'delta',
+                'rows_changed': inserted_count,
+                'rows_removed': len(delta.removed)
+            }
+        
         return {
             'success': True,
             'version_id': version_id,
@@ -353,61 +452,220 @@ def add_items_to_list(list_id: int, payload: Dict[str, Any]):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[ERROR] Exception in add_items_to_list: {str(e)}")
-        print(f"[ERROR] Exception type: {type(e)}")
-        import traceback
-        print(f"[ERROR] Traceback: {traceback.format_exc()}")
+        logger.exception("Failed to add items to list %s", list_id)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 
+def _iter_csv_batches(text_stream, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Parse a CSV text stream lazily, yielding lists of at most batch_size row dicts"""
+    batch = []
+    for row in csv.DictReader(text_stream):
+        batch.append(dict(row))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
 @router.post('/{list_id}/upload-csv', status_code=status.HTTP_201_CREATED)
-async def upload_csv_to_list(list_id: int, file: UploadFile = File(...), updated_by: str = "CSV Upload"):
+async def upload_csv_to_list(list_id: int, file: UploadFile = File(...), updated_by: str = "CSV Upload", batch_size: Optional[int] = None,
+                             mode: str = 'replace'):
     """
     Bulk upload CSV file for a specific list_id
-    Parses CSV → creates items → reuses add_items_to_list() logic
+    Streams the upload: rows are parsed lazily from the spooled file and inserted
+    in batches of batch_size (default CSV_UPLOAD_BATCH_SIZE) under one new version,
+    so memory stays proportional to a batch rather than to the file
+    Returns the row total and per-batch progress
+    With VERSION_STORAGE=delta the whole file is parsed first and only the rows
+    that changed against the current version are written (see add_items_to_list)
+    With mode=merge or mode=upsert (see UPLOAD_MODES) only new and changed rows are
+    written, and the response reports inserted/updated/unchanged counts instead
     """
-    sb = _get_supabase()
+    sb = await _get_supabase()
+    batch_size = batch_size or settings.CSV_UPLOAD_BATCH_SIZE
+    text_stream = None
     try:
         
         if not file.filename.endswith('.csv'):
             raise HTTPException(status_code=400, detail='Only CSV files are supported.')
+        if batch_size < 1:
+            raise HTTPException(status_code=400, detail='batch_size must be positive.')
+        _check_upload_mode(mode)
 
-    
-        contents = await file.read()
-        csv_text = contents.decode('utf-8')
-        reader = csv.DictReader(StringIO(csv_text))
-        rows = [dict(row) for row in reader]
-
-        if not rows:
+        text_stream = io.TextIOWrapper(file.file, encoding='utf-8', newline='')
+        batches = _iter_csv_batches(text_stream, batch_size)
+        
+        # Parsing reads from the spooled upload file, so keep it off the event loop
+        batch = await asyncio.to_thread(next, batches, None)
+        if not batch:
             raise HTTPException(status_code=400, detail='CSV file is empty.')
 
+        entry_table, latest_version = await _get_entry_table_and_latest_version(sb, list_id)
+        if mode != 'replace':
+            async def csv_batches():
+                yield batch
+                while (rest := await asyncio.to_thread(next, batches, None)):
+                    yield rest
+            result = await _merge_into_list(sb, list_id, entry_table, latest_version, csv_batches(), mode, updated_by)
+            return {**result, 'rows_total': sum(result[count] for count in ('inserted', 'updated', 'unchanged')), 'batch_size': batch_size}
+
+        next_version = latest_version + 1 if latest_version is not None else 1
+        
+        # In delta mode the new version stores only what changed relative to the current one;
+        # finding removed rows takes the whole upload, so the file is parsed up front
+        delta = None
+        if settings.VERSION_STORAGE == 'delta':
+            items = batch + await asyncio.to_thread(lambda: [row for rest in batches for row in rest])
+            delta = await version_store.plan_delta(sb, list_id, entry_table, items)
+            rows = delta.rows if delta else items
+            batches = iter([rows[start:start + batch_size] for start in range(0, len(rows), batch_size)])
+            batch = next(batches, None)
         
-        payload = {
-            "items": rows,
-            "updated_by": updated_by
+        version_data = {
+            'version_number': next_version,
+            'change_type': 'Update',
+            'change_rationale': 'CSV upload in progress',
+            'created_by': updated_by
         }
+        if delta:
+            version_data.update({'parent_version_id': delta.parent['version_id'], 'item_count': len(items)})
+        new_version = await repository.create_current_version(sb, list_id, version_data)
+        if not new_version:
+            raise HTTPException(status_code=500, detail='Failed to create version')
+        version_id = new_version['version_id']
 
-        
-        return add_items_to_list(list_id=list_id, payload=payload)
+        progress = []
+        rows_total = 0
+        try:
+            while batch:
+                inserted = await repository.insert_rows(sb, entry_table, [{**item, 'version_id': version_id} for item in batch])
+                if not inserted:
+                    raise HTTPException(status_code=500, detail='Failed to insert items into database')
+                rows_total += len(inserted)
+                progress.append({'batch': len(progress) + 1, 'rows': len(inserted), 'rows_total': rows_total})
+                logger.debug("List %s batch %d: %d rows (%d total)", list_id, len(progress), len(inserted), rows_total)
+                batch = await asyncio.to_thread(next, batches, None)
+            if delta and delta.removed:
+                await repository.insert_rows(sb, 'list_version_removals', [
+                    {'version_id': version_id, 'natural_key': natural_key} for natural_key in delta.removed
+                ])
+        except Exception as insert_error:
+            logger.warning("CSV upload to list %s failed after %d batches: %s", list_id, len(progress), insert_error)
+            # A later batch failed: drop the partial version and restore the previous one
+            await repository.discard_version(sb, list_id, entry_table, version_id, latest_version)
+            default_version_resolver.rows_written([{'version_id': version_id}])
+            if isinstance(insert_error, HTTPException):
+                raise
+            raise HTTPException(status_code=400, detail=_insert_error_message(insert_error))
+
+        if delta:
+            await repository.update_version(sb, version_id, {'change_rationale': f'Added {len(items)} items via CSV upload'})
+            logger.info("Uploaded %d rows into %s for list %s as a delta: %d changed, %d removed",
+                        len(items), entry_table, list_id, rows_total, len(delta.removed))
+            return {
+                'success': True,
+                'version_id': version_id,
+                'version_number': next_version,
+                'items_added': len(items),
+                'table_used': entry_table,
+                'storage': 'delta',
+                'rows_changed': rows_total,
+                'rows_removed': len(delta.removed),
+                'rows_total': len(items),
+                'batch_size': batch_size,
+                'batches': progress
+            }
+
+        await repository.update_version(sb, version_id, {'change_rationale': f'Added {rows_total} items via CSV upload'})
+        logger.info("Uploaded %d rows in %d batches into %s for list %s", rows_total, len(progress), entry_table, list_id)
+
+        return {
+            'success': True,
+            'version_id': version_id,
+            'version_number': next_version,
+            'items_added': rows_total,
+            'table_used': entry_table,
+            'rows_total': rows_total,
+            'batch_size': batch_size,
+            'batches': progress
+        }
 
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # Hand the underlying upload file back to FastAPI instead of closing it
+        if text_stream is not None:
+            text_stream.detach()
+
+
+@router.get('/{list_id}/versions/{from_version}/diff/{to_version}')
+async def diff_list_versions(list_id: int, from_version: int, to_version: int):
+    """
+    Row-level diff between two versions (by version_number) of a list, streamed as
+    NDJSON: a header line, one line per added/removed/modified row (matched on the
+    entry table's natural key, e.g. hcp_id), then a summary line with the counts
+    Unchanged rows are never sent
+    """
+    sb = await _get_supabase()
+    try:
+        list_data, versions = await asyncio.gather(
+            repository.get_list_request(sb, list_id, 'subdomain_id'),
+            repository.get_versions_by_number(sb, list_id, [from_version, to_version]),
+        )
+        if not list_data:
+            raise HTTPException(status_code=404, detail='List not found')
+        missing = [number for number in (from_version, to_version) if number not in versions]
+        if missing:
+            raise HTTPException(status_code=404, detail=f'Version {missing[0]} not found')
+
+        subdomain = await subdomain_registry.get(sb, list_data['subdomain_id'])
+        if not subdomain or not subdomain.entry_table:
+            raise HTTPException(status_code=400, detail='List has no entry table')
+        entry_table = subdomain.entry_table
+        key = ENTRY_NATURAL_KEYS[entry_table]
+        columns = content_columns(list(subdomain.schema.model_fields))
+
+        # Both snapshots at once, fetching only the compared columns; delta versions
+        # are replayed (or come from the snapshot cache)
+        old_rows, new_rows = await asyncio.gather(
+            version_store.materialize(sb, entry_table, versions[from_version], columns=columns),
+            version_store.materialize(sb, entry_table, versions[to_version], columns=columns),
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    def lines():
+        yield json.dumps({
+            'list_id': list_id,
+            'entry_table': entry_table,
+            'key': key,
+            'from': {'version_id': versions[from_version]['version_id'], 'version_number': from_version},
+            'to': {'version_id': versions[to_version]['version_id'], 'version_number': to_version},
+        }, default=str) + '\n'
+        counts: Dict[str, int] = {}
+        for change in diff_rows(old_rows, new_rows, key, columns, counts):
+            yield json.dumps(change, default=str) + '\n'
+        yield json.dumps({'summary': counts}) + '\n'
+
+    return StreamingResponse(lines(), media_type='application/x-ndjson')
 
 
 @router.get('/domain/{domain_id}/worklogs', response_model=List[Dict[str, Any]])
-def get_work_logs_by_domain(domain_id: int, limit: int = 100):
+async def get_work_logs_by_domain(domain_id: int, limit: int = 100):
     """
     Get work logs for all lists in a specific domain
     Joins work_logs with list_requests and subdomains to filter by domain_id
     """
-    sb = _get_supabase()
+    sb = await _get_supabase()
     try:
         # Query work_logs and join with list_requests and subdomains
         # to filter by domain_id
-        resp = sb.table('work_logs').select(
+        resp = await sb.table('work_logs').select(
             '*, list_requests!inner(*, subdomains!inner(*))'
         ).eq('list_requests.subdomains.domain_id', domain_id).order(
             'activity_date', desc=True
@@ -417,22 +675,20 @@ def get_work_logs_by_domain(domain_id: int, limit: int = 100):
         
         return work_logs
     except Exception as e:
-        print(f"[ERROR] Exception in get_work_logs_by_domain: {str(e)}")
-        import traceback
-        print(f"[ERROR] Traceback: {traceback.format_exc()}")
+        logger.exception("Failed to load work logs for domain %s", domain_id)
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get('/domain/{domain_id}/versions', response_model=List[Dict[str, Any]])
-def get_versions_by_domain(domain_id: int, limit: int = 100):
+async def get_versions_by_domain(domain_id: int, limit: int = 100):
     """
     Get all list versions for a specific domain
     Joins list_versions with list_requests and subdomains to filter by domain_id
     """
-    sb = _get_supabase()
+    sb = await _get_supabase()
     try:
         # Query list_versions and join with list_requests and subdomains
         # to filter by domain_id
-        resp = sb.table('list_versions').select(
+        resp = await sb.table('list_versions').select(
             '*, list_requests!inner(request_id, requester_name, request_purpose, status, created_at, subdomains!inner(subdomain_id, subdomain_name, domain_id))'
         ).eq('list_requests.subdomains.domain_id', domain_id).order(
             'created_at', desc=True
@@ -442,7 +698,5 @@ def get_versions_by_domain(domain_id: int, limit: int = 100):
         
         return versions
     except Exception as e:
-        print(f"[ERROR] Exception in get_versions_by_domain: {str(e)}")
-        import traceback
-        print(f"[ERROR] Traceback: {traceback.format_exc()}")
+        logger.exception("Failed to load versions for domain %s", domain_id)
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
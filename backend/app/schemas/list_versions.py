@@ -10,6 +10,8 @@ class ListVersions(BaseModel):
     change_rationale: str
     created_by: str
     is_current: Optional[bool] = None
+    parent_version_id: Optional[int] = None
+    item_count: Optional[int] = None
     created_at: Optional[datetime] = None
 
     class Config:
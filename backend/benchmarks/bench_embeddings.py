@@ -0,0 +1,74 @@
+"""
+Embedding generator benchmark
+Runs the generator against a fake Supabase client with a deterministic local
+embedder that sleeps to simulate API latency, comparing one call per version
+with the batched, concurrent pipeline
+
+Usage (from backend/): python -m benchmarks.bench_embeddings
+"""
+import os
+import tempfile
+import time
+
+os.environ.setdefault('SUPABASE_URL', 'http://localhost')
+os.environ.setdefault('SUPABASE_KEY', 'benchmark')
+os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+os.environ.setdefault('CHATAI_API_KEY', 'benchmark')
+os.environ.setdefault('EMBEDDINGS_WATERMARK_PATH', os.path.join(tempfile.mkdtemp(), 'watermark.json'))
+
+from app.core import database, embeddings  # noqa: E402
+from app.core.embedders import HashEmbedder  # noqa: E402
+from benchmarks.fake_supabase import FakeSupabase  # noqa: E402
+
+NUM_VERSIONS = 200
+API_LATENCY = 0.05
+
+
+def seed() -> FakeSupabase:
+    tables = {
+        'domains': [{'domain_id': 1, 'domain_name': 'Customer'}],
+        'subdomains': [{'subdomain_id': 1, 'domain_id': 1, 'subdomain_name': 'Target Lists'}],
+        'list_requests': [],
+        'list_versions': [],
+        'target_list_entries': [],
+        'work_logs': [],
+    }
+    for version_id in range(1, NUM_VERSIONS + 1):
+        tables['list_requests'].append({'request_id': version_id, 'subdomain_id': 1, 'request_purpose': f'Campaign {version_id}'})
+        tables['list_versions'].append({
+            'version_id': version_id, 'request_id': version_id, 'version_number': 1,
+            'change_type': 'Create', 'created_by': 'bench', 'change_rationale': 'seed',
+        })
+        for i in range(5):
+            tables['target_list_entries'].append({'entry_id': version_id * 10 + i, 'version_id': version_id, 'hcp_id': f'H{version_id}-{i}', 'tier': 'A'})
+    return FakeSupabase(tables)
+
+
+def run(label: str, batch_size: int, concurrency: int):
+    sb = seed()
+    database._client = sb
+    embedder = HashEmbedder(latency=API_LATENCY)
+    start = time.perf_counter()
+    stats = embeddings.generate_embeddings(incremental=False, embedder=embedder, batch_size=batch_size, concurrency=concurrency)
+    elapsed = time.perf_counter() - start
+    print(f'{label:<28} embedded={stats["embedded"]:<4} embedding calls={embedder.calls:<4} '
+          f'round trips={sb.round_trips:<5} {elapsed:6.2f} s')
+
+
+def run_context_build():
+    """Round trips spent building the text of every version, one version vs one batch at a time"""
+    sb = seed()
+    database._client = sb
+    versions = sb.tables['list_versions']
+    for v in versions:
+        embeddings.build_version_content(v)
+    per_version = sb.round_trips
+    sb.reset_counters()
+    embeddings.build_version_contents(versions)
+    print(f'context build ({NUM_VERSIONS} versions)  per version: {per_version} round trips, batched: {sb.round_trips}')
+
+
+if __name__ == '__main__':
+    run_context_build()
+    run('one call per version', batch_size=1, concurrency=1)
+    run('batches of 50, 4 in flight', batch_size=50, concurrency=4)
@@ -0,0 +1,111 @@
+"""
+Round-trip benchmark for GET /api/lists
+Seeds a fake Supabase client and compares the batched get_lists against the
+old per-list lookup loop
+
+Usage (from backend/): python -m benchmarks.bench_get_lists
+"""
+import asyncio
+import os
+import random
+import time
+
+os.environ.setdefault('SUPABASE_URL', 'http://localhost')
+os.environ.setdefault('SUPABASE_KEY', 'benchmark')
+os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+os.environ.setdefault('CHATAI_API_KEY', 'benchmark')
+
+from app.core.registry import SUBDOMAIN_ENTRY_TABLES, subdomain_registry  # noqa: E402
+from app.routes import lists  # noqa: E402
+from benchmarks.fake_supabase import AsyncFakeSupabase  # noqa: E402
+
+ENTRIES_PER_LIST = 20
+
+
+def seed(num_lists: int) -> AsyncFakeSupabase:
+    rng = random.Random(42)
+    subdomain_names = list(SUBDOMAIN_ENTRY_TABLES)
+    tables = {
+        'subdomains': [
+            {'subdomain_id': i + 1, 'domain_id': i // 2 + 1, 'subdomain_name': name}
+            for i, name in enumerate(subdomain_names)
+        ],
+        'list_requests': [],
+        'list_versions': [],
+    }
+    for request_id in range(1, num_lists + 1):
+        subdomain_id = rng.randint(1, len(subdomain_names))
+        tables['list_requests'].append({
+            'request_id': request_id,
+            'subdomain_id': subdomain_id,
+            'requester_name': 'bench',
+            'request_purpose': f'list {request_id}',
+            'created_at': f'2024-01-01T00:00:{request_id:06d}',
+        })
+        for version_number in (1, 2):
+            version_id = request_id * 10 + version_number
+            tables['list_versions'].append({
+                'version_id': version_id,
+                'request_id': request_id,
+                'version_number': version_number,
+                'is_current': version_number == 2,
+            })
+        entry_table = SUBDOMAIN_ENTRY_TABLES[subdomain_names[subdomain_id - 1]]
+        for _ in range(ENTRIES_PER_LIST if request_id % 5 else 0):
+            tables.setdefault(entry_table, []).append({'version_id': request_id * 10 + 2, 'hcp_id': 'H'})
+    sb = AsyncFakeSupabase(tables)
+
+    def count_entries_by_version(params):
+        counts: dict = {}
+        for row in sb.tables.get(params['entry_table'], []):
+            if row['version_id'] in params['version_ids']:
+                counts[row['version_id']] = counts.get(row['version_id'], 0) + 1
+        return [{'version_id': version_id, 'entry_count': n} for version_id, n in counts.items()]
+    sb.rpc_handlers['count_entries_by_version'] = count_entries_by_version
+    return sb
+
+
+async def per_list_baseline(sb, limit: int):
+    """The pre-batching implementation: one version and one count query per list"""
+    resp = await sb.table('list_requests').select('*, subdomains(*)').limit(limit).order('created_at', desc=True).execute()
+    result = []
+    for list_item in resp.data:
+        version_resp = await sb.table('list_versions').select('*').eq('request_id', list_item['request_id']).eq('is_current', True).order('version_number', desc=True).limit(1).execute()
+        if not version_resp.data:
+            continue
+        entry_table = SUBDOMAIN_ENTRY_TABLES.get(list_item['subdomains']['subdomain_name'])
+        entries_resp = await sb.table(entry_table).select('entry_id', count='exact').eq('version_id', version_resp.data[0]['version_id']).limit(1).execute()
+        if entries_resp.count:
+            result.append(list_item)
+    return result
+
+
+async def run(limit: int):
+    sb = seed(limit)
+
+    async def fake_supabase():
+        return sb
+    lists._get_supabase = fake_supabase
+
+    # The app loads the subdomain registry at startup, outside the request path
+    await subdomain_registry.load(sb)
+    sb.reset_counters()
+
+    start = time.perf_counter()
+    baseline = await per_list_baseline(sb, limit)
+    baseline_ms = (time.perf_counter() - start) * 1000
+    baseline_trips = sb.round_trips
+
+    sb.reset_counters()
+    start = time.perf_counter()
+    batched = await lists.get_lists(limit=limit)
+    batched_ms = (time.perf_counter() - start) * 1000
+
+    assert [l['request_id'] for l in batched] == [l['request_id'] for l in baseline]
+    print(f'limit={limit:<5} per-list: {baseline_trips:>4} round trips ({baseline_ms:7.1f} ms)   '
+          f'batched: {sb.round_trips:>2} round trips ({batched_ms:7.1f} ms)')
+
+
+if __name__ == '__main__':
+    for page_size in (10, 50, 100, 500):
+        asyncio.run(run(page_size))
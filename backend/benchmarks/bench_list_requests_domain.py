@@ -0,0 +1,90 @@
+"""
+Transfer-size benchmark for GET /api/list_requests?domain_id=
+Seeds fake list_requests tables of growing size and compares, per page:
+  limit-then-filter  the old handler (fetch `limit` joined rows, filter by domain in Python)
+  fetch-all          the correct in-Python fix (fetch every joined row, then filter)
+  inner join         the current handler (subdomains!inner + eq on subdomains.domain_id)
+reporting rows pulled from the database and matching rows returned to the client
+
+Usage (from backend/): python -m benchmarks.bench_list_requests_domain
+"""
+import asyncio
+import os
+import random
+
+os.environ.setdefault('SUPABASE_URL', 'http://localhost')
+os.environ.setdefault('SUPABASE_KEY', 'benchmark')
+os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+os.environ.setdefault('CHATAI_API_KEY', 'benchmark')
+
+from starlette.requests import Request  # noqa: E402
+
+from app.core import database  # noqa: E402
+from app.core.tables import CRUD_TABLES  # noqa: E402
+from app.routes import crud  # noqa: E402
+from benchmarks.fake_supabase import AsyncFakeSupabase  # noqa: E402
+
+DOMAINS = 5
+SUBDOMAINS_PER_DOMAIN = 4
+TARGET_DOMAIN = DOMAINS  # The sparsest domain: its lists sit mostly past the first page
+PAGE_SIZE = 50
+TABLE_SIZES = [1_000, 10_000, 100_000]
+
+
+def seed(num_requests: int) -> AsyncFakeSupabase:
+    rng = random.Random(42)
+    subdomains = [
+        {'subdomain_id': d * SUBDOMAINS_PER_DOMAIN + s + 1, 'domain_id': d + 1, 'subdomain_name': f'sub {d}.{s}'}
+        for d in range(DOMAINS) for s in range(SUBDOMAINS_PER_DOMAIN)
+    ]
+    # Skewed: the target domain gets ~2% of the lists, and none of the first page's worth
+    other = [s['subdomain_id'] for s in subdomains if s['domain_id'] != TARGET_DOMAIN]
+    target = [s['subdomain_id'] for s in subdomains if s['domain_id'] == TARGET_DOMAIN]
+    list_requests = [
+        {
+            'request_id': request_id,
+            'subdomain_id': rng.choice(target if request_id > PAGE_SIZE and rng.random() < 0.02 else other),
+            'requester_name': 'bench',
+            'request_purpose': f'list {request_id}',
+        }
+        for request_id in range(1, num_requests + 1)
+    ]
+    # No max-rows cap: the fetch-all strategy is measured by what it would pull
+    return AsyncFakeSupabase({'subdomains': subdomains, 'list_requests': list_requests}, max_rows=None)
+
+
+async def limit_then_filter(sb, domain_id: int, limit: int):
+    """The pre-join handler"""
+    resp = await sb.table('list_requests').select('*, subdomains(*)').limit(limit).execute()
+    return [item for item in resp.data if item.get('subdomains') and item['subdomains'].get('domain_id') == domain_id]
+
+
+async def fetch_all(sb, domain_id: int, limit: int):
+    resp = await sb.table('list_requests').select('*, subdomains(*)').order('request_id').execute()
+    return [item for item in resp.data if item['subdomains']['domain_id'] == domain_id][:limit]
+
+
+async def inner_join(sb, domain_id: int, limit: int):
+    request = Request({'type': 'http', 'query_string': f'domain_id={domain_id}&limit={limit}'.encode(), 'headers': []})
+    page, _ = await crud.list_rows(CRUD_TABLES['list_requests'], request, limit=limit, domain_id=domain_id)
+    return page
+
+
+async def measure(sb, fn):
+    sb.reset_counters()
+    rows = await fn(sb, TARGET_DOMAIN, PAGE_SIZE)
+    return sb.rows_transferred, len(rows)
+
+
+async def run():
+    print(f'GET /api/list_requests?domain_id={TARGET_DOMAIN}&limit={PAGE_SIZE}  (rows pulled from DB / matching rows returned)')
+    print(f'{"list_requests":>14} {"limit-then-filter":>20} {"fetch-all":>18} {"inner join":>16}')
+    for size in TABLE_SIZES:
+        sb = seed(size)
+        database._async_client = sb
+        results = [await measure(sb, fn) for fn in (limit_then_filter, fetch_all, inner_join)]
+        print(f'{size:>14,} ' + ' '.join(f'{pulled:>11,} / {returned:<4}' for pulled, returned in results))
+
+
+if __name__ == '__main__':
+    asyncio.run(run())
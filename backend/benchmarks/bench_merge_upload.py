@@ -0,0 +1,87 @@
+"""
+Merge/upsert upload benchmark
+Uploads a full copy of a list larger than one PostgREST page (a few rows
+changed, a few added) in merge and upsert mode against a fake Supabase client
+that enforces max-rows, and checks that only the changed rows are written and
+no natural key ends up stored twice
+
+Usage (from backend/): python -m benchmarks.bench_merge_upload
+"""
+import asyncio
+import os
+import time
+
+os.environ.setdefault('SUPABASE_URL', 'http://localhost')
+os.environ.setdefault('SUPABASE_KEY', 'benchmark')
+os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+os.environ.setdefault('CHATAI_API_KEY', 'benchmark')
+
+from app.core import repository, version_store  # noqa: E402
+from app.core.registry import subdomain_registry  # noqa: E402
+from app.routes import lists  # noqa: E402
+from benchmarks.fake_supabase import AsyncFakeSupabase  # noqa: E402
+
+LIST_ID = 1
+ROWS = 2500  # Spans three 1,000-row pages
+CHANGED = 100
+ADDED = 50
+
+
+def seed() -> AsyncFakeSupabase:
+    sb = AsyncFakeSupabase({
+        'subdomains': [{'subdomain_id': 1, 'domain_id': 1, 'subdomain_name': 'Target Lists'}],
+        'list_requests': [{'request_id': LIST_ID, 'subdomain_id': 1, 'requester_name': 'bench'}],
+        'list_versions': [{'version_id': 1, 'request_id': LIST_ID, 'version_number': 1, 'is_current': True}],
+        'target_list_entries': [
+            {'entry_id': i + 1, 'version_id': 1, 'hcp_id': f'H{i:05d}', 'hcp_name': f'HCP {i}', 'tier': 'A'}
+            for i in range(ROWS)
+        ],
+    })
+
+    def bulk_update_rows(params):
+        rows = {row[params['key_column']]: row for row in sb.tables[params['target_table']]}
+        for patch in params['patches']:
+            rows[patch[params['key_column']]].update(patch)
+        return [dict(rows[patch[params['key_column']]]) for patch in params['patches']]
+    sb.rpc_handlers['bulk_update_rows'] = bulk_update_rows
+    return sb
+
+
+def upload() -> list:
+    items = [{'hcp_id': f'H{i:05d}', 'hcp_name': f'HCP {i}', 'tier': 'B' if i < CHANGED else 'A'} for i in range(ROWS)]
+    items += [{'hcp_id': f'N{i:05d}', 'hcp_name': f'New HCP {i}', 'tier': 'C'} for i in range(ADDED)]
+    return items
+
+
+async def run(mode: str):
+    sb = seed()
+
+    async def fake_supabase():
+        return sb
+    lists._get_supabase = fake_supabase
+    await subdomain_registry.load(sb)
+    version_store.snapshot_cache.clear()
+    sb.reset_counters()
+
+    start = time.perf_counter()
+    result = await lists.add_items_to_list(LIST_ID, {'items': upload(), 'updated_by': 'bench', 'mode': mode})
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    round_trips = sb.round_trips
+
+    assert (result['inserted'], result['updated'], result['unchanged']) == (ADDED, CHANGED, ROWS - CHANGED), result
+    current = await repository.get_current_version(sb, LIST_ID)
+    rows = await version_store.materialize(sb, 'target_list_entries', current)
+    assert len(rows) == ROWS + ADDED, len(rows)
+    assert version_store.by_natural_key(rows, 'target_list_entries') is not None, 'an hcp_id is stored twice'
+
+    # Uploading the same rows again changes nothing
+    again = await lists.add_items_to_list(LIST_ID, {'items': upload(), 'updated_by': 'bench', 'mode': mode})
+    assert (again['inserted'], again['updated'], again['unchanged']) == (0, 0, ROWS + ADDED), again
+
+    print(f'{mode:<7} rows={ROWS:<5} inserted={result["inserted"]:<3} updated={result["updated"]:<4} '
+          f'round trips={round_trips:<3} ({elapsed_ms:7.1f} ms)')
+
+
+if __name__ == '__main__':
+    for upload_mode in ('merge', 'upsert'):
+        asyncio.run(run(upload_mode))
@@ -0,0 +1,135 @@
+"""
+/api/query vs /api/query/stream latency benchmark
+Stubs the embedding call, retriever and chat completion with fixed latencies
+(no network) and reports time-to-first-byte, time-to-first-token and total
+latency as seen by the client, plus the wall time of many concurrent sessions
+
+Usage (from backend/): python -m benchmarks.bench_query_stream
+"""
+import asyncio
+import os
+import socket
+import threading
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault('SUPABASE_URL', 'http://localhost')
+os.environ.setdefault('SUPABASE_KEY', 'benchmark')
+os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+os.environ.setdefault('CHATAI_API_KEY', 'benchmark')
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+import app.main as main  # noqa: E402
+from app.core.rag import RAGEngine  # noqa: E402
+
+EMBED_LATENCY = 0.05
+RETRIEVE_LATENCY = 0.02
+FIRST_TOKEN_LATENCY = 0.4
+TOKEN_INTERVAL = 0.03
+ANSWER_TOKENS = ['Dr. ', 'Rao ', 'is ', 'a ', 'tier ', 'A ', 'cardiologist ', 'in ', 'the ', 'Q3 ', 'target ', 'list.'] * 3
+
+
+CONCURRENT_SESSIONS = 200
+
+
+class FakeEmbedder:
+    model_name = 'benchmark-embedder'
+
+    async def aembed_query(self, text):
+        await asyncio.sleep(EMBED_LATENCY)
+        return [0.1] * 8
+
+
+class FakeRetriever:
+    async def asearch(self, query_embedding, match_threshold, match_count):
+        await asyncio.sleep(RETRIEVE_LATENCY)
+        return [{'entity_id': i, 'version_id': i, 'content': f'version {i}', 'similarity': 0.8 - i / 100} for i in range(3)]
+
+
+class FakeStream:
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        for i, token in enumerate(ANSWER_TOKENS):
+            if i:
+                await asyncio.sleep(TOKEN_INTERVAL)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+
+    async def close(self):
+        pass
+
+
+async def fake_completion(stream=False, **kwargs):
+    await asyncio.sleep(FIRST_TOKEN_LATENCY)
+    if stream:
+        return FakeStream()
+    await asyncio.sleep(TOKEN_INTERVAL * (len(ANSWER_TOKENS) - 1))
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=''.join(ANSWER_TOKENS)))],
+                           usage=SimpleNamespace(prompt_tokens=400, completion_tokens=len(ANSWER_TOKENS)))
+
+
+def install_stubs():
+    main.rag_engine = RAGEngine(
+        embedder=FakeEmbedder(),
+        chat_client=SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=fake_completion))),
+        retriever=FakeRetriever()
+    )
+    # Measure steady state, not the one-off graph compilation lifespan would otherwise do
+    asyncio.run(main.rag_engine.warm_up())
+
+
+def serve() -> str:
+    """Run the app on a free local port (without lifespan, so no Supabase connection) and return its URL"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(main.app, host='127.0.0.1', port=port, lifespan='off', log_level='warning'))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f'http://127.0.0.1:{port}'
+
+
+async def concurrent_sessions(base_url: str, count: int) -> float:
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=httpx.Limits(max_connections=count)) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            client.post('/api/query', json={'question': f'Who are the tier A cardiologists in region {i}?'})
+            for i in range(count)
+        ])
+        return time.perf_counter() - start
+
+
+def run():
+    install_stubs()
+    base_url = serve()
+    client = httpx.Client(base_url=base_url, timeout=30)
+
+    start = time.perf_counter()
+    client.post('/api/query', json={'question': 'Who are the tier A cardiologists (blocking)?'})
+    blocking = time.perf_counter() - start
+
+    start = time.perf_counter()
+    first_byte = first_token = None
+    with client.stream('POST', '/api/query/stream', json={'question': 'Who are the tier A cardiologists (streaming)?'}) as response:
+        for line in response.iter_lines():
+            now = time.perf_counter() - start
+            if first_byte is None and line:
+                first_byte = now
+            if first_token is None and line == 'event: token':
+                first_token = now
+    total = time.perf_counter() - start
+
+    print(f'blocking /api/query      first byte {blocking * 1000:7.1f} ms  total {blocking * 1000:7.1f} ms')
+    print(f'streaming /api/query     first byte {first_byte * 1000:7.1f} ms  first token {first_token * 1000:7.1f} ms  '
+          f'total {total * 1000:7.1f} ms')
+
+    wall = asyncio.run(concurrent_sessions(base_url, CONCURRENT_SESSIONS))
+    print(f'{CONCURRENT_SESSIONS} concurrent /api/query sessions  wall {wall * 1000:7.1f} ms  (one session {blocking * 1000:.1f} ms)')
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,82 @@
+"""
+Cold-start benchmark for app.main
+Imports the app in fresh interpreters (as every uvicorn worker and --reload
+restart does) and reports the median import time, the slowest modules from
+python -X importtime, which heavy RAG dependencies were pulled in, and how long
+the deferred RAG warm-up takes (offline: no network calls are made)
+
+Usage (from backend/): python -m benchmarks.bench_startup [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RUNS = 5
+TOP_MODULES = 12
+HEAVY_MODULES = ['langgraph', 'openai', 'google.generativeai', 'numpy']
+
+ENV = dict(os.environ)
+for key, value in (('SUPABASE_URL', 'http://localhost'), ('SUPABASE_KEY', 'benchmark'),
+                   ('GEMINI_API_KEY', 'benchmark'), ('CHATAI_API_KEY', 'benchmark')):
+    ENV.setdefault(key, value)
+
+IMPORT_APP = '''
+import sys, time
+started = time.perf_counter()
+import app.main
+print(round((time.perf_counter() - started) * 1000, 1))
+print(','.join(m for m in {heavy!r} if m in sys.modules))
+'''.format(heavy=HEAVY_MODULES)
+
+WARM_UP = '''
+import asyncio, time
+import app.main
+started = time.perf_counter()
+asyncio.run(app.main.rag_engine.warm_up())
+print(round((time.perf_counter() - started) * 1000, 1))
+'''
+
+
+def elapsed_ms(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) * 1000
+
+
+def python(code: str, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *flags, '-c', code], env=ENV, capture_output=True, text=True, check=True)
+
+
+def slowest_imports(stderr: str, top: int):
+    """(cumulative ms, module) pairs from -X importtime output, slowest first"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        rows.append((int(cumulative) / 1000, module.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def run(runs: int = RUNS):
+    interpreter = statistics.median(elapsed_ms(lambda: python('pass')) for _ in range(runs))
+    import_ms, heavy = [], ''
+    for _ in range(runs):
+        out = python(IMPORT_APP).stdout.splitlines()
+        import_ms.append(float(out[0]))
+        heavy = out[1] if len(out) > 1 else ''
+
+    print(f'interpreter startup          {interpreter:8.1f} ms (median of {runs})')
+    print(f'import app.main              {statistics.median(import_ms):8.1f} ms (median of {runs}, min {min(import_ms):.1f})')
+    print(f'heavy RAG modules imported   {heavy or "none"}')
+    print(f'RAG warm-up (deferred)       {float(python(WARM_UP).stdout.splitlines()[-1]):8.1f} ms')
+
+    print('\nslowest imports (cumulative, one run):')
+    for ms, module in slowest_imports(python('import app.main', '-X', 'importtime').stderr, TOP_MODULES):
+        print(f'  {ms:8.1f} ms  {module}')
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else RUNS)
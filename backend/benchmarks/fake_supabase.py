@@ -0,0 +1,305 @@
+"""
+In-memory stand-in for the supabase-py client used by the benchmarks
+Implements the subset of the PostgREST query builder the app uses and
+counts every execute() as one round trip; like PostgREST, selects return at
+most max_rows rows (None lifts the cap)
+"""
+from typing import Any, Dict, List, Optional
+
+PRIMARY_KEYS = {
+    'domains': 'domain_id',
+    'subdomains': 'subdomain_id',
+    'list_requests': 'request_id',
+    'list_versions': 'version_id',
+    'work_logs': 'log_id',
+    'list_embeddings': 'entity_id',
+    'v_current_lists': 'id',
+}
+
+
+def _primary_key(table: str) -> str:
+    return PRIMARY_KEYS.get(table, 'entry_id')
+
+
+def _split_columns(columns: str) -> List[str]:
+    """Split a select string on top-level commas"""
+    parts, depth, current = [], 0, ''
+    for char in columns:
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        if char == ',' and depth == 0:
+            parts.append(current.strip())
+            current = ''
+        else:
+            current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+class FakeResponse:
+    def __init__(self, data: List[Dict[str, Any]], count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    def __init__(self, client: 'FakeSupabase', table: str):
+        self.client = client
+        self.table_name = table
+        self.columns = '*'
+        self.count_mode = None
+        self.filters = []
+        self.orders = []
+        self.row_limit = None
+        self.row_offset = 0
+        self.action = 'select'
+        self.payload = None
+
+    # --- builder ---
+    def select(self, columns: str = '*', count: Optional[str] = None):
+        self.columns = columns
+        self.count_mode = count
+        return self
+
+    def insert(self, rows, **kwargs):
+        self.action, self.payload = 'insert', rows
+        return self
+
+    def upsert(self, rows, on_conflict: Optional[str] = None, **kwargs):
+        self.action, self.payload = 'upsert', rows
+        return self
+
+    def update(self, patch: Dict[str, Any]):
+        self.action, self.payload = 'update', patch
+        return self
+
+    def delete(self):
+        self.action = 'delete'
+        return self
+
+    def _filter(self, column, op, value):
+        self.filters.append((column, op, value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, 'eq', value)
+
+    def neq(self, column, value):
+        return self._filter(column, 'neq', value)
+
+    def gt(self, column, value):
+        return self._filter(column, 'gt', value)
+
+    def gte(self, column, value):
+        return self._filter(column, 'gte', value)
+
+    def lt(self, column, value):
+        return self._filter(column, 'lt', value)
+
+    def lte(self, column, value):
+        return self._filter(column, 'lte', value)
+
+    def in_(self, column, values):
+        return self._filter(column, 'in', list(values))
+
+    def ilike(self, column, pattern):
+        return self._filter(column, 'ilike', pattern)
+
+    def order(self, column, desc: bool = False):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, size: int):
+        self.row_limit = size
+        return self
+
+    def range(self, start: int, end: int):
+        self.row_offset = start
+        self.row_limit = end - start + 1
+        return self
+
+    # --- evaluation ---
+    def _embed(self, table: str, row: Dict[str, Any], spec: str):
+        name, _, inner = spec.partition('(')
+        inner = inner[:-1]
+        target = name.split('!')[0]
+        target_pk = _primary_key(target)
+        if target_pk in row:
+            matches = [r for r in self.client.tables.get(target, []) if r.get(target_pk) == row[target_pk]]
+            rows = [self._project(target, r, inner) for r in matches]
+            return target, (rows[0] if rows else None), name.endswith('!inner')
+        source_pk = _primary_key(table)
+        matches = [r for r in self.client.tables.get(target, []) if r.get(source_pk) == row.get(source_pk)]
+        return target, [self._project(target, r, inner) for r in matches], name.endswith('!inner')
+
+    def _project(self, table: str, row: Dict[str, Any], columns: str) -> Optional[Dict[str, Any]]:
+        result: Dict[str, Any] = {}
+        for column in _split_columns(columns):
+            if column == '*':
+                result.update(row)
+            elif '(' in column and not column.endswith('()'):
+                target, value, inner = self._embed(table, row, column)
+                if inner and not value:
+                    return None
+                result[target] = value
+            elif not column.endswith('()'):
+                result[column] = row.get(column)
+        return result
+
+    @staticmethod
+    def _match(value, op, expected) -> bool:
+        if op == 'eq':
+            return value == expected
+        if op == 'neq':
+            return value != expected
+        if op == 'in':
+            return value in expected
+        if value is None:
+            return False
+        if op == 'gt':
+            return value > expected
+        if op == 'gte':
+            return value >= expected
+        if op == 'lt':
+            return value < expected
+        if op == 'lte':
+            return value <= expected
+        if op == 'ilike':
+            return expected.strip('%').lower() in str(value).lower()
+        return False
+
+    def _passes(self, row: Dict[str, Any]) -> bool:
+        for column, op, expected in self.filters:
+            value: Any = row
+            for part in column.split('.'):
+                value = value.get(part) if isinstance(value, dict) else None
+            if not self._match(value, op, expected):
+                return False
+        return True
+
+    def _base_rows(self) -> List[Dict[str, Any]]:
+        return self.client.tables.setdefault(self.table_name, [])
+
+    def _select(self) -> FakeResponse:
+        projected = []
+        for row in self._base_rows():
+            item = self._project(self.table_name, row, self.columns)
+            if item is not None and self._passes({**row, **item}):
+                projected.append(item)
+        for column, desc in reversed(self.orders):
+            projected.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=desc)
+        count = len(projected) if self.count_mode else None
+
+        aggregates = [c for c in _split_columns(self.columns) if c.endswith('count()')]
+        if aggregates:
+            group_columns = [c for c in _split_columns(self.columns) if not c.endswith('()')]
+            groups: Dict[tuple, int] = {}
+            for row in projected:
+                key = tuple(row.get(c) for c in group_columns)
+                groups[key] = groups.get(key, 0) + 1
+            projected = [{**dict(zip(group_columns, key)), 'count': n} for key, n in groups.items()]
+
+        projected = projected[self.row_offset:]
+        if self.row_limit is not None:
+            projected = projected[:self.row_limit]
+        if self.client.max_rows is not None:
+            projected = projected[:self.client.max_rows]
+        return FakeResponse(projected, count)
+
+    def _write(self) -> FakeResponse:
+        rows = self._base_rows()
+        pk = _primary_key(self.table_name)
+        if self.action in ('insert', 'upsert'):
+            payload = self.payload if isinstance(self.payload, list) else [self.payload]
+            written = []
+            for item in payload:
+                item = dict(item)
+                existing = None
+                if self.action == 'upsert' and item.get(pk) is not None:
+                    existing = next((r for r in rows if r.get(pk) == item[pk]), None)
+                if existing is not None:
+                    existing.update(item)
+                    written.append(dict(existing))
+                    continue
+                if pk not in item or item[pk] is None:
+                    item[pk] = self.client.next_id(self.table_name, pk)
+                rows.append(item)
+                written.append(dict(item))
+            return FakeResponse(written)
+        matched = [r for r in rows if self._passes(r)]
+        if self.action == 'update':
+            for row in matched:
+                row.update(self.payload)
+            return FakeResponse([dict(r) for r in matched])
+        self.client.tables[self.table_name] = [r for r in rows if not self._passes(r)]
+        return FakeResponse([dict(r) for r in matched])
+
+    def execute(self) -> FakeResponse:
+        self.client.round_trips += 1
+        if self.action == 'select':
+            response = self._select()
+        else:
+            response = self._write()
+        self.client.rows_transferred += len(response.data)
+        return response
+
+
+class FakeRpc:
+    def __init__(self, client: 'FakeSupabase', name: str, params: Dict[str, Any]):
+        self.client, self.name, self.params = client, name, params
+
+    def execute(self) -> FakeResponse:
+        self.client.round_trips += 1
+        handler = self.client.rpc_handlers.get(self.name)
+        return FakeResponse(handler(self.params) if handler else [])
+
+
+class FakeSupabase:
+    """Minimal synchronous supabase client backed by dicts of rows"""
+
+    def __init__(self, tables: Optional[Dict[str, List[Dict[str, Any]]]] = None, max_rows: Optional[int] = 1000):
+        self.tables = tables or {}
+        self.max_rows = max_rows
+        self.sequences: Dict[str, int] = {}
+        self.rpc_handlers: Dict[str, Any] = {}
+        self.round_trips = 0
+        self.rows_transferred = 0
+
+    def next_id(self, table: str, pk: str) -> int:
+        if table not in self.sequences:
+            self.sequences[table] = max((r.get(pk) or 0 for r in self.tables.get(table, [])), default=0)
+        self.sequences[table] += 1
+        return self.sequences[table]
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: Dict[str, Any]) -> FakeRpc:
+        return FakeRpc(self, name, params)
+
+    def reset_counters(self):
+        self.round_trips = 0
+        self.rows_transferred = 0
+
+
+class AsyncFakeQuery(FakeQuery):
+    async def execute(self) -> FakeResponse:
+        return FakeQuery.execute(self)
+
+
+class AsyncFakeRpc(FakeRpc):
+    async def execute(self) -> FakeResponse:
+        return FakeRpc.execute(self)
+
+
+class AsyncFakeSupabase(FakeSupabase):
+    """Same store as FakeSupabase, but execute() is awaitable like the async supabase client"""
+
+    def table(self, name: str) -> AsyncFakeQuery:
+        return AsyncFakeQuery(self, name)
+
+    def rpc(self, name: str, params: Dict[str, Any]) -> AsyncFakeRpc:
+        return AsyncFakeRpc(self, name, params)
@@ -0,0 +1,32 @@
+-- Apply a different patch to each of many rows in one UPDATE statement
+-- (used by PATCH /api/<table>/bulk). patches is a JSON array of objects that
+-- each carry the key column plus the columns to change; columns a patch
+-- leaves out keep their current value. Returns the updated rows.
+create or replace function bulk_update_rows(target_table text, key_column text, patches jsonb)
+returns setof jsonb
+language plpgsql
+as $$
+declare
+  assignments text;
+begin
+  select string_agg(format('%1$I = case when p.patch ? %2$L then (p.r).%1$I else t.%1$I end', col, col), ', ')
+    into assignments
+    from (
+      select distinct jsonb_object_keys(patch) as col
+      from jsonb_array_elements(patches) as patch
+    ) cols
+    where col <> key_column;
+
+  if assignments is null then
+    return;
+  end if;
+
+  return query execute format(
+    'update %1$I as t set %2$s
+       from (select e as patch, jsonb_populate_record(null::%1$I, e) as r from jsonb_array_elements($1) as e) as p
+      where t.%3$I = (p.r).%3$I
+      returning to_jsonb(t)',
+    target_table, assignments, key_column
+  ) using patches;
+end;
+$$;
@@ -0,0 +1,16 @@
+-- Number of entry rows per version in one entry table (used by GET /api/lists).
+-- PostgREST ships with aggregate functions disabled, so the counts are grouped
+-- here instead of with select=version_id,count(). Versions without entries
+-- are left out of the result.
+create or replace function count_entries_by_version(entry_table text, version_ids bigint[])
+returns table (version_id bigint, entry_count bigint)
+language plpgsql
+stable
+as $$
+begin
+  return query execute format(
+    'select e.version_id::bigint, count(*)::bigint from %I as e where e.version_id = any($1) group by e.version_id',
+    entry_table
+  ) using version_ids;
+end;
+$$;
@@ -0,0 +1,3 @@
+-- Fingerprint of the content each embedding was built from, so the
+-- embedding generator can skip versions whose content hasn't changed
+alter table list_embeddings add column if not exists content_hash text;
@@ -0,0 +1,84 @@
+-- When a version's embedding content last changed, so the incremental
+-- embedding generator also re-embeds versions edited in place (generic CRUD
+-- routes, upsert uploads, direct edits), not only new ones. list_versions.updated_at
+-- is bumped by writes to the version's entry rows or work logs, to its own
+-- descriptive columns, or to its list request's purpose or subdomain.
+alter table list_versions add column if not exists updated_at timestamptz not null default now();
+create index if not exists list_versions_updated_at_idx on list_versions (updated_at);
+
+-- Statement-level, so a 50k-row upload touches each version once
+create or replace function touch_list_versions_from_rows()
+returns trigger
+language plpgsql
+as $$
+begin
+  if tg_op = 'INSERT' then
+    update list_versions set updated_at = now() where version_id in (select version_id from new_rows);
+  elsif tg_op = 'UPDATE' then
+    update list_versions set updated_at = now()
+     where version_id in (select version_id from new_rows union select version_id from old_rows);
+  else
+    update list_versions set updated_at = now() where version_id in (select version_id from old_rows);
+  end if;
+  return null;
+end;
+$$;
+
+do $$
+declare
+  t text;
+begin
+  foreach t in array array[
+    'target_list_entries', 'call_list_entries', 'formulary_decision_maker_entries',
+    'idn_health_system_entries', 'event_invitation_entries', 'digital_engagement_entries',
+    'high_value_prescriber_entries', 'competitor_target_entries', 'work_logs'
+  ] loop
+    execute format('drop trigger if exists touch_versions_on_insert on %I', t);
+    execute format('create trigger touch_versions_on_insert after insert on %I
+                      referencing new table as new_rows
+                      for each statement execute function touch_list_versions_from_rows()', t);
+    execute format('drop trigger if exists touch_versions_on_update on %I', t);
+    execute format('create trigger touch_versions_on_update after update on %I
+                      referencing old table as old_rows new table as new_rows
+                      for each statement execute function touch_list_versions_from_rows()', t);
+    execute format('drop trigger if exists touch_versions_on_delete on %I', t);
+    execute format('create trigger touch_versions_on_delete after delete on %I
+                      referencing old table as old_rows
+                      for each statement execute function touch_list_versions_from_rows()', t);
+  end loop;
+end;
+$$;
+
+-- The version's own text (is_current flips and delta bookkeeping don't count)
+create or replace function touch_list_version()
+returns trigger
+language plpgsql
+as $$
+begin
+  new.updated_at := now();
+  return new;
+end;
+$$;
+
+drop trigger if exists touch_version_on_update on list_versions;
+create trigger touch_version_on_update before update on list_versions
+  for each row
+  when ((old.version_number, old.change_type, old.created_by, old.change_rationale)
+        is distinct from (new.version_number, new.change_type, new.created_by, new.change_rationale))
+  execute function touch_list_version();
+
+create or replace function touch_list_versions_of_request()
+returns trigger
+language plpgsql
+as $$
+begin
+  update list_versions set updated_at = now() where request_id = new.request_id;
+  return null;
+end;
+$$;
+
+drop trigger if exists touch_versions_on_update on list_requests;
+create trigger touch_versions_on_update after update on list_requests
+  for each row
+  when (old.request_purpose is distinct from new.request_purpose or old.subdomain_id is distinct from new.subdomain_id)
+  execute function touch_list_versions_of_request();
@@ -0,0 +1,13 @@
+-- Delta storage for list versions (VERSION_STORAGE=delta). A version with a
+-- parent_version_id stores only the entry rows it added or changed relative to
+-- its parent, plus the natural keys (hcp_id, contact_id, system_id, invitee_id)
+-- it removed; item_count records the size of its full snapshot. Versions without
+-- a parent are full snapshots, as before.
+alter table list_versions add column if not exists parent_version_id bigint references list_versions(version_id);
+alter table list_versions add column if not exists item_count integer;
+
+create table if not exists list_version_removals (
+  version_id bigint not null references list_versions(version_id) on delete cascade,
+  natural_key text not null,
+  primary key (version_id, natural_key)
+);
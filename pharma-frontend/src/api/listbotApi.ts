@@ -24,3 +24,77 @@ export const postListBotQuery = async (data: ListBotQueryRequest): Promise<ListB
   }
 }
 
+
+export interface ListBotChatTurn {
+  user: string
+  assistant: string
+}
+
+export interface ListBotRetrievedDoc {
+  entity_id: number
+  version_id?: number
+  similarity?: number
+}
+
+export interface ListBotStreamResult {
+  answer: string
+  retrieved_count: number
+  cached: boolean
+  timings: { retrieval_ms?: number; first_token_ms?: number; total_ms?: number }
+}
+
+export interface ListBotStreamHandlers {
+  onRetrieval?: (docs: ListBotRetrievedDoc[]) => void
+  onToken?: (delta: string) => void
+}
+
+// Streams /api/query/stream (Server-Sent Events): retrieval metadata first, then answer tokens
+export const streamListBotQuery = async (
+  data: { question: string; chat_history?: ListBotChatTurn[] },
+  handlers: ListBotStreamHandlers = {},
+  signal?: AbortSignal
+): Promise<ListBotStreamResult> => {
+  const token = localStorage.getItem('sb_token')
+  const response = await fetch(`${axiosClient.defaults.baseURL}/api/query/stream`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      Accept: 'text/event-stream',
+      ...(token ? { Authorization: `Bearer ${token}` } : {})
+    },
+    body: JSON.stringify({ question: data.question, chat_history: data.chat_history || [] }),
+    signal
+  })
+  if (!response.ok || !response.body) {
+    throw new Error(`ListBot stream failed with status ${response.status}`)
+  }
+
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  while (true) {
+    const { done, value } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+
+    let boundary
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const rawEvent = buffer.slice(0, boundary)
+      buffer = buffer.slice(boundary + 2)
+
+      let event = 'message'
+      let payload = ''
+      for (const line of rawEvent.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim()
+        else if (line.startsWith('data:')) payload += line.slice(5).trim()
+      }
+      const parsed = payload ? JSON.parse(payload) : {}
+
+      if (event === 'retrieval') handlers.onRetrieval?.(parsed.docs || [])
+      else if (event === 'token') handlers.onToken?.(parsed.delta || '')
+      else if (event === 'done') return parsed as ListBotStreamResult
+      else if (event === 'error') throw new Error(parsed.detail || 'ListBot stream failed')
+    }
+  }
+  throw new Error('ListBot stream ended before the answer completed')
+}
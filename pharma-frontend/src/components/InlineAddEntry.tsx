@@ -2,6 +2,9 @@ import React, { useState, useEffect, useRef } from 'react'
 import Toast from './Toast'
 import { downloadSampleCSV, getListTypeFromSubdomain } from '../utils/csvTemplates'
 
+// Rows per POST /api/<table>/bulk request (the backend's CRUD_MAX_BATCH_SIZE default)
+const BULK_BATCH_SIZE = 500
+
 interface InlineAddEntryProps {
   columns: string[]
   tableName: string
@@ -176,42 +179,44 @@ export default function InlineAddEntry({ columns, tableName, onEntryAdded, onAdd
 
         setToast({ message: `Successfully uploaded ${result.items_added || 0} entries!`, type: 'success' })
       } else {
-        // For standalone entries (no listId), parse CSV and add entries individually
+        // For standalone entries (no listId), parse CSV and send the rows in bulk batches
         const rows = await parseCsvFile(selectedFile)
         console.log('[DEBUG] Parsed CSV rows:', rows.length)
 
         let successCount = 0
         let errorCount = 0
 
-        for (const row of rows) {
-          try {
-            // Remove empty fields
-            const dataToSend = Object.fromEntries(
-              Object.entries(row).filter(([_, value]) => value.trim() !== '')
-            )
-
-            if (Object.keys(dataToSend).length === 0) {
-              errorCount++
-              continue
-            }
+        // Remove empty fields; rows with nothing left count as failed
+        const entries = rows
+          .map(row => Object.fromEntries(Object.entries(row).filter(([_, value]) => value.trim() !== '')))
+        const nonEmpty = entries.filter(entry => Object.keys(entry).length > 0)
+        errorCount += entries.length - nonEmpty.length
 
-            const response = await fetch(`http://localhost:8000/api/${tableName}`, {
+        for (let start = 0; start < nonEmpty.length; start += BULK_BATCH_SIZE) {
+          const batch = nonEmpty.slice(start, start + BULK_BATCH_SIZE)
+          try {
+            const response = await fetch(`http://localhost:8000/api/${tableName}/bulk`, {
               method: 'POST',
               headers: {
                 'Content-Type': 'application/json',
               },
-              body: JSON.stringify(dataToSend),
+              body: JSON.stringify(batch),
             })
 
             if (response.ok) {
-              successCount++
+              const result = await response.json()
+              successCount += result.created
+              errorCount += result.failed
+              result.results
+                .filter((r: { status: string }) => r.status !== 'created')
+                .forEach((r: { index: number; detail?: string }) => console.error(`[ERROR] Failed to add row:`, batch[r.index], r.detail))
             } else {
-              errorCount++
-              console.error(`[ERROR] Failed to add row:`, row)
+              errorCount += batch.length
+              console.error(`[ERROR] Failed to add ${batch.length} rows:`, response.status)
             }
           } catch (error) {
-            errorCount++
-            console.error(`[ERROR] Error adding row:`, error)
+            errorCount += batch.length
+            console.error(`[ERROR] Error adding rows:`, error)
           }
         }
 
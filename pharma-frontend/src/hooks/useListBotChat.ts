@@ -1,18 +1,46 @@
 import { useState } from 'react'
-import { postListBotQuery } from '../api/listbotApi'
+import { ListBotChatTurn, streamListBotQuery } from '../api/listbotApi'
+
+type ChatMessage = { role: 'user'|'assistant'; content: string }
+
+// Pair up completed user/assistant messages into the backend's chat_history shape
+const toChatHistory = (messages: ChatMessage[]): ListBotChatTurn[] => {
+  const history: ListBotChatTurn[] = []
+  for (let i = 0; i + 1 < messages.length; i++) {
+    if (messages[i].role === 'user' && messages[i + 1].role === 'assistant') {
+      history.push({ user: messages[i].content, assistant: messages[i + 1].content })
+    }
+  }
+  return history
+}
 
 export function useListBotChat() {
-  const [messages, setMessages] = useState<{ role: 'user'|'assistant'; content: string }[]>([])
+  const [messages, setMessages] = useState<ChatMessage[]>([])
   const [loading, setLoading] = useState(false)
 
   const sendMessage = async (domain: string, query: string) => {
     setLoading(true)
     setMessages(prev => [...prev, { role: 'user', content: query }])
+    let started = false
     try {
-      const res = await postListBotQuery({ domain, question: query, chat_history: messages })
-      setMessages(prev => [...prev, { role: 'assistant', content: res.answer }])
+      await streamListBotQuery({ question: query, chat_history: toChatHistory(messages) }, {
+        onToken: (delta) => {
+          if (!started) {
+            // First token: swap the "Analyzing..." indicator for the growing answer
+            started = true
+            setLoading(false)
+            setMessages(prev => [...prev, { role: 'assistant', content: delta }])
+            return
+          }
+          setMessages(prev => {
+            const last = prev[prev.length - 1]
+            return [...prev.slice(0, -1), { ...last, content: last.content + delta }]
+          })
+        }
+      })
     } catch (err) {
-      setMessages(prev => [...prev, { role: 'assistant', content: 'Error: could not reach server (mock mode).'}])
+      const error = { role: 'assistant' as const, content: 'Error: could not reach server (mock mode).' }
+      setMessages(prev => started ? [...prev.slice(0, -1), error] : [...prev, error])
     } finally {
       setLoading(false)
     }